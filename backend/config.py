@@ -14,6 +14,83 @@ class Settings(BaseSettings):
     snowflake_schema: str = "PUBLIC"
     snowflake_role: Optional[str] = None
     
+    # Connection pool settings
+    pool_min_size: int = 1
+    pool_max_size: int = 18  # >= executor_max_workers + execution_queue_workers + composite_max_parallel_steps
+    pool_acquire_timeout_seconds: float = 30.0
+    pool_idle_timeout_seconds: float = 600.0
+    pool_max_lifetime_seconds: float = 3000.0  # Recycle before SPCS/OAuth tokens expire
+    pool_health_check_interval_seconds: float = 60.0
+    
+    # Async execution settings
+    executor_max_workers: int = 10  # Keep <= pool_max_size
+    executor_max_pending: int = 100
+    request_timeout_seconds: float = 30.0
+    graph_query_timeout_seconds: float = 60.0
+    workflow_timeout_seconds: float = 120.0
+    
+    # Workflow trigger settings
+    workflow_registry_check_seconds: float = 5.0  # How often trigger matching checks WORKFLOW_DEFINITIONS for changes
+    
+    # Composite workflow settings
+    # Steps running at once across all parallel COMPOSITE executions, each on its own pooled connection while its
+    # parent execution holds another; capped to the pool left over by executor and queue workers (none: sequential)
+    composite_max_parallel_steps: int = 4
+    
+    # Enrichment settings (ENRICH workflows)
+    enrichment_cache_max_bytes: int = 16 * 1024 * 1024  # In-process tier in front of ENRICHMENT_CACHE
+    enrichment_batch_window_seconds: float = 0.05  # How long a lookup waits for concurrent executions to join its batch
+    enrichment_max_batch: int = 500  # Lookup values per provider call
+    
+    # Workflow execution queue settings
+    execution_queue_backend: str = "snowflake"  # snowflake (WORKFLOW_EXECUTION_QUEUE, shared) or sqlite (local file)
+    execution_queue_sqlite_path: str = "execution_queue.db"
+    execution_queue_workers: int = 4  # Each running execution holds a pooled connection
+    execution_queue_workflow_concurrency: int = 2  # Running executions per workflow, per process
+    execution_queue_max_attempts: int = 3
+    execution_queue_retry_base_seconds: float = 2.0  # Doubles with each failed attempt
+    execution_queue_retry_max_seconds: float = 300.0
+    execution_queue_poll_seconds: float = 2.0  # For work queued by other processes
+    execution_queue_claim_timeout_seconds: float = 600.0  # Claims older than this (dead worker) are re-queued
+    
+    # Execution log settings (events buffered in memory are lost on a crash)
+    execution_log_batch_size: int = 500  # Flush as soon as this many events are buffered
+    execution_log_flush_seconds: float = 1.0
+    execution_log_max_buffered: int = 50000  # Oldest events are dropped beyond this while flushes fail
+    
+    # Graph settings
+    graph_traversal_engine: str = "recursive"  # recursive (single WITH RECURSIVE query) or iterative
+    graph_recursive_max_depth: int = 3  # Deeper queries use the iterative engine; the recursive one enumerates every path
+    graph_max_nodes: int = 10000  # Default and ceiling for GraphQuery.max_nodes
+    graph_max_edges: int = 50000  # Default and ceiling for GraphQuery.max_edges
+    graph_path_max_visited: int = 200000  # Entities a path/reachability search may visit before giving up
+    graph_path_timeout_seconds: float = 5.0
+    graph_stats_max_staleness_seconds: float = 30.0  # Reload /graph/stats from the summary tables after this
+    adjacency_index_enabled: bool = False  # Serve traversals from an in-process adjacency index
+    adjacency_index_refresh_seconds: float = 5.0
+    adjacency_index_rebuild_seconds: float = 3600.0  # Full reload; also picks up deletes from other workers
+    
+    # Read cache settings (a max_bytes of 0 disables that cache)
+    entity_cache_max_bytes: int = 64 * 1024 * 1024
+    state_cache_max_bytes: int = 16 * 1024 * 1024
+    workflow_cache_max_bytes: int = 4 * 1024 * 1024
+    cache_ttl_seconds: float = 30.0  # Bounds staleness from other workers' writes
+    cache_invalidation_enabled: bool = False  # Share invalidations between workers via CACHE_INVALIDATIONS
+    cache_invalidation_poll_seconds: float = 2.0
+    
+    # Entity read settings
+    batch_get_max_ids: int = 5000
+    batch_get_chunk_size: int = 1000  # IDs per IN list
+    
+    # Pagination settings
+    pagination_count_ttl_seconds: float = 60.0  # Cache for estimated totals on paged listings
+    
+    # Bulk ingest settings
+    bulk_insert_batch_size: int = 500  # Rows per multi-row INSERT statement
+    bulk_copy_threshold: int = 10000  # Batches at least this large are staged and loaded with COPY INTO
+    bulk_chunk_rows: int = 50000  # Rows buffered from a request before they are written
+    bulk_timeout_seconds: float = 600.0  # Per chunk
+    
     # Application settings
     app_name: str = "Snowflake Ontology & Workflow Engine"
     debug: bool = False
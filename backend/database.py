@@ -1,107 +1,341 @@
 import snowflake.connector
 from snowflake.snowpark import Session
 from config import settings
-from typing import Optional
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Callable, List
+import logging
 import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SPCS_TOKEN_PATH = "/snowflake/session/token"
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the acquire timeout"""
+
+
+class _PooledConnection:
+    """Bookkeeping wrapper around a raw connector connection"""
+
+    __slots__ = ("raw", "created_at", "last_used_at")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of Snowflake connector connections"""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        acquire_timeout: float = 30.0,
+        idle_timeout: float = 600.0,
+        max_lifetime: float = 3000.0,
+        health_check_interval: float = 60.0
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle: List[_PooledConnection] = []
+        self._in_use: Dict[int, _PooledConnection] = {}
+        self._opening = 0
+        self._closed = False
+
+        # Metrics
+        self._checkouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._health_check_failures = 0
+
+        for _ in range(min_size):
+            self._idle.append(self._open())
+
+    @property
+    def size(self) -> int:
+        """Number of open connections (idle + in use + being opened)"""
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _open(self) -> _PooledConnection:
+        pooled = _PooledConnection(self._connect())
+        self._created += 1
+        return pooled
+
+    def _discard(self, pooled: _PooledConnection):
+        self._discarded += 1
+        try:
+            if not pooled.raw.is_closed():
+                pooled.raw.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled connection: {e}")
+
+    def _is_expired(self, pooled: _PooledConnection, now: float) -> bool:
+        return self.max_lifetime > 0 and now - pooled.created_at > self.max_lifetime
+
+    def _is_healthy(self, pooled: _PooledConnection, now: float) -> bool:
+        """Check a connection before handing it out"""
+        if pooled.raw.is_closed():
+            return False
+        if now - pooled.last_used_at < self.health_check_interval:
+            return True
+        try:
+            cursor = pooled.raw.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception as e:
+            self._health_check_failures += 1
+            logger.warning(f"Pooled connection failed health check: {e}")
+            return False
+
+    def _evict_idle_locked(self, now: float) -> List[_PooledConnection]:
+        """Remove idle connections past idle_timeout or max_lifetime, keeping min_size open"""
+        evicted = []
+        keep = []
+        for pooled in self._idle:
+            over_min = self.size - len(evicted) > self.min_size
+            idle_too_long = self.idle_timeout > 0 and now - pooled.last_used_at > self.idle_timeout
+            if self._is_expired(pooled, now) or (over_min and idle_too_long):
+                evicted.append(pooled)
+            else:
+                keep.append(pooled)
+        self._idle = keep
+        return evicted
+
+    def evict_idle(self) -> int:
+        """Close idle connections that exceeded their idle timeout or lifetime"""
+        with self._cond:
+            evicted = self._evict_idle_locked(time.monotonic())
+        for pooled in evicted:
+            self._discard(pooled)
+        return len(evicted)
+
+    def acquire(self):
+        """Check out a healthy connection, opening a new one if the pool has room"""
+        start = time.monotonic()
+        deadline = start + self.acquire_timeout
+
+        while True:
+            pooled = None
+            open_new = False
+            evicted = []
+
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+                    evicted.extend(self._evict_idle_locked(time.monotonic()))
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        break
+                    if self.size < self.max_size:
+                        self._opening += 1
+                        open_new = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.acquire_timeout}s waiting for a database connection "
+                            f"(pool size {self.max_size}, all in use)"
+                        )
+                    self._cond.wait(remaining)
+
+            for stale in evicted:
+                self._discard(stale)
+
+            if open_new:
+                try:
+                    pooled = self._open()
+                finally:
+                    with self._cond:
+                        self._opening -= 1
+                        if pooled is None:
+                            self._cond.notify()
+            elif not self._is_healthy(pooled, time.monotonic()):
+                self._discard(pooled)
+                with self._cond:
+                    self._cond.notify()
+                continue
+
+            waited = time.monotonic() - start
+            with self._cond:
+                self._in_use[id(pooled.raw)] = pooled
+                self._checkouts += 1
+                self._wait_time_total += waited
+                self._wait_time_max = max(self._wait_time_max, waited)
+            return pooled.raw
+
+    def release(self, raw, discard: bool = False):
+        """Return a connection to the pool (or close it if it is broken or expired)"""
+        with self._cond:
+            pooled = self._in_use.pop(id(raw), None)
+            if pooled is None:
+                return
+            now = time.monotonic()
+            pooled.last_used_at = now
+            drop = discard or self._closed or raw.is_closed() or self._is_expired(pooled, now)
+            if not drop:
+                self._idle.append(pooled)
+            self._cond.notify()
+        if drop:
+            self._discard(pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool metrics for monitoring"""
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self.size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "avg_wait_ms": round(self._wait_time_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._wait_time_max * 1000, 3),
+                "timeouts": self._timeouts,
+                "connections_created": self._created,
+                "connections_discarded": self._discarded,
+                "health_check_failures": self._health_check_failures
+            }
+
+    def close(self):
+        """Close idle connections; in-use connections are closed when released"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
 
 
 class SnowflakeConnection:
     """Manages Snowflake database connections"""
-    
+
     def __init__(self):
-        self._connection = None
+        self._pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
         self._session = None
-    
-    def get_connection(self):
-        """Get a Snowflake connector connection"""
-        if self._connection is None or self._connection.is_closed():
-            # Check if running in SPCS (service token available)
-            if os.path.exists("/snowflake/session/token"):
-                # Running in SPCS - use service token
-                with open("/snowflake/session/token", "r") as f:
-                    token = f.read().strip()
-                
-                # Get SPCS environment variables (set by Snowflake when executeAsCaller is enabled)
-                snowflake_host = os.getenv("SNOWFLAKE_HOST")
-                snowflake_account = os.getenv("SNOWFLAKE_ACCOUNT")
-                
-                if not snowflake_host or not snowflake_account:
-                    raise ValueError("SPCS environment variables SNOWFLAKE_HOST and SNOWFLAKE_ACCOUNT must be set")
-                
-                connection_params = {
-                    "host": snowflake_host,
-                    "account": snowflake_account,
-                    "authenticator": "oauth",
-                    "token": token,
-                    "warehouse": os.getenv("SNOWFLAKE_WAREHOUSE") or settings.snowflake_warehouse or "COMPUTE_WH",
-                    "database": os.getenv("SNOWFLAKE_DATABASE") or settings.snowflake_database or "ONTOLOGY_DB",
-                    "schema": os.getenv("SNOWFLAKE_SCHEMA") or settings.snowflake_schema or "PUBLIC",
-                }
-            else:
-                # Running locally - use username/password
-                connection_params = {
-                    "account": settings.snowflake_account or os.getenv("SNOWFLAKE_ACCOUNT"),
-                    "user": settings.snowflake_user or os.getenv("SNOWFLAKE_USER"),
-                    "password": settings.snowflake_password or os.getenv("SNOWFLAKE_PASSWORD"),
-                    "warehouse": settings.snowflake_warehouse or os.getenv("SNOWFLAKE_WAREHOUSE", "COMPUTE_WH"),
-                    "database": settings.snowflake_database or os.getenv("SNOWFLAKE_DATABASE", "ONTOLOGY_DB"),
-                    "schema": settings.snowflake_schema or os.getenv("SNOWFLAKE_SCHEMA", "PUBLIC"),
-                }
-            
-            if settings.snowflake_role or os.getenv("SNOWFLAKE_ROLE"):
-                connection_params["role"] = settings.snowflake_role or os.getenv("SNOWFLAKE_ROLE")
-            
-            self._connection = snowflake.connector.connect(**connection_params)
-        
-        return self._connection
-    
+
+    def _connection_params(self) -> Dict[str, Any]:
+        """Build connection parameters, re-reading the SPCS token on every call"""
+        # Check if running in SPCS (service token available)
+        if os.path.exists(SPCS_TOKEN_PATH):
+            # Running in SPCS - use service token. SPCS rotates the token file,
+            # so it is read fresh for each new connection.
+            with open(SPCS_TOKEN_PATH, "r") as f:
+                token = f.read().strip()
+
+            # Get SPCS environment variables (set by Snowflake when executeAsCaller is enabled)
+            snowflake_host = os.getenv("SNOWFLAKE_HOST")
+            snowflake_account = os.getenv("SNOWFLAKE_ACCOUNT")
+
+            if not snowflake_host or not snowflake_account:
+                raise ValueError("SPCS environment variables SNOWFLAKE_HOST and SNOWFLAKE_ACCOUNT must be set")
+
+            connection_params = {
+                "host": snowflake_host,
+                "account": snowflake_account,
+                "authenticator": "oauth",
+                "token": token,
+                "warehouse": os.getenv("SNOWFLAKE_WAREHOUSE") or settings.snowflake_warehouse or "COMPUTE_WH",
+                "database": os.getenv("SNOWFLAKE_DATABASE") or settings.snowflake_database or "ONTOLOGY_DB",
+                "schema": os.getenv("SNOWFLAKE_SCHEMA") or settings.snowflake_schema or "PUBLIC",
+            }
+        else:
+            # Running locally - use username/password
+            connection_params = {
+                "account": settings.snowflake_account or os.getenv("SNOWFLAKE_ACCOUNT"),
+                "user": settings.snowflake_user or os.getenv("SNOWFLAKE_USER"),
+                "password": settings.snowflake_password or os.getenv("SNOWFLAKE_PASSWORD"),
+                "warehouse": settings.snowflake_warehouse or os.getenv("SNOWFLAKE_WAREHOUSE", "COMPUTE_WH"),
+                "database": settings.snowflake_database or os.getenv("SNOWFLAKE_DATABASE", "ONTOLOGY_DB"),
+                "schema": settings.snowflake_schema or os.getenv("SNOWFLAKE_SCHEMA", "PUBLIC"),
+            }
+
+        if settings.snowflake_role or os.getenv("SNOWFLAKE_ROLE"):
+            connection_params["role"] = settings.snowflake_role or os.getenv("SNOWFLAKE_ROLE")
+
+        return connection_params
+
+    def _new_connection(self):
+        return snowflake.connector.connect(**self._connection_params())
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """The connection pool, created on first use"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(
+                        self._new_connection,
+                        min_size=settings.pool_min_size,
+                        max_size=settings.pool_max_size,
+                        acquire_timeout=settings.pool_acquire_timeout_seconds,
+                        idle_timeout=settings.pool_idle_timeout_seconds,
+                        max_lifetime=settings.pool_max_lifetime_seconds,
+                        health_check_interval=settings.pool_health_check_interval_seconds
+                    )
+        return self._pool
+
+    @contextmanager
+    def connection(self):
+        """Check out a pooled connection for one unit of work.
+
+        Re-entrant per thread: nested service calls made while a connection is
+        checked out (e.g. update_entity -> get_entity) reuse the same connection
+        instead of taking a second one from the pool.
+        """
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        pool = self.pool
+        conn = pool.acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            pool.release(conn)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool metrics (empty until the pool is first used)"""
+        return self._pool.stats() if self._pool is not None else {}
+
     def get_session(self) -> Session:
         """Get a Snowpark session"""
         if self._session is None:
-            # Check if running in SPCS (service token available)
-            if os.path.exists("/snowflake/session/token"):
-                # Running in SPCS - use service token
-                with open("/snowflake/session/token", "r") as f:
-                    token = f.read().strip()
-                
-                # Get SPCS environment variables (set by Snowflake when executeAsCaller is enabled)
-                snowflake_host = os.getenv("SNOWFLAKE_HOST")
-                snowflake_account = os.getenv("SNOWFLAKE_ACCOUNT")
-                
-                if not snowflake_host or not snowflake_account:
-                    raise ValueError("SPCS environment variables SNOWFLAKE_HOST and SNOWFLAKE_ACCOUNT must be set")
-                
-                connection_params = {
-                    "host": snowflake_host,
-                    "account": snowflake_account,
-                    "authenticator": "oauth",
-                    "token": token,
-                    "warehouse": os.getenv("SNOWFLAKE_WAREHOUSE") or settings.snowflake_warehouse or "COMPUTE_WH",
-                    "database": os.getenv("SNOWFLAKE_DATABASE") or settings.snowflake_database or "ONTOLOGY_DB",
-                    "schema": os.getenv("SNOWFLAKE_SCHEMA") or settings.snowflake_schema or "PUBLIC",
-                }
-            else:
-                # Running locally - use username/password
-                connection_params = {
-                    "account": settings.snowflake_account or os.getenv("SNOWFLAKE_ACCOUNT"),
-                    "user": settings.snowflake_user or os.getenv("SNOWFLAKE_USER"),
-                    "password": settings.snowflake_password or os.getenv("SNOWFLAKE_PASSWORD"),
-                    "warehouse": settings.snowflake_warehouse or os.getenv("SNOWFLAKE_WAREHOUSE", "COMPUTE_WH"),
-                    "database": settings.snowflake_database or os.getenv("SNOWFLAKE_DATABASE", "ONTOLOGY_DB"),
-                    "schema": settings.snowflake_schema or os.getenv("SNOWFLAKE_SCHEMA", "PUBLIC"),
-                }
-            
-            if settings.snowflake_role or os.getenv("SNOWFLAKE_ROLE"):
-                connection_params["role"] = settings.snowflake_role or os.getenv("SNOWFLAKE_ROLE")
-            
-            self._session = Session.builder.configs(connection_params).create()
-        
+            self._session = Session.builder.configs(self._connection_params()).create()
+
         return self._session
-    
+
     def close(self):
         """Close all connections"""
-        if self._connection and not self._connection.is_closed():
-            self._connection.close()
+        if self._pool is not None:
+            self._pool.close()
         if self._session:
             self._session.close()
 
@@ -0,0 +1,92 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config import settings
+
+
+class ExecutorOverloadedError(Exception):
+    """Raised when too many database calls are already queued"""
+
+
+class DatabaseExecutor:
+    """Runs blocking service calls off the event loop on a bounded thread pool.
+
+    ``max_workers`` caps how many Snowflake calls run at once (it should not
+    exceed the connection pool size). ``max_pending`` caps how many calls may be
+    admitted in total, running or queued; further calls fail fast with
+    ExecutorOverloadedError instead of piling up behind a saturated warehouse.
+    """
+
+    def __init__(self, max_workers: int = 10, max_pending: int = 100):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._timeouts = 0
+        self._rejected = 0
+        self._busy_time_total = 0.0
+
+    async def run(self, func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run ``func(*args, **kwargs)`` in the pool and await its result.
+
+        On timeout the awaiting request is released with asyncio.TimeoutError;
+        the worker thread finishes the in-flight statement in the background,
+        and the call counts against ``max_pending`` until it has.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise ExecutorOverloadedError(
+                    f"Too many concurrent database requests ({self.max_pending} pending)"
+                )
+            self._pending += 1
+        start = time.monotonic()
+
+        def finished(_):
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+                self._busy_time_total += time.monotonic() - start
+
+        try:
+            future = self._executor.submit(functools.partial(func, *args, **kwargs))
+        except BaseException:
+            finished(None)
+            raise
+        # Runs when the work itself ends (or is cancelled while still queued), not when the caller stops waiting
+        future.add_done_callback(finished)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Executor metrics for monitoring"""
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "completed": self._completed,
+            "timeouts": self._timeouts,
+            "rejected": self._rejected,
+            "avg_latency_ms": round(self._busy_time_total / self._completed * 1000, 3) if self._completed else 0.0
+        }
+
+    def shutdown(self):
+        """Stop accepting work and wait for running calls to finish"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Global executor instance
+db_executor = DatabaseExecutor(
+    max_workers=settings.executor_max_workers,
+    max_pending=settings.executor_max_pending
+)
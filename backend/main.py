@@ -1,18 +1,32 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional, AsyncIterator, Sequence, Tuple, Type
+from pydantic import BaseModel, ValidationError
+import asyncio
+import json
 import logging
+import time
 
 from config import settings
 from database import db
+from executor import db_executor, ExecutorOverloadedError
 from models import (
     Entity, EntityResponse, Relationship, RelationshipResponse,
-    EntityState, WorkflowDefinition, WorkflowExecution,
-    GraphQuery, HealthResponse
+    EntityState, StateUpdateResult, WorkflowDefinition, WorkflowExecution,
+    GraphQuery, PathQuery, ReachabilityQuery, HealthResponse, PaginatedResponse,
+    EntityFilter, BatchGetRequest, BatchGetResult, StateTransitionRequest
 )
+from services.adjacency_index import AdjacencyIndex
+from services.cache_invalidation import CacheInvalidationBus
+from services.entity_search import compile_shape
+from services.execution_log import ExecutionLogWriter
+from services.execution_queue import ExecutionQueue, create_queue_backend
 from services.ontology_service import OntologyService
+from services.projection import ENTITY_COLUMNS, RELATIONSHIP_COLUMNS, parse_fields, parse_graph_fields
 from services.workflow_service import WorkflowService
 
 # Configure logging
@@ -26,10 +40,24 @@ async def lifespan(app: FastAPI):
     logger.info("Starting application...")
     try:
         # Database connection will be established on first use (lazy loading)
+        if adjacency_index is not None:
+            # Built on a background thread; traversals use the warehouse until it is ready
+            adjacency_index.start()
+        if invalidation_bus is not None:
+            invalidation_bus.start()
+        execution_log.start()
+        execution_queue.start(workflow_service.run_queued_execution)
         logger.info("Application ready - database connection will be established on first request")
         yield
     finally:
         logger.info("Shutting down application...")
+        if adjacency_index is not None:
+            adjacency_index.stop()
+        execution_queue.stop()
+        execution_log.stop()
+        if invalidation_bus is not None:
+            invalidation_bus.stop()
+        db_executor.shutdown()
         db.close()
 
 
@@ -51,8 +79,172 @@ app.add_middleware(
 )
 
 # Initialize services
-ontology_service = OntologyService(db)
-workflow_service = WorkflowService(db)
+adjacency_index = AdjacencyIndex(
+    db,
+    refresh_interval=settings.adjacency_index_refresh_seconds,
+    rebuild_interval=settings.adjacency_index_rebuild_seconds
+) if settings.adjacency_index_enabled else None
+invalidation_bus = CacheInvalidationBus(
+    db,
+    poll_interval=settings.cache_invalidation_poll_seconds
+) if settings.cache_invalidation_enabled else None
+ontology_service = OntologyService(db, adjacency_index=adjacency_index, invalidation_bus=invalidation_bus)
+execution_queue = ExecutionQueue(
+    create_queue_backend(settings.execution_queue_backend, db, settings.execution_queue_sqlite_path),
+    workers=settings.execution_queue_workers,
+    workflow_concurrency=settings.execution_queue_workflow_concurrency,
+    max_attempts=settings.execution_queue_max_attempts,
+    retry_base_seconds=settings.execution_queue_retry_base_seconds,
+    retry_max_seconds=settings.execution_queue_retry_max_seconds,
+    poll_interval=settings.execution_queue_poll_seconds,
+    claim_timeout=settings.execution_queue_claim_timeout_seconds
+)
+execution_log = ExecutionLogWriter(
+    db,
+    batch_size=settings.execution_log_batch_size,
+    flush_interval=settings.execution_log_flush_seconds,
+    max_buffered=settings.execution_log_max_buffered
+)
+workflow_service = WorkflowService(
+    db,
+    invalidation_bus=invalidation_bus,
+    execution_queue=execution_queue,
+    execution_log=execution_log,
+    invalidate_entity=ontology_service.invalidate_entity
+)
+
+
+async def run_db(func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    """Run a blocking service call on the database executor without stalling the event loop"""
+    try:
+        return await db_executor.run(
+            func, *args,
+            timeout=timeout or settings.request_timeout_seconds,
+            **kwargs
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Database request timed out")
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def _iter_bulk_items(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """Items of a bulk request body: a JSON array, or NDJSON streamed line by line.
+    
+    NDJSON lines that fail to decode are yielded as the exception so they can be
+    reported against their index.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        index = 0
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            lines = buffer.split(b"\n")
+            buffer = lines.pop()
+            for line in lines:
+                if line.strip():
+                    try:
+                        yield index, json.loads(line)
+                    except ValueError as e:
+                        yield index, e
+                    index += 1
+        if buffer.strip():
+            try:
+                yield index, json.loads(buffer)
+            except ValueError as e:
+                yield index, e
+        return
+    
+    try:
+        items = json.loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON body")
+    for index, item in enumerate(items):
+        yield index, item
+
+
+async def run_bulk(
+    request: Request,
+    model: Type[BaseModel],
+    write: Callable[[List[Tuple[int, Any]]], Dict[str, Any]],
+    id_key: str,
+    return_ids: bool,
+    count_key: str = "created",
+    list_keys: Sequence[str] = ()
+) -> Dict[str, Any]:
+    """Validate a bulk body and write it in chunks of BULK_CHUNK_ROWS.
+    
+    write receives (input index, model) pairs and returns {"method", id_key:
+    {index: id}, "errors": [{"index", "error"}]} plus any list_keys, which
+    are concatenated across chunks into the response. Invalid rows and rows
+    in a failed chunk are reported per index; the rest are still written.
+    """
+    start = time.monotonic()
+    received = 0
+    chunk: List[Tuple[int, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    ids: Dict[int, str] = {}
+    lists: Dict[str, List[Any]] = {key: [] for key in list_keys}
+    methods = set()
+    
+    async def flush():
+        try:
+            result = await run_db(write, chunk, timeout=settings.bulk_timeout_seconds)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Bulk chunk of {len(chunk)} rows failed: {e}")
+            errors.extend({"index": index, "error": str(e)} for index, _ in chunk)
+            return
+        if result["method"]:
+            methods.add(result["method"])
+        ids.update(result[id_key])
+        errors.extend(result["errors"])
+        for key in list_keys:
+            lists[key].extend(result[key])
+    
+    async for index, item in _iter_bulk_items(request):
+        received += 1
+        if isinstance(item, Exception):
+            errors.append({"index": index, "error": f"Invalid JSON: {item}"})
+            continue
+        try:
+            chunk.append((index, model.model_validate(item)))
+        except ValidationError as e:
+            errors.append({"index": index, "error": str(e)})
+            continue
+        if len(chunk) >= settings.bulk_chunk_rows:
+            await flush()
+            chunk = []
+    if chunk:
+        await flush()
+    
+    elapsed = time.monotonic() - start
+    response = {
+        "received": received,
+        count_key: len(ids),
+        "failed": len(errors),
+        "errors": sorted(errors, key=lambda error: error["index"]),
+        "method": "+".join(sorted(methods)) or None,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(len(ids) / elapsed, 1) if elapsed > 0 else None
+    }
+    if return_ids:
+        response[id_key] = [ids.get(index) for index in range(received)]
+    response.update(lists)
+    return response
+
+
+def _current_database() -> str:
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT CURRENT_DATABASE()")
+        database = cursor.fetchone()[0]
+        cursor.close()
+    return database
 
 
 @app.get("/", response_model=Dict[str, str])
@@ -69,64 +261,180 @@ async def root():
 async def health_check():
     """Health check endpoint"""
     try:
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT CURRENT_DATABASE()")
-        database = cursor.fetchone()[0]
-        cursor.close()
+        database = await run_db(_current_database)
         
         return HealthResponse(
             status="healthy",
             database=database,
             timestamp=datetime.utcnow()
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
 
 
+@app.get("/metrics", response_model=Dict[str, Any])
+async def get_metrics():
+    """Runtime metrics (connection pool, database executor, adjacency index, caches, workflow execution)"""
+    return {
+        "pool": db.pool_stats(),
+        "executor": db_executor.stats(),
+        "adjacency_index": adjacency_index.stats() if adjacency_index is not None else None,
+        "entity_search_compile_cache": compile_shape.cache_info()._asdict(),
+        "caches": {**ontology_service.cache_stats(), **workflow_service.cache_stats()},
+        "cache_invalidation": invalidation_bus.stats() if invalidation_bus is not None else None,
+        "trigger_registry": workflow_service.trigger_registry.stats(),
+        "execution_queue": execution_queue.stats(),
+        "execution_log": execution_log.stats(),
+        "enrichment": workflow_service.enrichment.stats()
+    }
+
+
 # ==================== Entity Endpoints ====================
 
 @app.post("/entities", response_model=EntityResponse, status_code=201)
 async def create_entity(entity: Entity):
     """Create a new entity in the ontology"""
     try:
-        result = ontology_service.create_entity(entity)
+        result = await run_db(ontology_service.create_entity, entity)
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating entity: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/entities/bulk", response_model=Dict[str, Any])
+async def bulk_create_entities(request: Request, return_ids: bool = False):
+    """Create entities from a JSON array or an NDJSON stream (Content-Type: application/x-ndjson)"""
+    try:
+        return await run_bulk(
+            request, Entity, ontology_service.bulk_create_entities,
+            id_key="entity_ids", return_ids=return_ids
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error bulk creating entities: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/entities/batch-get", response_model=Dict[str, Any])
+async def batch_get_entities(request: BatchGetRequest):
+    """Fetch many entities by ID; results follow the request order, with found=false for unknown IDs"""
+    try:
+        if len(request.entity_ids) > settings.batch_get_max_ids:
+            raise ValueError(f"At most {settings.batch_get_max_ids} entity_ids per request")
+        entities = await run_db(ontology_service.batch_get_entities, request.entity_ids)
+        results = [
+            BatchGetResult(entity_id=entity_id, found=entity is not None, entity=entity)
+            for entity_id, entity in zip(request.entity_ids, entities)
+        ]
+        found = sum(1 for result in results if result.found)
+        return {"results": results, "found": found, "not_found": len(results) - found}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error batch getting entities: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/entities/search", response_model=PaginatedResponse)
+async def search_entities(
+    entity_filter: EntityFilter,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = None
+):
+    """Search entities by type, tags, property values, current state and creation time"""
+    try:
+        return await run_db(
+            ontology_service.search_entities, entity_filter,
+            limit=limit,
+            cursor=cursor
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error searching entities: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/entities", response_model=List[EntityResponse])
 async def list_entities(
     entity_type: str = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    fields: str = None
 ):
-    """List entities with optional filtering"""
+    """List entities with optional filtering; fields=entity_type,label,properties.x narrows the response"""
     try:
-        entities = ontology_service.list_entities(
+        projection = parse_fields(fields, ENTITY_COLUMNS, ("entity_id",))
+        entities = await run_db(
+            ontology_service.list_entities,
             entity_type=entity_type,
             limit=limit,
-            offset=offset
+            offset=offset,
+            projection=projection
         )
+        if projection:
+            return JSONResponse(jsonable_encoder(entities))
         return entities
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error listing entities: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/entities/page", response_model=PaginatedResponse)
+async def list_entities_page(
+    entity_type: str = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = None,
+    include_total: bool = False
+):
+    """List entities with cursor pagination; pass next_cursor back as cursor for the next page"""
+    try:
+        return await run_db(
+            ontology_service.list_entities_page,
+            entity_type=entity_type,
+            limit=limit,
+            cursor=cursor,
+            include_total=include_total
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error listing entities: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/entities/{entity_id}", response_model=EntityResponse)
-async def get_entity(entity_id: str):
+async def get_entity(entity_id: str, fields: str = None):
     """Get a specific entity by ID"""
     try:
-        entity = ontology_service.get_entity(entity_id)
+        projection = parse_fields(fields, ENTITY_COLUMNS, ("entity_id",))
+        entity = await run_db(ontology_service.get_entity, entity_id, projection=projection)
         if not entity:
             raise HTTPException(status_code=404, detail="Entity not found")
+        if projection:
+            return JSONResponse(jsonable_encoder(entity))
         return entity
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting entity: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -136,7 +444,7 @@ async def get_entity(entity_id: str):
 async def update_entity(entity_id: str, entity: Entity):
     """Update an existing entity"""
     try:
-        result = ontology_service.update_entity(entity_id, entity)
+        result = await run_db(ontology_service.update_entity, entity_id, entity)
         if not result:
             raise HTTPException(status_code=404, detail="Entity not found")
         return result
@@ -151,7 +459,7 @@ async def update_entity(entity_id: str, entity: Entity):
 async def delete_entity(entity_id: str):
     """Delete an entity"""
     try:
-        success = ontology_service.delete_entity(entity_id)
+        success = await run_db(ontology_service.delete_entity, entity_id)
         if not success:
             raise HTTPException(status_code=404, detail="Entity not found")
         return None
@@ -168,27 +476,81 @@ async def delete_entity(entity_id: str):
 async def create_relationship(relationship: Relationship):
     """Create a new relationship between entities"""
     try:
-        result = ontology_service.create_relationship(relationship)
+        result = await run_db(ontology_service.create_relationship, relationship)
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating relationship: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/relationships/bulk", response_model=Dict[str, Any])
+async def bulk_create_relationships(request: Request, return_ids: bool = False):
+    """Create relationships from a JSON array or NDJSON stream, rejecting unknown subjects/objects"""
+    try:
+        return await run_bulk(
+            request, Relationship, ontology_service.bulk_create_relationships,
+            id_key="relationship_ids", return_ids=return_ids
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error bulk creating relationships: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/relationships", response_model=List[RelationshipResponse])
 async def list_relationships(
     entity_id: str = None,
     predicate: str = None,
-    limit: int = 100
+    limit: int = 100,
+    fields: str = None
 ):
-    """List relationships with optional filtering"""
+    """List relationships with optional filtering; fields= narrows the response"""
     try:
-        relationships = ontology_service.list_relationships(
+        projection = parse_fields(fields, RELATIONSHIP_COLUMNS, ("relationship_id",))
+        relationships = await run_db(
+            ontology_service.list_relationships,
             entity_id=entity_id,
             predicate=predicate,
-            limit=limit
+            limit=limit,
+            projection=projection
         )
+        if projection:
+            return JSONResponse(jsonable_encoder(relationships))
         return relationships
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error listing relationships: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/relationships/page", response_model=PaginatedResponse)
+async def list_relationships_page(
+    entity_id: str = None,
+    predicate: str = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = None,
+    include_total: bool = False
+):
+    """List relationships with cursor pagination"""
+    try:
+        return await run_db(
+            ontology_service.list_relationships_page,
+            entity_id=entity_id,
+            predicate=predicate,
+            limit=limit,
+            cursor=cursor,
+            include_total=include_total
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error listing relationships: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -198,7 +560,7 @@ async def list_relationships(
 async def delete_relationship(relationship_id: str):
     """Delete a relationship"""
     try:
-        success = ontology_service.delete_relationship(relationship_id)
+        success = await run_db(ontology_service.delete_relationship, relationship_id)
         if not success:
             raise HTTPException(status_code=404, detail="Relationship not found")
         return None
@@ -212,22 +574,91 @@ async def delete_relationship(relationship_id: str):
 # ==================== Graph Query Endpoints ====================
 
 @app.post("/graph/query", response_model=Dict[str, Any])
-async def query_graph(query: GraphQuery):
-    """Query the ontology graph"""
+async def query_graph(query: GraphQuery, fields: str = None):
+    """Query the ontology graph; fields= narrows the returned nodes and edges"""
     try:
-        result = ontology_service.query_graph(query)
+        node_projection, edge_projection = parse_graph_fields(fields)
+        result = await run_db(
+            ontology_service.query_graph, query, node_projection, edge_projection,
+            timeout=settings.graph_query_timeout_seconds
+        )
         return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error querying graph: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/graph/query/stream")
+async def stream_graph(query: GraphQuery):
+    """Stream a graph traversal as NDJSON: one line per depth level, then a summary line"""
+    levels = ontology_service.stream_graph(query)
+    
+    async def ndjson():
+        try:
+            while True:
+                event = await run_db(next, levels, None, timeout=settings.graph_query_timeout_seconds)
+                if event is None:
+                    break
+                yield json.dumps(event, default=str) + "\n"
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"Error streaming graph: {detail}")
+            yield json.dumps({"type": "error", "detail": detail}) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.post("/graph/path", response_model=Dict[str, Any])
+async def find_path(query: PathQuery):
+    """Find the shortest path between two entities"""
+    try:
+        result = await run_db(
+            ontology_service.shortest_path, query,
+            timeout=settings.graph_path_timeout_seconds
+        )
+        if result is None:
+            raise HTTPException(status_code=404, detail="Entity not found")
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error finding path: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/graph/reachable", response_model=Dict[str, Any])
+async def check_reachable(query: ReachabilityQuery):
+    """Check or count what is reachable from an entity within k hops"""
+    try:
+        result = await run_db(
+            ontology_service.reachable, query,
+            timeout=settings.graph_path_timeout_seconds
+        )
+        if result is None:
+            raise HTTPException(status_code=404, detail="Entity not found")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error checking reachability: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/graph/stats", response_model=Dict[str, Any])
 async def get_graph_stats():
     """Get statistics about the ontology graph"""
     try:
-        stats = ontology_service.get_graph_stats()
+        stats = await run_db(ontology_service.get_graph_stats)
         return stats
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting graph stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -239,8 +670,10 @@ async def get_graph_stats():
 async def create_workflow(workflow: WorkflowDefinition):
     """Create a new workflow definition"""
     try:
-        result = workflow_service.create_workflow(workflow)
+        result = await run_db(workflow_service.create_workflow, workflow)
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating workflow: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -250,18 +683,81 @@ async def create_workflow(workflow: WorkflowDefinition):
 async def list_workflows(enabled: bool = None):
     """List workflow definitions"""
     try:
-        workflows = workflow_service.list_workflows(enabled=enabled)
+        workflows = await run_db(workflow_service.list_workflows, enabled=enabled)
         return workflows
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing workflows: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/workflows/executions", response_model=List[WorkflowExecution])
+async def list_workflow_executions(
+    workflow_id: str = None,
+    entity_id: str = None,
+    limit: int = 100
+):
+    """List workflow executions"""
+    try:
+        executions = await run_db(
+            workflow_service.list_executions,
+            workflow_id=workflow_id,
+            entity_id=entity_id,
+            limit=limit
+        )
+        return executions
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing workflow executions: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/workflows/executions/page", response_model=PaginatedResponse)
+async def list_workflow_executions_page(
+    workflow_id: str = None,
+    entity_id: str = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = None,
+    include_total: bool = False
+):
+    """List workflow executions with cursor pagination"""
+    try:
+        return await run_db(
+            workflow_service.list_executions_page,
+            workflow_id=workflow_id,
+            entity_id=entity_id,
+            limit=limit,
+            cursor=cursor,
+            include_total=include_total
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error listing workflow executions: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/workflows/propagations/{query_id}", response_model=Dict[str, Any])
+async def get_propagation_status(query_id: str):
+    """Get the status of an asynchronous PROPAGATE query"""
+    try:
+        return await run_db(workflow_service.get_propagation_status, query_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting propagation status: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/workflows/{workflow_id}", response_model=WorkflowDefinition)
 async def get_workflow(workflow_id: str):
     """Get a specific workflow definition"""
     try:
-        workflow = workflow_service.get_workflow(workflow_id)
+        workflow = await run_db(workflow_service.get_workflow, workflow_id)
         if not workflow:
             raise HTTPException(status_code=404, detail="Workflow not found")
         return workflow
@@ -272,33 +768,34 @@ async def get_workflow(workflow_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/workflows/{workflow_id}/execute", response_model=WorkflowExecution)
-async def execute_workflow(workflow_id: str, entity_id: str, input_data: Dict[str, Any] = None):
-    """Manually execute a workflow"""
+@app.put("/workflows/{workflow_id}", response_model=WorkflowDefinition)
+async def update_workflow(workflow_id: str, workflow: WorkflowDefinition):
+    """Update a workflow definition"""
     try:
-        result = workflow_service.execute_workflow(workflow_id, entity_id, input_data or {})
+        result = await run_db(workflow_service.update_workflow, workflow_id, workflow)
+        if not result:
+            raise HTTPException(status_code=404, detail="Workflow not found")
         return result
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error executing workflow: {e}")
+        logger.error(f"Error updating workflow: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/workflows/executions", response_model=List[WorkflowExecution])
-async def list_workflow_executions(
-    workflow_id: str = None,
-    entity_id: str = None,
-    limit: int = 100
-):
-    """List workflow executions"""
+@app.post("/workflows/{workflow_id}/execute", response_model=WorkflowExecution)
+async def execute_workflow(workflow_id: str, entity_id: str, input_data: Dict[str, Any] = None):
+    """Manually execute a workflow"""
     try:
-        executions = workflow_service.list_executions(
-            workflow_id=workflow_id,
-            entity_id=entity_id,
-            limit=limit
+        result = await run_db(
+            workflow_service.execute_workflow, workflow_id, entity_id, input_data or {},
+            timeout=settings.workflow_timeout_seconds
         )
-        return executions
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error listing workflow executions: {e}")
+        logger.error(f"Error executing workflow: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -308,7 +805,7 @@ async def list_workflow_executions(
 async def get_entity_state(entity_id: str):
     """Get the current state of an entity"""
     try:
-        state = workflow_service.get_entity_state(entity_id)
+        state = await run_db(workflow_service.get_entity_state, entity_id)
         if not state:
             raise HTTPException(status_code=404, detail="Entity state not found")
         return state
@@ -319,17 +816,35 @@ async def get_entity_state(entity_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.put("/entities/{entity_id}/state", response_model=EntityState)
+@app.put("/entities/{entity_id}/state", response_model=StateUpdateResult)
 async def update_entity_state(entity_id: str, new_state: str, state_data: Dict[str, Any] = None):
-    """Update the state of an entity (triggers workflows)"""
+    """Update the state of an entity; triggered workflows are queued and their execution IDs returned"""
     try:
-        result = workflow_service.update_entity_state(entity_id, new_state, state_data or {})
+        result = await run_db(workflow_service.update_entity_state, entity_id, new_state, state_data or {})
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error updating entity state: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+
+@app.post("/states/bulk", response_model=Dict[str, Any])
+async def bulk_update_states(request: Request, return_ids: bool = False):
+    """Apply state transitions from a JSON array or an NDJSON stream; triggered workflows are queued"""
+    try:
+        return await run_bulk(
+            request, StateTransitionRequest, workflow_service.bulk_update_states,
+            id_key="entity_ids", return_ids=return_ids, count_key="updated", list_keys=("execution_ids",)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error bulk updating states: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -123,6 +123,11 @@ class EntityState(BaseModel):
     updated_at: Optional[datetime] = None
 
 
+class StateUpdateResult(EntityState):
+    """New entity state plus the workflow executions the change queued"""
+    execution_ids: List[str] = Field(default_factory=list)
+
+
 class WorkflowDefinition(BaseModel):
     """Defines a workflow that can be triggered"""
     workflow_id: Optional[str] = None
@@ -146,16 +151,53 @@ class WorkflowExecution(BaseModel):
     error_message: Optional[str] = None
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
 
 
 class GraphQuery(BaseModel):
     """Query model for graph traversal"""
     start_entity_id: str
-    relationship_types: Optional[List[str]] = None
+    relationship_types: Optional[List[str]] = None  # Only follow these predicates
+    hop_predicates: Optional[List[str]] = None  # Predicate required at each hop, e.g. ["OWNS", "INCLUDES"]
+    entity_types: Optional[List[str]] = None  # Only reach entities of these types
+    max_fanout: Optional[int] = Field(default=None, ge=1)  # Max neighbor entities expanded per level
+    max_nodes: Optional[int] = Field(default=None, ge=1)  # Node budget; result is flagged truncated when hit
+    max_edges: Optional[int] = Field(default=None, ge=1)  # Edge budget
     max_depth: int = Field(default=3, ge=1, le=10)
     direction: str = Field(default="both")  # outgoing, incoming, both
 
 
+class PathQuery(BaseModel):
+    """Query model for shortest path between two entities"""
+    source_entity_id: str
+    target_entity_id: str
+    relationship_types: Optional[List[str]] = None  # Only follow these predicates
+    weight_property: Optional[str] = None  # Numeric relationship property used as edge cost; hop count if unset
+    max_depth: int = Field(default=6, ge=1, le=10)
+    direction: str = Field(default="both")  # outgoing, incoming, both
+
+
+class ReachabilityQuery(BaseModel):
+    """Query model for k-hop reachability"""
+    start_entity_id: str
+    target_entity_id: Optional[str] = None  # If set, answer whether this entity is reachable
+    relationship_types: Optional[List[str]] = None
+    max_depth: int = Field(default=3, ge=1, le=10)
+    direction: str = Field(default="both")
+
+
+class BatchGetRequest(BaseModel):
+    """Entity IDs to fetch in one call"""
+    entity_ids: List[str] = Field(min_length=1)
+
+
+class BatchGetResult(BaseModel):
+    """One requested ID; entity is null when it does not exist"""
+    entity_id: str
+    found: bool
+    entity: Optional[EntityResponse] = None
+
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
@@ -575,7 +617,8 @@ class PaginationParams(BaseModel):
 class PaginatedResponse(BaseModel):
     """Generic paginated response"""
     items: List[Any]
-    total: int
-    offset: int
+    total: Optional[int] = None  # Estimated total; only when requested
+    offset: int = 0
     limit: int
     has_more: bool
+    next_cursor: Optional[str] = None  # Opaque token for the next page
@@ -0,0 +1,555 @@
+import json
+import logging
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from database import SnowflakeConnection
+from models import GraphQuery, RelationshipResponse
+
+logger = logging.getLogger(__name__)
+
+
+def _numeric_property(props: Optional[str], key: str, default: float = 1.0) -> float:
+    """Read a numeric value from a JSON properties string"""
+    if not props:
+        return default
+    value = json.loads(props).get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return default
+    return float(value)
+
+
+class AdjacencyIndex:
+    """In-process adjacency index over ENTITIES and RELATIONSHIPS.
+
+    Entities and edges are mapped to dense integer IDs. Out- and in-edges are
+    kept in CSR form (an offsets array per node into a flat edge array), with
+    predicates and entity types dictionary-encoded. Edges added after the last
+    CSR build live in small per-node delta lists until the next compaction.
+
+    The index is kept fresh by polling high-water marks on RELATIONSHIPS.CREATED_AT
+    and ENTITIES.UPDATED_AT, by write-through from OntologyService, and by a
+    periodic full rebuild that also picks up deletes made by other processes.
+    """
+
+    def __init__(
+        self,
+        db: SnowflakeConnection,
+        refresh_interval: float = 5.0,
+        rebuild_interval: float = 3600.0,
+        compact_threshold: int = 10000
+    ):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.compact_threshold = compact_threshold
+
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._reset()
+
+        self.ready = False
+        self.last_build_at: Optional[float] = None
+        self.last_refresh_at: Optional[float] = None
+        self.last_build_seconds: Optional[float] = None
+        self.refresh_errors = 0
+
+    def _reset(self):
+        # Nodes
+        self._node_index: Dict[str, int] = {}
+        self._node_ids: List[str] = []
+        self._node_type = array("H")
+        self._node_label: List[str] = []
+        self._node_props: List[Optional[str]] = []
+        self._node_alive = bytearray()
+        self._type_codes: Dict[str, int] = {}
+        self._types: List[str] = []
+
+        # Edges
+        self._edge_index: Dict[str, int] = {}
+        self._edge_ids: List[str] = []
+        self._edge_src = array("i")
+        self._edge_dst = array("i")
+        self._edge_pred = array("H")
+        self._edge_props: List[Optional[str]] = []
+        self._edge_created: List[datetime] = []
+        self._edge_alive = bytearray()
+        self._pred_codes: Dict[str, int] = {}
+        self._preds: List[str] = []
+        self._edge_weights: Dict[str, array] = {}  # Parsed numeric edge property, per property name
+
+        # CSR arrays and deltas for edges added since the last compaction
+        self._out_offsets = array("i", [0])
+        self._out_edges = array("i")
+        self._in_offsets = array("i", [0])
+        self._in_edges = array("i")
+        self._csr_nodes = 0
+        self._delta_out: Dict[int, List[int]] = {}
+        self._delta_in: Dict[int, List[int]] = {}
+        self._delta_count = 0
+
+        self._string_bytes = 0
+        self._entity_high_water: Optional[datetime] = None
+        self._relationship_high_water: Optional[datetime] = None
+
+    # ==================== Encoding ====================
+
+    def _code(self, value: str, codes: Dict[str, int], values: List[str]) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = len(values)
+            codes[value] = code
+            values.append(value)
+        return code
+
+    def _upsert_node(self, entity_id: str, entity_type: str, label: str, props: Optional[str]) -> int:
+        type_code = self._code(entity_type, self._type_codes, self._types)
+        idx = self._node_index.get(entity_id)
+        if idx is None:
+            idx = len(self._node_ids)
+            self._node_index[entity_id] = idx
+            self._node_ids.append(entity_id)
+            self._node_type.append(type_code)
+            self._node_label.append(label)
+            self._node_props.append(props)
+            self._node_alive.append(1)
+            self._string_bytes += sys.getsizeof(entity_id) + sys.getsizeof(label) + sys.getsizeof(props)
+        else:
+            self._string_bytes += sys.getsizeof(label) + sys.getsizeof(props)
+            self._string_bytes -= sys.getsizeof(self._node_label[idx]) + sys.getsizeof(self._node_props[idx])
+            self._node_type[idx] = type_code
+            self._node_label[idx] = label
+            self._node_props[idx] = props
+            self._node_alive[idx] = 1
+        return idx
+
+    def _add_edge(
+        self,
+        relationship_id: str,
+        subject_id: str,
+        predicate: str,
+        object_id: str,
+        props: Optional[str],
+        created_at: datetime
+    ) -> Optional[int]:
+        if relationship_id in self._edge_index:
+            return None
+        src = self._node_index.get(subject_id)
+        dst = self._node_index.get(object_id)
+        if src is None or dst is None:
+            # Dangling endpoint; not traversable (matches the SQL engines' join to ENTITIES)
+            return None
+        idx = len(self._edge_ids)
+        self._edge_index[relationship_id] = idx
+        self._edge_ids.append(relationship_id)
+        self._edge_src.append(src)
+        self._edge_dst.append(dst)
+        self._edge_pred.append(self._code(predicate, self._pred_codes, self._preds))
+        self._edge_props.append(props)
+        self._edge_created.append(created_at)
+        self._edge_alive.append(1)
+        self._string_bytes += sys.getsizeof(relationship_id) + sys.getsizeof(props)
+        return idx
+
+    def _compact(self):
+        """Rebuild the CSR arrays from the edge arrays and clear the deltas"""
+        node_count = len(self._node_ids)
+        self._out_offsets, self._out_edges = self._build_csr(self._edge_src, node_count)
+        self._in_offsets, self._in_edges = self._build_csr(self._edge_dst, node_count)
+        self._csr_nodes = node_count
+        self._delta_out = {}
+        self._delta_in = {}
+        self._delta_count = 0
+
+    def _build_csr(self, keys: array, node_count: int) -> Tuple[array, array]:
+        counts = array("i", bytes(4 * (node_count + 1)))
+        for edge_idx, key in enumerate(keys):
+            if self._edge_alive[edge_idx]:
+                counts[key + 1] += 1
+        for i in range(node_count):
+            counts[i + 1] += counts[i]
+        offsets = array("i", counts)
+        edges = array("i", bytes(4 * offsets[node_count]))
+        cursor = array("i", offsets)
+        for edge_idx, key in enumerate(keys):
+            if self._edge_alive[edge_idx]:
+                edges[cursor[key]] = edge_idx
+                cursor[key] += 1
+        return offsets, edges
+
+    def _append_delta(self, edge_idx: int):
+        self._delta_out.setdefault(self._edge_src[edge_idx], []).append(edge_idx)
+        self._delta_in.setdefault(self._edge_dst[edge_idx], []).append(edge_idx)
+        self._delta_count += 1
+        if self._delta_count >= self.compact_threshold:
+            self._compact()
+
+    # ==================== Loading ====================
+
+    def build(self):
+        """Load the full graph from the warehouse and build the CSR arrays"""
+        start = time.monotonic()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT ENTITY_ID, ENTITY_TYPE, LABEL, PROPERTIES, UPDATED_AT
+                FROM ENTITIES
+            """)
+            entity_rows = cursor.fetchall()
+            cursor.execute("""
+                SELECT RELATIONSHIP_ID, SUBJECT_ID, PREDICATE, OBJECT_ID, PROPERTIES, CREATED_AT
+                FROM RELATIONSHIPS
+            """)
+            relationship_rows = cursor.fetchall()
+            cursor.close()
+
+        with self._lock:
+            self._reset()
+            for entity_id, entity_type, label, props, updated_at in entity_rows:
+                self._upsert_node(entity_id, entity_type, label, props)
+                if updated_at and (self._entity_high_water is None or updated_at > self._entity_high_water):
+                    self._entity_high_water = updated_at
+            for rel_id, subj_id, pred, obj_id, props, created_at in relationship_rows:
+                self._add_edge(rel_id, subj_id, pred, obj_id, props, created_at)
+                if created_at and (self._relationship_high_water is None or created_at > self._relationship_high_water):
+                    self._relationship_high_water = created_at
+            self._compact()
+            self.ready = True
+            self.last_build_at = time.monotonic()
+            self.last_refresh_at = self.last_build_at
+            self.last_build_seconds = self.last_build_at - start
+
+        logger.info(
+            f"Adjacency index built: {len(self._node_ids)} entities, {len(self._edge_ids)} relationships "
+            f"in {self.last_build_seconds:.2f}s"
+        )
+
+    def refresh(self):
+        """Pull entities and relationships written since the last high-water marks"""
+        if not self.ready:
+            return self.build()
+
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT ENTITY_ID, ENTITY_TYPE, LABEL, PROPERTIES, UPDATED_AT
+                FROM ENTITIES
+                WHERE UPDATED_AT >= %s
+            """, (self._entity_high_water or datetime.min,))
+            entity_rows = cursor.fetchall()
+            cursor.execute("""
+                SELECT RELATIONSHIP_ID, SUBJECT_ID, PREDICATE, OBJECT_ID, PROPERTIES, CREATED_AT
+                FROM RELATIONSHIPS
+                WHERE CREATED_AT >= %s
+            """, (self._relationship_high_water or datetime.min,))
+            relationship_rows = cursor.fetchall()
+            cursor.close()
+
+        with self._lock:
+            for entity_id, entity_type, label, props, updated_at in entity_rows:
+                self._upsert_node(entity_id, entity_type, label, props)
+                if updated_at and (self._entity_high_water is None or updated_at > self._entity_high_water):
+                    self._entity_high_water = updated_at
+            for rel_id, subj_id, pred, obj_id, props, created_at in relationship_rows:
+                edge_idx = self._add_edge(rel_id, subj_id, pred, obj_id, props, created_at)
+                if edge_idx is not None:
+                    self._append_delta(edge_idx)
+                if created_at and (self._relationship_high_water is None or created_at > self._relationship_high_water):
+                    self._relationship_high_water = created_at
+            self.last_refresh_at = time.monotonic()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if not self.ready or (
+                    self.rebuild_interval > 0
+                    and time.monotonic() - self.last_build_at >= self.rebuild_interval
+                ):
+                    self.build()
+                else:
+                    self.refresh()
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.error(f"Adjacency index refresh failed: {e}")
+            self._stop.wait(self.refresh_interval)
+
+    def start(self):
+        """Build the index and keep it fresh on a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="adjacency-index", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # ==================== Write-through ====================
+
+    def upsert_entity(self, entity_id: str, entity_type: str, label: str, properties: Dict[str, Any]):
+        with self._lock:
+            self._upsert_node(entity_id, entity_type, label, json.dumps(properties))
+
+    def remove_entity(self, entity_id: str):
+        with self._lock:
+            idx = self._node_index.get(entity_id)
+            if idx is None:
+                return
+            self._node_alive[idx] = 0
+            for edge_idx in list(self._edges(idx, "both")):
+                self._edge_alive[edge_idx] = 0
+
+    def add_relationship(self, relationship: RelationshipResponse):
+        with self._lock:
+            edge_idx = self._add_edge(
+                relationship.relationship_id,
+                relationship.subject_id,
+                relationship.predicate,
+                relationship.object_id,
+                json.dumps(relationship.properties),
+                relationship.created_at
+            )
+            if edge_idx is not None:
+                self._append_delta(edge_idx)
+
+    def add_relationship_rows(self, rows: List[Tuple[str, str, str, str, Optional[str], datetime]]):
+        """Bulk write-through of (relationship_id, subject_id, predicate, object_id, properties JSON, created_at)"""
+        with self._lock:
+            for row in rows:
+                edge_idx = self._add_edge(*row)
+                if edge_idx is not None:
+                    self._append_delta(edge_idx)
+
+    def remove_relationship(self, relationship_id: str):
+        with self._lock:
+            edge_idx = self._edge_index.get(relationship_id)
+            if edge_idx is not None:
+                self._edge_alive[edge_idx] = 0
+
+    # ==================== Reads ====================
+
+    def _edges(self, node: int, direction: str) -> Iterator[int]:
+        """Live edge indices incident to a node in the given direction"""
+        if direction in ("outgoing", "both"):
+            if node < self._csr_nodes:
+                for i in range(self._out_offsets[node], self._out_offsets[node + 1]):
+                    edge_idx = self._out_edges[i]
+                    if self._edge_alive[edge_idx]:
+                        yield edge_idx
+            for edge_idx in self._delta_out.get(node, ()):
+                if self._edge_alive[edge_idx]:
+                    yield edge_idx
+        if direction in ("incoming", "both"):
+            if node < self._csr_nodes:
+                for i in range(self._in_offsets[node], self._in_offsets[node + 1]):
+                    edge_idx = self._in_edges[i]
+                    if self._edge_alive[edge_idx]:
+                        yield edge_idx
+            for edge_idx in self._delta_in.get(node, ()):
+                if self._edge_alive[edge_idx]:
+                    yield edge_idx
+
+    def _node_dict(self, idx: int, depth: int) -> Dict[str, Any]:
+        props = self._node_props[idx]
+        return {
+            "entity_id": self._node_ids[idx],
+            "entity_type": self._types[self._node_type[idx]],
+            "label": self._node_label[idx],
+            "properties": json.loads(props) if props else {},
+            "depth": depth
+        }
+
+    def _edge_dict(self, edge_idx: int) -> Dict[str, Any]:
+        props = self._edge_props[edge_idx]
+        return {
+            "relationship_id": self._edge_ids[edge_idx],
+            "subject_id": self._node_ids[self._edge_src[edge_idx]],
+            "predicate": self._preds[self._edge_pred[edge_idx]],
+            "object_id": self._node_ids[self._edge_dst[edge_idx]],
+            "properties": json.loads(props) if props else {}
+        }
+
+    def query_graph(self, query: GraphQuery, max_nodes: int, max_edges: int) -> Dict[str, Any]:
+        """Breadth-first neighborhood expansion with the same semantics as the SQL engines"""
+        with self._lock:
+            start = self._node_index.get(query.start_entity_id)
+            if start is None or not self._node_alive[start]:
+                return {"nodes": [], "edges": [], "total_nodes": 0, "total_edges": 0, "truncated": False}
+
+            # Translate filters to integer codes; unknown names can never match
+            allowed_preds = (
+                {self._pred_codes.get(p, -1) for p in query.relationship_types}
+                if query.relationship_types else None
+            )
+            allowed_types = (
+                {self._type_codes.get(t, -1) for t in query.entity_types}
+                if query.entity_types else None
+            )
+            hop_preds = [self._pred_codes.get(p, -1) for p in query.hop_predicates] if query.hop_predicates else None
+            max_depth = min(query.max_depth, len(hop_preds)) if hop_preds else query.max_depth
+
+            depths = {start: 0}
+            edge_set = set()
+            frontier = [start]
+            truncated = False
+            for depth in range(1, max_depth + 1):
+                if not frontier or truncated:
+                    break
+                hop_pred = hop_preds[depth - 1] if hop_preds else None
+                next_frontier = []
+                for node in frontier:
+                    for edge_idx in self._edges(node, query.direction):
+                        pred = self._edge_pred[edge_idx]
+                        if allowed_preds is not None and pred not in allowed_preds:
+                            continue
+                        if hop_pred is not None and pred != hop_pred:
+                            continue
+                        src = self._edge_src[edge_idx]
+                        neighbor = self._edge_dst[edge_idx] if src == node else src
+                        if not self._node_alive[neighbor]:
+                            continue
+                        if allowed_types is not None and self._node_type[neighbor] not in allowed_types:
+                            continue
+                        if neighbor not in depths:
+                            if query.max_fanout is not None and len(next_frontier) >= query.max_fanout:
+                                continue
+                            if len(depths) >= max_nodes:
+                                truncated = True
+                                continue
+                            depths[neighbor] = depth
+                            next_frontier.append(neighbor)
+                        if edge_idx not in edge_set:
+                            if len(edge_set) >= max_edges:
+                                truncated = True
+                                continue
+                            edge_set.add(edge_idx)
+                frontier = next_frontier
+
+            nodes = [self._node_dict(idx, depth) for idx, depth in depths.items()]
+            edges = [self._edge_dict(edge_idx) for edge_idx in sorted(edge_set)]
+
+        return {
+            "nodes": nodes,
+            "edges": edges,
+            "total_nodes": len(nodes),
+            "total_edges": len(edges),
+            "truncated": truncated
+        }
+
+    def has_entity(self, entity_id: str) -> bool:
+        with self._lock:
+            idx = self._node_index.get(entity_id)
+            return idx is not None and bool(self._node_alive[idx])
+
+    def expand(
+        self,
+        frontier: List[str],
+        direction: str,
+        relationship_types: Optional[List[str]] = None,
+        weight_property: Optional[str] = None
+    ) -> List[Tuple[str, str, str, float]]:
+        """One-hop neighbors of the frontier as (source_id, relationship_id, neighbor_id, weight).
+
+        The weight is read from the relationship property weight_property and
+        defaults to 1.0 when unset, missing or not numeric.
+        """
+        with self._lock:
+            allowed_preds = (
+                {self._pred_codes.get(p, -1) for p in relationship_types}
+                if relationship_types else None
+            )
+            weights = self._weights(weight_property) if weight_property else None
+            rows = []
+            for entity_id in frontier:
+                node = self._node_index.get(entity_id)
+                if node is None or not self._node_alive[node]:
+                    continue
+                for edge_idx in self._edges(node, direction):
+                    if allowed_preds is not None and self._edge_pred[edge_idx] not in allowed_preds:
+                        continue
+                    src = self._edge_src[edge_idx]
+                    neighbor = self._edge_dst[edge_idx] if src == node else src
+                    if not self._node_alive[neighbor]:
+                        continue
+                    weight = weights[edge_idx] if weights is not None else 1.0
+                    rows.append((entity_id, self._edge_ids[edge_idx], self._node_ids[neighbor], weight))
+            return rows
+
+    def _weights(self, weight_property: str) -> array:
+        """Per-edge values of a numeric relationship property, parsed once and extended as edges are added"""
+        weights = self._edge_weights.setdefault(weight_property, array("d"))
+        for edge_idx in range(len(weights), len(self._edge_ids)):
+            weights.append(_numeric_property(self._edge_props[edge_idx], weight_property))
+        return weights
+
+    def path_details(
+        self,
+        entity_ids: List[str],
+        relationship_ids: List[str]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Node and edge payloads for a path, in path order"""
+        with self._lock:
+            nodes = [
+                self._node_dict(self._node_index[entity_id], depth)
+                for depth, entity_id in enumerate(entity_ids)
+            ]
+            edges = [self._edge_dict(self._edge_index[rel_id]) for rel_id in relationship_ids]
+        return nodes, edges
+
+    def list_relationships(
+        self,
+        entity_id: str,
+        predicate: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, str]] = None
+    ) -> List[RelationshipResponse]:
+        """Relationships where the entity is subject or object, newest first, optionally past a (created_at, id) cursor"""
+        with self._lock:
+            node = self._node_index.get(entity_id)
+            if node is None:
+                return []
+            pred_code = self._pred_codes.get(predicate) if predicate else None
+            if predicate and pred_code is None:
+                return []
+            matches = {
+                edge_idx for edge_idx in self._edges(node, "both")
+                if pred_code is None or self._edge_pred[edge_idx] == pred_code
+            }
+            keyed = [((self._edge_created[edge_idx], self._edge_ids[edge_idx]), edge_idx) for edge_idx in matches]
+            if after is not None:
+                keyed = [item for item in keyed if item[0] < after]
+            ordered = [edge_idx for _, edge_idx in sorted(keyed, reverse=True)[:limit]]
+            return [
+                RelationshipResponse(created_at=self._edge_created[edge_idx], **self._edge_dict(edge_idx))
+                for edge_idx in ordered
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Size, memory and staleness metrics"""
+        with self._lock:
+            arrays = (
+                self._node_type, self._edge_src, self._edge_dst, self._edge_pred,
+                self._out_offsets, self._out_edges, self._in_offsets, self._in_edges
+            )
+            arrays += tuple(self._edge_weights.values())
+            array_bytes = sum(a.itemsize * len(a) for a in arrays)
+            array_bytes += len(self._node_alive) + len(self._edge_alive)
+            # Per-slot pointer cost of the Python lists and dicts
+            pointer_bytes = 8 * (4 * len(self._node_ids) + 4 * len(self._edge_ids))
+            now = time.monotonic()
+            return {
+                "ready": self.ready,
+                "entities": len(self._node_ids) - self._node_alive.count(0),
+                "relationships": len(self._edge_ids) - self._edge_alive.count(0),
+                "predicates": len(self._preds),
+                "delta_relationships": self._delta_count,
+                "memory_bytes": array_bytes + pointer_bytes + self._string_bytes,
+                "staleness_seconds": round(now - self.last_refresh_at, 3) if self.last_refresh_at else None,
+                "last_build_seconds": round(self.last_build_seconds, 3) if self.last_build_seconds else None,
+                "refresh_errors": self.refresh_errors
+            }
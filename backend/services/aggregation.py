@@ -0,0 +1,295 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from models import CalculationRule
+
+AGGREGATE_FUNCTIONS = ("SUM", "AVG", "MIN", "MAX", "COUNT")
+SCALAR_FUNCTIONS = ("ROUND", "ABS")
+
+_TOKEN = re.compile(
+    r"\s*(?:(\d+(?:\.\d+)?)"
+    r"|([A-Za-z_][A-Za-z0-9_]*(?:\[[A-Za-z0-9_]+\])?(?:\.[A-Za-z0-9_]+)*"
+    r"|\*(?:\[[A-Za-z0-9_]+\](?:\.[A-Za-z0-9_]+)*|(?:\.[A-Za-z0-9_]+)+))"
+    r"|(.))"
+)
+# ORDER, ORDER.amount, ORDER[PLACED].amount, *.amount
+_RELATED = re.compile(r"([A-Za-z0-9_]+|\*)(?:\[([A-Za-z0-9_]+)\])?(?:\.([A-Za-z0-9_.]+))?$")
+
+# Nodes are tuples: ("num", value), ("term", index), ("field", name), ("neg", node),
+# ("bin", op, left, right) and ("call", name, [args])
+Node = Tuple[Any, ...]
+
+
+class Term:
+    """A value computed per entity by the aggregation query: an aggregate over related entities or an own property"""
+
+    def __init__(
+        self,
+        function: Optional[str],
+        path: Optional[str],
+        entity_type: Optional[str] = None,
+        predicate: Optional[str] = None
+    ):
+        self.function = function
+        self.path = path
+        self.entity_type = entity_type
+        self.predicate = predicate
+
+    @property
+    def key(self) -> Tuple[Any, ...]:
+        return (self.function, self.path, self.entity_type, self.predicate)
+
+    def sql(self) -> Tuple[str, List[Any]]:
+        if self.function is None:
+            return "ANY_VALUE(TRY_TO_DOUBLE(GET_PATH(s.PROPERTIES, %s)::VARCHAR))", [self.path]
+
+        conditions = []
+        params: List[Any] = []
+        if self.entity_type != "*":
+            conditions.append("rel.ENTITY_TYPE = %s")
+            params.append(self.entity_type)
+        if self.predicate is not None:
+            conditions.append("rel.PREDICATE = %s")
+            params.append(self.predicate)
+        if self.function == "COUNT" and self.path is None:
+            return f"COUNT_IF({' AND '.join(conditions) or 'rel.ENTITY_TYPE IS NOT NULL'})", params
+
+        value = "TRY_TO_DOUBLE(GET_PATH(rel.PROPERTIES, %s)::VARCHAR)"
+        params.append(self.path)
+        if conditions:
+            value = f"CASE WHEN {' AND '.join(conditions)} THEN {value} END"
+        if self.function == "SUM":
+            # A total over no related entities is 0 rather than null
+            return f"COALESCE(SUM({value}), 0)", params
+        return f"{self.function}({value})", params
+
+
+class _Parser:
+    """Recursive-descent parser for one formula; terms are shared across all formulas of a config"""
+
+    def __init__(self, formula: str, terms: Dict[Tuple[Any, ...], int], term_list: List[Term], fields: Sequence[str]):
+        self.formula = formula
+        self.terms = terms
+        self.term_list = term_list
+        self.fields = fields
+        self.tokens = []
+        for number, name, symbol in _TOKEN.findall(formula):
+            if number or name or symbol.strip():
+                self.tokens.append(("num", number) if number else ("name", name) if name else ("sym", symbol))
+        self.position = 0
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(f"{message} in formula {self.formula!r}")
+
+    def peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self) -> Tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise self.error("Unexpected end")
+        self.position += 1
+        return token
+
+    def expect(self, symbol: str):
+        if self.take() != ("sym", symbol):
+            raise self.error(f"Expected {symbol!r}")
+
+    def parse(self) -> Node:
+        node = self.expression()
+        if self.peek() is not None:
+            raise self.error(f"Unexpected {self.peek()[1]!r}")
+        return node
+
+    def expression(self) -> Node:
+        node = self.product()
+        while self.peek() in (("sym", "+"), ("sym", "-")):
+            node = ("bin", self.take()[1], node, self.product())
+        return node
+
+    def product(self) -> Node:
+        node = self.factor()
+        while self.peek() in (("sym", "*"), ("sym", "/")):
+            node = ("bin", self.take()[1], node, self.factor())
+        return node
+
+    def factor(self) -> Node:
+        kind, text = self.take()
+        if kind == "num":
+            return ("num", float(text))
+        if (kind, text) == ("sym", "-"):
+            return ("neg", self.factor())
+        if (kind, text) == ("sym", "("):
+            node = self.expression()
+            self.expect(")")
+            return node
+        if kind != "name":
+            raise self.error(f"Unexpected {text!r}")
+
+        name = text.upper()
+        if self.peek() == ("sym", "("):
+            self.take()
+            if name in AGGREGATE_FUNCTIONS:
+                node = self.aggregate(name)
+            elif name in SCALAR_FUNCTIONS:
+                args = [self.expression()]
+                while self.peek() == ("sym", ","):
+                    self.take()
+                    args.append(self.expression())
+                node = ("call", name, args)
+            else:
+                raise self.error(f"Unknown function {text}")
+            self.expect(")")
+            return node
+        if text.startswith("properties."):
+            return self.term(Term(None, text[len("properties."):]))
+        if text in self.fields:
+            return ("field", text)
+        raise self.error(f"Unknown name {text!r} (use properties.{text} for a property of the entity)")
+
+    def aggregate(self, function: str) -> Node:
+        kind, text = self.take()
+        match = _RELATED.match(text) if kind in ("name", "sym") else None
+        if match is None:
+            raise self.error(f"{function} expects a related entity type such as ORDER.amount")
+        entity_type, predicate, path = match.groups()
+        if path is None and function != "COUNT":
+            raise self.error(f"{function}({text}) needs a property, e.g. {text}.amount")
+        return self.term(Term(function, path, entity_type, predicate))
+
+    def term(self, term: Term) -> Node:
+        if term.key not in self.terms:
+            self.terms[term.key] = len(self.term_list)
+            self.term_list.append(term)
+        return ("term", self.terms[term.key])
+
+
+def _evaluate(node: Node, columns: np.ndarray, fields: Dict[str, np.ndarray]) -> np.ndarray:
+    kind = node[0]
+    if kind == "num":
+        return np.full(columns.shape[0], node[1])
+    if kind == "term":
+        return columns[:, node[1]]
+    if kind == "field":
+        return fields[node[1]]
+    if kind == "neg":
+        return -_evaluate(node[1], columns, fields)
+    if kind == "call":
+        args = [_evaluate(arg, columns, fields) for arg in node[2]]
+        if node[1] == "ABS":
+            return np.abs(args[0])
+        return np.round(args[0], int(args[1][0]) if len(args) > 1 else 0)
+
+    left = _evaluate(node[2], columns, fields)
+    right = _evaluate(node[3], columns, fields)
+    op = node[1]
+    if op == "+":
+        return left + right
+    if op == "-":
+        return left - right
+    if op == "*":
+        return left * right
+    # Division by zero gives null, as NULLIF would in SQL
+    result = np.full(left.shape, np.nan)
+    np.divide(left, right, out=result, where=right != 0)
+    return result
+
+
+class Aggregation:
+    """Calculation rules compiled into one aggregation query plus vectorized formulas.
+
+    sql() computes every distinct aggregate and own-property term for a
+    batch of entities in a single GROUP BY over RELATIONSHIPS (in both
+    directions) joined to ENTITIES. evaluate() then applies the formulas to
+    those columns with NumPy, one array operation per formula node for the
+    whole batch. Null terms are NaN, and a NaN result is stored as null.
+    """
+
+    def __init__(self, calculations: List[CalculationRule]):
+        if not calculations:
+            raise ValueError("At least one calculation is required")
+        self.terms: List[Term] = []
+        self.formulas: List[Tuple[str, Node]] = []
+        keys: Dict[Tuple[Any, ...], int] = {}
+        fields: List[str] = []
+        for rule in calculations:
+            if rule.field in fields:
+                raise ValueError(f"Duplicate calculation field {rule.field}")
+            # A formula can use the fields of the rules before it
+            self.formulas.append((rule.field, _Parser(rule.formula, keys, self.terms, fields).parse()))
+            fields.append(rule.field)
+        if not self.terms:
+            raise ValueError("Calculations must use at least one aggregate or property")
+
+    @property
+    def fields(self) -> List[str]:
+        return [field for field, _ in self.formulas]
+
+    def sql(self, entity_ids: Sequence[str]) -> Tuple[str, List[Any]]:
+        """Aggregation query returning (ENTITY_ID, term...) for each of entity_ids that exists"""
+        related_types = {term.entity_type for term in self.terms if term.function is not None}
+        type_filter = ""
+        type_params: List[Any] = []
+        if related_types and "*" not in related_types:
+            type_filter = f" WHERE e.ENTITY_TYPE IN ({', '.join(['%s'] * len(related_types))})"
+            type_params = sorted(related_types)
+
+        columns = []
+        column_params: List[Any] = []
+        for term in self.terms:
+            sql, params = term.sql()
+            columns.append(sql)
+            column_params.extend(params)
+
+        related = ""
+        related_join = ""
+        related_params: List[Any] = []
+        if related_types:
+            related = f""",
+                related AS (
+                    SELECT r.SUBJECT_ID AS SOURCE_ID, r.PREDICATE, e.ENTITY_TYPE, e.PROPERTIES
+                    FROM RELATIONSHIPS r
+                    JOIN targets t ON t.ENTITY_ID = r.SUBJECT_ID
+                    JOIN ENTITIES e ON e.ENTITY_ID = r.OBJECT_ID{type_filter}
+                    UNION ALL
+                    SELECT r.OBJECT_ID, r.PREDICATE, e.ENTITY_TYPE, e.PROPERTIES
+                    FROM RELATIONSHIPS r
+                    JOIN targets t ON t.ENTITY_ID = r.OBJECT_ID
+                    JOIN ENTITIES e ON e.ENTITY_ID = r.SUBJECT_ID{type_filter}
+                )"""
+            related_join = "LEFT JOIN related rel ON rel.SOURCE_ID = t.ENTITY_ID"
+            related_params = type_params + type_params
+
+        sql = f"""
+            WITH targets AS (
+                SELECT column1 AS ENTITY_ID FROM VALUES {", ".join(["(%s)"] * len(entity_ids))}
+            ){related}
+            SELECT t.ENTITY_ID, {", ".join(columns)}
+            FROM targets t
+            JOIN ENTITIES s ON s.ENTITY_ID = t.ENTITY_ID
+            {related_join}
+            GROUP BY t.ENTITY_ID
+        """
+        return sql, list(entity_ids) + related_params + column_params
+
+    def evaluate(self, rows: Sequence[Sequence[Any]]) -> Dict[str, Dict[str, Optional[float]]]:
+        """Apply the formulas to the rows of sql(); returns {entity_id: {field: value}}"""
+        if not rows:
+            return {}
+        columns = np.array([row[1:] for row in rows], dtype=float).reshape(len(rows), len(self.terms))
+        values: Dict[str, np.ndarray] = {}
+        with np.errstate(invalid="ignore", over="ignore"):
+            for field, node in self.formulas:
+                values[field] = _evaluate(node, columns, values)
+
+        metrics: Dict[str, Dict[str, Optional[float]]] = {}
+        for position, row in enumerate(rows):
+            metrics[row[0]] = {field: _to_json(values[field][position]) for field in values}
+        return metrics
+
+
+def _to_json(value: float) -> Optional[float]:
+    if not np.isfinite(value):
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() else value
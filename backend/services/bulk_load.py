@@ -0,0 +1,137 @@
+import csv
+import logging
+import os
+import tempfile
+import uuid
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# CSV written for staged loads; JSON columns are plain text and parsed on insert
+_CSV_FILE_FORMAT = (
+    "TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY = '\"' "
+    "ESCAPE_UNENCLOSED_FIELD = NONE EMPTY_FIELD_AS_NULL = FALSE NULL_IF = ('\\\\N')"
+)
+
+# Supplied IDs per existence check
+_ID_CHECK_BATCH_SIZE = 1000
+
+
+def insert_values(
+    cursor,
+    insert_sql: str,
+    select_list: str,
+    rows: Sequence[Sequence[Any]],
+    batch_size: int
+) -> Dict[int, str]:
+    """Insert rows with multi-row INSERT ... SELECT ... FROM VALUES statements.
+
+    insert_sql is the "INSERT INTO T (cols)" prefix and select_list the
+    projection over VALUES columns (column1, column2, ...), where PARSE_JSON
+    and other transformations go. A failing batch is retried row by row so
+    that errors can be attributed; returns {row position: error}.
+    """
+    errors: Dict[int, str] = {}
+    if not rows:
+        return errors
+    row_placeholder = "({})".format(", ".join(["%s"] * len(rows[0])))
+
+    def execute(batch: Sequence[Sequence[Any]]):
+        sql = f"{insert_sql} SELECT {select_list} FROM VALUES {', '.join([row_placeholder] * len(batch))}"
+        cursor.execute(sql, [value for row in batch for value in row])
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        try:
+            execute(batch)
+        except Exception as e:
+            logger.warning(f"Bulk insert batch at row {start} failed, retrying rows individually: {e}")
+            for offset, row in enumerate(batch):
+                try:
+                    execute([row])
+                except Exception as row_error:
+                    errors[start + offset] = str(row_error)
+    return errors
+
+
+def create_temp_table(cursor, prefix: str, column_defs: str) -> str:
+    """Create a uniquely named session temporary table and return its name"""
+    table = f"{prefix}_{uuid.uuid4().hex[:12].upper()}"
+    cursor.execute(f"CREATE TEMPORARY TABLE {table} ({column_defs})")
+    return table
+
+
+def copy_into_temp_table(cursor, table: str, rows: Sequence[Sequence[Any]]) -> Dict[int, str]:
+    """Load rows into a temporary table through its table stage.
+
+    Writes a local CSV, PUTs it to @%table and runs COPY INTO with
+    ON_ERROR = CONTINUE and PURGE. Rejected rows are read back with VALIDATE;
+    returns {row position: error}.
+    """
+    fd, path = tempfile.mkstemp(prefix="bulk_", suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            for row in rows:
+                writer.writerow(["\\N" if value is None else value for value in row])
+
+        cursor.execute(f"PUT 'file://{path}' @%{table} AUTO_COMPRESS = TRUE OVERWRITE = TRUE")
+        cursor.execute(f"""
+            COPY INTO {table}
+            FROM @%{table}
+            FILE_FORMAT = ({_CSV_FILE_FORMAT})
+            ON_ERROR = CONTINUE
+            PURGE = TRUE
+        """)
+        results = cursor.fetchall()
+        errors_seen = sum(row[5] or 0 for row in results if len(row) > 5)
+    finally:
+        os.remove(path)
+
+    errors: Dict[int, str] = {}
+    if errors_seen:
+        cursor.execute(f"SELECT ROW_NUMBER, ERROR FROM TABLE(VALIDATE({table}, JOB_ID => '_last'))")
+        for row_number, error in cursor.fetchall():
+            errors[int(row_number) - 1] = error
+    return errors
+
+
+def duplicate_ids(cursor, table: str, column: str, ids: Sequence[Optional[str]]) -> Dict[int, str]:
+    """Find supplied IDs that repeat within the batch or already exist in table; returns {row position: error}.
+
+    None marks a row whose ID will be generated. Snowflake does not enforce
+    primary keys, so without this check re-sending a feed would insert its
+    IDs a second time.
+    """
+    errors: Dict[int, str] = {}
+    first: Dict[str, int] = {}
+    for position, value in enumerate(ids):
+        if value is None:
+            continue
+        if value in first:
+            errors[position] = f"Duplicate {column} {value} within the batch"
+        else:
+            first[value] = position
+
+    supplied = list(first)
+    for start in range(0, len(supplied), _ID_CHECK_BATCH_SIZE):
+        chunk = supplied[start:start + _ID_CHECK_BATCH_SIZE]
+        cursor.execute(
+            f"SELECT {column} FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(chunk))})",
+            chunk
+        )
+        for (value,) in cursor.fetchall():
+            errors[first[value]] = f"{column} {value} already exists"
+    return errors
+
+
+def split_rows(rows: List[Tuple[int, Any]], errors: Dict[int, str]) -> Tuple[List[Tuple[int, Any]], List[Dict[str, Any]]]:
+    """Separate (index, row) pairs into loaded rows and per-row error records by position"""
+    loaded = []
+    failed = []
+    for position, (index, row) in enumerate(rows):
+        if position in errors:
+            failed.append({"index": index, "error": errors[position]})
+        else:
+            loaded.append((index, row))
+    return loaded, failed
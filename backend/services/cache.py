@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+from pydantic import BaseModel
+
+# Per-entry bookkeeping on top of the serialized size
+_ENTRY_OVERHEAD_BYTES = 200
+
+# Recent per-key invalidations remembered for rejecting stale loads
+_MAX_TRACKED_INVALIDATIONS = 4096
+
+# Invalidation key meaning "every entry in the namespace"
+ALL_KEYS = "*"
+
+
+def approximate_size(value: Any) -> int:
+    """Rough in-memory footprint of a cached value, from its JSON size"""
+    if isinstance(value, BaseModel):
+        return len(value.model_dump_json()) + _ENTRY_OVERHEAD_BYTES
+    return len(str(value)) + _ENTRY_OVERHEAD_BYTES
+
+
+class TTLCache:
+    """Thread-safe LRU cache bounded by bytes, whose entries expire ttl_seconds after they were stored.
+
+    Loaders read generation() before querying and pass it to put(); a put
+    from a load that overlapped an invalidation of its key is dropped, so a
+    stale row read before a write cannot repopulate the cache after it.
+    max_bytes = 0 disables the cache.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl_seconds: float,
+        size_of: Callable[[Any], int] = approximate_size
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.size_of = size_of
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+
+        # Invalidation clock: last invalidation per recent key, and the clock
+        # below which invalidations are no longer tracked individually
+        self._clock = 0
+        self._invalidated: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._invalidated_floor = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def generation(self) -> int:
+        return self._clock
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """The cached value, or None if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        if self.max_bytes <= 0:
+            return
+        size = self.size_of(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and (
+                generation < self._invalidated_floor or self._invalidated.get(key, -1) > generation
+            ):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._clock += 1
+            self.invalidations += 1
+            self._invalidated[key] = self._clock
+            self._invalidated.move_to_end(key)
+            if len(self._invalidated) > _MAX_TRACKED_INVALIDATIONS:
+                _, forgotten = self._invalidated.popitem(last=False)
+                self._invalidated_floor = forgotten
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._clock += 1
+            self._invalidated.clear()
+            self._invalidated_floor = self._clock
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller runs the function; callers arriving while it is in
+    flight wait for and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def forget(self, key: Hashable):
+        """Make the next caller start a fresh call instead of joining one in flight (e.g. after a write)"""
+        with self._lock:
+            self._calls.pop(key, None)
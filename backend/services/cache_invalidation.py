@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from database import SnowflakeConnection
+from services.cache import TTLCache, ALL_KEYS
+
+logger = logging.getLogger(__name__)
+
+# Re-read this far behind the last poll so rows committed late are not missed
+_POLL_OVERLAP = timedelta(seconds=10)
+
+# Invalidation rows older than this are deleted
+_RETENTION = timedelta(hours=1)
+
+_INSERT_BATCH_SIZE = 1000
+
+
+class CacheInvalidationBus:
+    """Cross-process cache invalidation through the CACHE_INVALIDATIONS table.
+
+    Each process registers its caches under a namespace ("entity", "state",
+    "workflow"). publish() queues a (namespace, key) pair, where ALL_KEYS
+    clears the namespace. Every poll_interval seconds a background thread
+    inserts the queued pairs and applies the ones published by other
+    processes, so other workers see a write within about one poll interval
+    instead of after the cache TTL.
+    """
+
+    def __init__(self, db: SnowflakeConnection, poll_interval: float = 2.0):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.origin = uuid.uuid4().hex
+
+        self._caches: Dict[str, TTLCache] = {}
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, str]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._watermark: Optional[datetime] = None
+        self._seen: Dict[str, datetime] = {}
+        self._last_cleanup = 0.0
+
+        self.published = 0
+        self.applied = 0
+        self.errors = 0
+
+    def register(self, namespace: str, cache: TTLCache):
+        self._caches[namespace] = cache
+
+    def publish(self, namespace: str, key: str):
+        with self._lock:
+            self._pending.append((namespace, key))
+
+    def _flush(self, cursor):
+        with self._lock:
+            pending, self._pending = list(dict.fromkeys(self._pending)), []
+        if not pending:
+            return
+        try:
+            for start in range(0, len(pending), _INSERT_BATCH_SIZE):
+                batch = pending[start:start + _INSERT_BATCH_SIZE]
+                cursor.execute(
+                    "INSERT INTO CACHE_INVALIDATIONS (INVALIDATION_ID, ORIGIN, NAMESPACE, CACHE_KEY, INVALIDATED_AT) "
+                    "SELECT column1, column2, column3, column4, CURRENT_TIMESTAMP()::TIMESTAMP_NTZ FROM VALUES "
+                    + ", ".join(["(%s, %s, %s, %s)"] * len(batch)),
+                    [value for namespace, key in batch for value in (uuid.uuid4().hex, self.origin, namespace, key)]
+                )
+        except Exception:
+            # Keep them for the next attempt
+            with self._lock:
+                self._pending = pending + self._pending
+            raise
+        self.published += len(pending)
+
+    def _poll(self, cursor):
+        if self._watermark is None:
+            # Start from now; anything older is already bounded by the cache TTLs
+            cursor.execute("SELECT CURRENT_TIMESTAMP()::TIMESTAMP_NTZ")
+            self._watermark = cursor.fetchone()[0]
+            return
+
+        cursor.execute("""
+            SELECT INVALIDATION_ID, NAMESPACE, CACHE_KEY, INVALIDATED_AT
+            FROM CACHE_INVALIDATIONS
+            WHERE INVALIDATED_AT >= %s AND ORIGIN != %s
+        """, (self._watermark - _POLL_OVERLAP, self.origin))
+
+        for invalidation_id, namespace, key, invalidated_at in cursor.fetchall():
+            if invalidation_id in self._seen:
+                continue
+            self._seen[invalidation_id] = invalidated_at
+            cache = self._caches.get(namespace)
+            if cache is not None:
+                if key == ALL_KEYS:
+                    cache.clear()
+                else:
+                    cache.invalidate(key)
+                self.applied += 1
+            if invalidated_at > self._watermark:
+                self._watermark = invalidated_at
+
+        horizon = self._watermark - _POLL_OVERLAP
+        self._seen = {seen_id: at for seen_id, at in self._seen.items() if at >= horizon}
+
+    def _cleanup(self, cursor):
+        if time.monotonic() - self._last_cleanup < _RETENTION.total_seconds():
+            return
+        self._last_cleanup = time.monotonic()
+        cursor.execute("""
+            DELETE FROM CACHE_INVALIDATIONS
+            WHERE INVALIDATED_AT < DATEADD(second, %s, CURRENT_TIMESTAMP()::TIMESTAMP_NTZ)
+        """, (-int(_RETENTION.total_seconds()),))
+
+    def sync(self):
+        """Publish queued invalidations and apply other processes' since the last sync"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            self._flush(cursor)
+            self._poll(cursor)
+            self._cleanup(cursor)
+            conn.commit()
+            cursor.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Cache invalidation sync failed: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            # Last chance for invalidations queued since the final poll
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                self._flush(cursor)
+                conn.commit()
+                cursor.close()
+        except Exception as e:
+            logger.error(f"Cache invalidation flush on shutdown failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "published": self.published,
+            "applied": self.applied,
+            "errors": self.errors
+        }
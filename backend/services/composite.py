@@ -0,0 +1,154 @@
+import time
+from concurrent.futures import Executor, FIRST_COMPLETED, Future, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from models import ActionType, CompositeConfig, CompositeStep
+
+FAILURE_MODES = ("ROLLBACK", "CONTINUE", "STOP")
+
+
+class CompositeFailure(Exception):
+    """A composite workflow failed; output holds the per-step results"""
+
+    def __init__(self, message: str, output: Dict[str, Any]):
+        super().__init__(message)
+        self.output = output
+
+
+class StepResult:
+    """Outcome and timing of one composite step"""
+
+    def __init__(self, step: CompositeStep):
+        self.step = step
+        self.status = "SKIPPED"
+        self.output: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.started_at: Optional[datetime] = None
+        self.completed_at: Optional[datetime] = None
+        self.duration_ms = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "step": self.step.step,
+            "action": self.step.action.value,
+            "status": self.status,
+            "output": self.output,
+            "error": self.error,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "duration_ms": round(self.duration_ms, 1)
+        }
+
+
+def timed(step: CompositeStep, run: Callable[[], Dict[str, Any]]) -> StepResult:
+    """Run a step, capturing its output or error and timings"""
+    result = StepResult(step)
+    result.started_at = datetime.utcnow()
+    start = time.monotonic()
+    try:
+        result.output = run()
+        result.status = "COMPLETED"
+    except Exception as e:
+        result.error = str(e)
+        result.status = "FAILED"
+    result.duration_ms = (time.monotonic() - start) * 1000
+    result.completed_at = datetime.utcnow()
+    return result
+
+
+def plan(config: CompositeConfig) -> List[CompositeStep]:
+    """Validate the step graph and return the steps in a topological order (ties by step number).
+
+    Raises ValueError for duplicate step numbers, unknown dependencies,
+    cycles, nested COMPOSITE steps or an unknown on_failure mode.
+    """
+    if config.on_failure.upper() not in FAILURE_MODES:
+        raise ValueError(f"on_failure must be one of {', '.join(FAILURE_MODES)}")
+    steps = {}
+    for step in config.steps:
+        if step.step in steps:
+            raise ValueError(f"Duplicate composite step {step.step}")
+        if step.action == ActionType.COMPOSITE:
+            raise ValueError(f"Composite step {step.step} cannot itself be COMPOSITE")
+        steps[step.step] = step
+    for step in steps.values():
+        for dependency in step.depends_on or []:
+            if dependency not in steps:
+                raise ValueError(f"Composite step {step.step} depends on unknown step {dependency}")
+
+    remaining = {number: set(step.depends_on or []) for number, step in steps.items()}
+    order = []
+    while remaining:
+        ready = sorted(number for number, deps in remaining.items() if not deps)
+        if not ready:
+            raise ValueError(f"Composite steps {sorted(remaining)} have a dependency cycle")
+        for number in ready:
+            order.append(steps[number])
+            del remaining[number]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+
+def run_dag(
+    order: List[CompositeStep],
+    run_step: Callable[[CompositeStep, Dict[int, StepResult]], StepResult],
+    stop_on_failure: bool,
+    executor: Optional[Executor] = None
+) -> Dict[int, StepResult]:
+    """Run steps as soon as their dependencies have completed.
+
+    With an executor, ready steps run concurrently on it, so the total
+    time is the critical path rather than the sum of the steps; without
+    one they run one at a time in the given order. Dependents of a failed
+    step are skipped; with stop_on_failure no further steps are started.
+    run_step receives the results so far and must not raise.
+    """
+    results: Dict[int, StepResult] = {}
+    waiting = {step.step: set(step.depends_on or []) for step in order}
+    by_number = {step.step: step for step in order}
+    ready = [step.step for step in order if not waiting[step.step]]
+    running: Dict[Future, int] = {}
+    stopped = False
+
+    def settle(result: StepResult):
+        nonlocal stopped
+        number = result.step.step
+        results[number] = result
+        if result.status == "FAILED" and stop_on_failure:
+            stopped = True
+        for dependent, deps in waiting.items():
+            if number in deps and dependent not in results:
+                deps.discard(number)
+                if result.status != "COMPLETED":
+                    # Skipped in turn, which releases its own dependents
+                    settle(StepResult(by_number[dependent]))
+                elif not deps:
+                    ready.append(dependent)
+
+    while (ready and not stopped) or running:
+        while ready and not stopped:
+            number = ready.pop(0)
+            if executor is None:
+                settle(run_step(by_number[number], results))
+            else:
+                running[executor.submit(run_step, by_number[number], dict(results))] = number
+        if running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                settle(future.result())
+
+    for step in order:
+        if step.step not in results:
+            results[step.step] = StepResult(step)
+    return results
+
+
+def critical_path_ms(order: List[CompositeStep], results: Dict[int, StepResult]) -> float:
+    """Longest chain of step durations through the dependency graph"""
+    finish: Dict[int, float] = {}
+    for step in order:
+        start = max((finish[dep] for dep in step.depends_on or []), default=0.0)
+        finish[step.step] = start + results[step.step].duration_ms
+    return round(max(finish.values(), default=0.0), 1)
@@ -0,0 +1,255 @@
+import hashlib
+import json
+from abc import ABC, abstractmethod
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set
+from database import SnowflakeConnection
+from services.cache import TTLCache
+
+_INSERT_BATCH_SIZE = 500
+
+# In-process entries live at most this long; each read also checks the config's cache_duration_days
+_MAX_CACHE_SECONDS = 365 * 24 * 3600.0
+
+
+class EnrichmentProvider(ABC):
+    """A source of enrichment data.
+
+    lookup() receives distinct lookup values and returns a record (field ->
+    value) for each value it knows; values it leaves out are cached as
+    having no data.
+    """
+
+    @abstractmethod
+    def lookup(self, values: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class StubProvider(EnrichmentProvider):
+    """Local provider for testing: fixed records, or values derived from a hash of the lookup value.
+
+    latency simulates the round-trip of a remote source, once per call.
+    """
+
+    def __init__(self, records: Optional[Dict[str, Dict[str, Any]]] = None, latency: float = 0.0):
+        self.records = records
+        self.latency = latency
+        self.calls = 0
+
+    def lookup(self, values: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.records is not None:
+            return {value: self.records[value] for value in values if value in self.records}
+        found = {}
+        for value in values:
+            digest = hashlib.sha1(value.encode()).hexdigest()
+            found[value] = {
+                "industry": ("Technology", "Finance", "Retail", "Healthcare")[int(digest[:2], 16) % 4],
+                "employee_count": int(digest[2:6], 16),
+                "country": ("US", "GB", "DE", "JP")[int(digest[6:8], 16) % 4],
+                "verified": True
+            }
+        return found
+
+
+class _Batch:
+    def __init__(self):
+        self.values: Set[str] = set()
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.result: Dict[str, Dict[str, Any]] = {}
+        self.error: Optional[BaseException] = None
+
+
+class EnrichmentEngine:
+    """Looks up enrichment records through a two-tier cache and batched provider calls.
+
+    Records are cached by (data source, lookup value) in an in-process LRU
+    and in the ENRICHMENT_CACHE table, and are served while younger than
+    the caller's cache_duration_days. Values missing from both are fetched
+    from the provider in batches: the first caller to miss opens a batch,
+    waits batch_window seconds (or until max_batch values) for concurrent
+    executions to add their values, then reads the table and calls the
+    provider for all of them, deduplicated, in calls of at most max_batch
+    values.
+    """
+
+    def __init__(
+        self,
+        db: SnowflakeConnection,
+        cache_max_bytes: int = 16 * 1024 * 1024,
+        batch_window: float = 0.05,
+        max_batch: int = 500
+    ):
+        self.db = db
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.providers: Dict[str, EnrichmentProvider] = {"stub": StubProvider()}
+
+        self._cache = TTLCache(cache_max_bytes, _MAX_CACHE_SECONDS)
+        self._lock = threading.Lock()
+        self._open: Dict[Hashable, _Batch] = {}
+
+        self.lookups = 0
+        self.memory_hits = 0
+        self.table_hits = 0
+        self.provider_values = 0
+        self.provider_calls = 0
+        self.batches = 0
+        self.errors = 0
+
+    def register_provider(self, data_source: str, provider: EnrichmentProvider):
+        self.providers[data_source] = provider
+
+    def lookup(self, data_source: str, values: Sequence[str], cache_duration_days: int) -> Dict[str, Dict[str, Any]]:
+        """Records for the distinct values ({} where the source has no data)"""
+        provider = self.providers.get(data_source)
+        if provider is None:
+            raise ValueError(f"No enrichment provider registered for data source {data_source!r}")
+        values = list(dict.fromkeys(values))
+        max_age = timedelta(days=cache_duration_days)
+        now = datetime.utcnow()
+
+        records: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for value in values:
+            cached = self._cache.get((data_source, value)) if cache_duration_days else None
+            if cached is not None and now - cached[0] < max_age:
+                records[value] = cached[1]
+            else:
+                missing.append(value)
+        with self._lock:
+            self.lookups += len(values)
+            self.memory_hits += len(values) - len(missing)
+        if missing:
+            records.update(self._load_batched(data_source, provider, missing, cache_duration_days))
+        return records
+
+    def _load_batched(
+        self,
+        data_source: str,
+        provider: EnrichmentProvider,
+        values: List[str],
+        cache_duration_days: int
+    ) -> Dict[str, Dict[str, Any]]:
+        key = (data_source, cache_duration_days)
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch()
+            batch.values.update(values)
+            if len(batch.values) >= self.max_batch:
+                # Later callers start a new batch
+                self._open.pop(key, None)
+                batch.full.set()
+
+        if leader:
+            # No wait when this caller alone filled the batch
+            if not batch.full.is_set():
+                batch.full.wait(self.batch_window)
+            with self._lock:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+            try:
+                batch.result = self._load(data_source, provider, sorted(batch.values), cache_duration_days)
+            except BaseException as e:
+                batch.error = e
+                with self._lock:
+                    self.errors += 1
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return {value: batch.result.get(value, {}) for value in values}
+
+    def _load(
+        self,
+        data_source: str,
+        provider: EnrichmentProvider,
+        values: List[str],
+        cache_duration_days: int
+    ) -> Dict[str, Dict[str, Any]]:
+        """Read the table tier, then fetch the rest from the provider and store them in both tiers"""
+        records: Dict[str, Dict[str, Any]] = {}
+        if cache_duration_days:
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(values), _INSERT_BATCH_SIZE):
+                    chunk = values[start:start + _INSERT_BATCH_SIZE]
+                    cursor.execute(f"""
+                        SELECT LOOKUP_VALUE, DATA, FETCHED_AT
+                        FROM ENRICHMENT_CACHE
+                        WHERE DATA_SOURCE = %s
+                          AND LOOKUP_VALUE IN ({', '.join(['%s'] * len(chunk))})
+                          AND FETCHED_AT >= %s
+                    """, [data_source] + chunk + [datetime.utcnow() - timedelta(days=cache_duration_days)])
+                    for value, data, fetched_at in cursor.fetchall():
+                        records[value] = json.loads(data) if data else {}
+                        self._cache.put((data_source, value), (fetched_at, records[value]))
+                cursor.close()
+
+        missing = [value for value in values if value not in records]
+        calls = 0
+        for start in range(0, len(missing), self.max_batch):
+            chunk = missing[start:start + self.max_batch]
+            found = provider.lookup(chunk)
+            calls += 1
+            fetched = {value: found.get(value) or {} for value in chunk}
+            records.update(fetched)
+            if cache_duration_days:
+                self._store(data_source, fetched)
+
+        with self._lock:
+            self.batches += 1
+            self.table_hits += len(values) - len(missing)
+            self.provider_values += len(missing)
+            self.provider_calls += calls
+        return records
+
+    def _store(self, data_source: str, fetched: Dict[str, Dict[str, Any]]):
+        now = datetime.utcnow()
+        rows = [(data_source, value, json.dumps(record), now) for value, record in fetched.items()]
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(rows), _INSERT_BATCH_SIZE):
+                batch = rows[start:start + _INSERT_BATCH_SIZE]
+                cursor.execute(f"""
+                    MERGE INTO ENRICHMENT_CACHE c
+                    USING (
+                        SELECT column1 AS DATA_SOURCE, column2 AS LOOKUP_VALUE,
+                               PARSE_JSON(column3) AS DATA, column4 AS FETCHED_AT
+                        FROM VALUES {", ".join(["(%s, %s, %s, %s)"] * len(batch))}
+                    ) f
+                    ON c.DATA_SOURCE = f.DATA_SOURCE AND c.LOOKUP_VALUE = f.LOOKUP_VALUE
+                    WHEN MATCHED THEN UPDATE SET DATA = f.DATA, FETCHED_AT = f.FETCHED_AT
+                    WHEN NOT MATCHED THEN INSERT (DATA_SOURCE, LOOKUP_VALUE, DATA, FETCHED_AT)
+                        VALUES (f.DATA_SOURCE, f.LOOKUP_VALUE, f.DATA, f.FETCHED_AT)
+                """, [value for row in batch for value in row])
+            # No commit: autocommitted, or part of the calling workflow's transaction inside one
+            cursor.close()
+        for value, record in fetched.items():
+            self._cache.put((data_source, value), (now, record))
+
+    def stats(self) -> Dict[str, Any]:
+        # Values served without the provider, counting those shared with a concurrent execution's batch
+        served = self.lookups - self.provider_values
+        return {
+            "lookups": self.lookups,
+            "memory_hits": self.memory_hits,
+            "table_hits": self.table_hits,
+            "provider_values": self.provider_values,
+            "provider_calls": self.provider_calls,
+            "batches": self.batches,
+            "hit_rate": round(served / self.lookups, 4) if self.lookups else None,
+            "memory_hit_rate": round(self.memory_hits / self.lookups, 4) if self.lookups else None,
+            "errors": self.errors,
+            "cache": self._cache.stats()
+        }
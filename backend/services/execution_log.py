@@ -0,0 +1,168 @@
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from database import SnowflakeConnection
+from models import WorkflowExecution
+
+logger = logging.getLogger(__name__)
+
+_INSERT_BATCH_SIZE = 500
+
+# EVENT_SEQ of the event written when an execution is queued
+ENQUEUED_SEQ = 0
+
+
+def event_seq(attempt: int, finished: bool) -> int:
+    """Orders an execution's events: queued (0), then started/finished for each attempt (0-based)"""
+    return 2 * attempt + (2 if finished else 1)
+
+
+class ExecutionLogWriter:
+    """Appends workflow execution events to WORKFLOW_EXECUTION_EVENTS in batches.
+
+    Every event is a full snapshot of the execution (status, input, output,
+    error, times) with an EVENT_SEQ; the WORKFLOW_EXECUTION_LOG view keeps
+    the highest one per execution, so the table is only ever inserted into.
+    Once started, a background thread flushes the buffer as multi-row
+    INSERTs every flush_interval seconds, or as soon as batch_size events
+    are waiting. Before start() (and after stop()) every event is written
+    immediately.
+
+    A crash loses the events still in the buffer: at most batch_size events
+    or flush_interval seconds of them while the warehouse is reachable, and
+    at most max_buffered while flushes are failing, after which the oldest
+    are dropped. Losing an event only leaves an execution showing the
+    status of its previous event. record() never raises on a failed write.
+    """
+
+    def __init__(
+        self,
+        db: SnowflakeConnection,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_buffered: int = 50000
+    ):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer: List[Tuple[Any, ...]] = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.recorded = 0
+        self.written = 0
+        self.flushes = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def record(self, execution: WorkflowExecution, seq: int):
+        event = (
+            execution.execution_id,
+            seq,
+            execution.workflow_id,
+            execution.entity_id,
+            execution.status.value,
+            json.dumps(execution.input_data),
+            json.dumps(execution.output_data) if execution.output_data is not None else None,
+            execution.error_message,
+            execution.started_at,
+            execution.completed_at,
+            datetime.utcnow()
+        )
+        with self._lock:
+            self._buffer.append(event)
+            self.recorded += 1
+            full = len(self._buffer) >= self.batch_size
+        if self._thread is None:
+            # The action has already run; a failed write mustn't fail the execution. The events stay
+            # buffered for the next flush.
+            try:
+                self.flush()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Execution log write failed, {len(self._buffer)} events buffered: {e}")
+        elif full:
+            self._wake.set()
+
+    def _insert(self, events: List[Tuple[Any, ...]]):
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(events), _INSERT_BATCH_SIZE):
+                batch = events[start:start + _INSERT_BATCH_SIZE]
+                cursor.execute(
+                    "INSERT INTO WORKFLOW_EXECUTION_EVENTS (EXECUTION_ID, EVENT_SEQ, WORKFLOW_ID, ENTITY_ID, STATUS, "
+                    "INPUT_DATA, OUTPUT_DATA, ERROR_MESSAGE, STARTED_AT, COMPLETED_AT, EVENT_AT) "
+                    "SELECT column1, column2, column3, column4, column5, PARSE_JSON(column6), PARSE_JSON(column7), "
+                    "column8, column9, column10, column11 FROM VALUES "
+                    + ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(batch)),
+                    [value for event in batch for value in event]
+                )
+            conn.commit()
+            cursor.close()
+
+    def flush(self) -> int:
+        """Write everything buffered; returns the number of events written"""
+        with self._flush_lock:
+            with self._lock:
+                events, self._buffer = self._buffer, []
+            if not events:
+                return 0
+            try:
+                self._insert(events)
+            except Exception:
+                with self._lock:
+                    # Keep them for the next flush, dropping the oldest beyond max_buffered
+                    self._buffer = events + self._buffer
+                    overflow = len(self._buffer) - self.max_buffered
+                    if overflow > 0:
+                        del self._buffer[:overflow]
+                        self.dropped += overflow
+                raise
+            self.written += len(events)
+            self.flushes += 1
+            return len(events)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Execution log flush failed: {e}")
+                # Don't let a full buffer retry on every record while the warehouse is down
+                self._stop.wait(self.flush_interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="execution-log", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Execution log flush on shutdown failed, {len(self._buffer)} events lost: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "buffered": len(self._buffer),
+            "recorded": self.recorded,
+            "written": self.written,
+            "flushes": self.flushes,
+            "dropped": self.dropped,
+            "errors": self.errors
+        }
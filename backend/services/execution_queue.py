@@ -0,0 +1,427 @@
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from database import SnowflakeConnection
+
+logger = logging.getLogger(__name__)
+
+
+class QueuedExecution:
+    """A workflow execution waiting in (or claimed from) the queue; attempts counts earlier failed runs"""
+
+    def __init__(
+        self,
+        execution_id: str,
+        workflow_id: str,
+        entity_id: str,
+        input_data: Dict[str, Any],
+        attempts: int = 0
+    ):
+        self.execution_id = execution_id
+        self.workflow_id = workflow_id
+        self.entity_id = entity_id
+        self.input_data = input_data
+        self.attempts = attempts
+
+
+class QueueBackend(ABC):
+    """Durable storage for queued executions.
+
+    claim() hands out up to limit available executions to one worker and
+    must not give the same execution to two callers; a claim is removed by
+    ack(), returned with a delay by retry(), returned as-is by release(), or
+    returned by release_stale() once it is older than the claim timeout
+    (the claiming process died).
+    """
+
+    @abstractmethod
+    def enqueue(self, executions: Sequence[QueuedExecution]):
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim(self, worker_id: str, limit: int, exclude_workflows: Sequence[str]) -> List[QueuedExecution]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def ack(self, execution_id: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def retry(self, execution_id: str, delay_seconds: float):
+        raise NotImplementedError
+
+    @abstractmethod
+    def release(self, execution_id: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def release_stale(self, claim_timeout_seconds: float) -> int:
+        raise NotImplementedError
+
+
+class SQLiteQueueBackend(QueueBackend):
+    """Queue in a local SQLite file: durable across restarts of this host, not shared between hosts"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS execution_queue (
+                execution_id TEXT PRIMARY KEY,
+                workflow_id TEXT NOT NULL,
+                entity_id TEXT NOT NULL,
+                input_data TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                claimed_by TEXT,
+                claimed_at REAL,
+                enqueued_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS execution_queue_available ON execution_queue (claimed_by, available_at)"
+        )
+
+    def enqueue(self, executions: Sequence[QueuedExecution]):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO execution_queue (execution_id, workflow_id, entity_id, input_data, attempts, "
+                "available_at, enqueued_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (e.execution_id, e.workflow_id, e.entity_id, json.dumps(e.input_data), e.attempts, now, now)
+                    for e in executions
+                ]
+            )
+
+    def claim(self, worker_id: str, limit: int, exclude_workflows: Sequence[str]) -> List[QueuedExecution]:
+        now = time.time()
+        query = """
+            SELECT execution_id, workflow_id, entity_id, input_data, attempts
+            FROM execution_queue
+            WHERE claimed_by IS NULL AND available_at <= ?
+        """
+        params: List[Any] = [now]
+        if exclude_workflows:
+            query += f" AND workflow_id NOT IN ({', '.join('?' * len(exclude_workflows))})"
+            params.extend(exclude_workflows)
+        query += " ORDER BY enqueued_at LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(query, params).fetchall()
+                self._conn.executemany(
+                    "UPDATE execution_queue SET claimed_by = ?, claimed_at = ? WHERE execution_id = ?",
+                    [(worker_id, now, row[0]) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [QueuedExecution(row[0], row[1], row[2], json.loads(row[3]), row[4]) for row in rows]
+
+    def ack(self, execution_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM execution_queue WHERE execution_id = ?", (execution_id,))
+
+    def retry(self, execution_id: str, delay_seconds: float):
+        with self._lock:
+            self._conn.execute("""
+                UPDATE execution_queue
+                SET attempts = attempts + 1, available_at = ?, claimed_by = NULL, claimed_at = NULL
+                WHERE execution_id = ?
+            """, (time.time() + delay_seconds, execution_id))
+
+    def release(self, execution_id: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE execution_queue SET claimed_by = NULL, claimed_at = NULL WHERE execution_id = ?",
+                (execution_id,)
+            )
+
+    def release_stale(self, claim_timeout_seconds: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE execution_queue SET claimed_by = NULL, claimed_at = NULL "
+                "WHERE claimed_by IS NOT NULL AND claimed_at < ?",
+                (time.time() - claim_timeout_seconds,)
+            )
+            return cursor.rowcount
+
+
+class SnowflakeQueueBackend(QueueBackend):
+    """Queue in the WORKFLOW_EXECUTION_QUEUE table, shared by every worker process.
+
+    Claims are a single UPDATE tagging rows with a per-claim token; Snowflake
+    serializes DML on a table, so concurrent claimers cannot take the same row.
+    """
+
+    def __init__(self, db: SnowflakeConnection):
+        self.db = db
+
+    def enqueue(self, executions: Sequence[QueuedExecution]):
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO WORKFLOW_EXECUTION_QUEUE (EXECUTION_ID, WORKFLOW_ID, ENTITY_ID, INPUT_DATA, ATTEMPTS, "
+                "AVAILABLE_AT, ENQUEUED_AT) "
+                "SELECT column1, column2, column3, PARSE_JSON(column4), column5, "
+                "CURRENT_TIMESTAMP()::TIMESTAMP_NTZ, CURRENT_TIMESTAMP()::TIMESTAMP_NTZ FROM VALUES "
+                + ", ".join(["(%s, %s, %s, %s, %s)"] * len(executions)),
+                [
+                    value for e in executions
+                    for value in (e.execution_id, e.workflow_id, e.entity_id, json.dumps(e.input_data), e.attempts)
+                ]
+            )
+            conn.commit()
+            cursor.close()
+
+    def claim(self, worker_id: str, limit: int, exclude_workflows: Sequence[str]) -> List[QueuedExecution]:
+        token = f"{worker_id}:{uuid.uuid4().hex}"
+        subquery = """
+            SELECT EXECUTION_ID FROM WORKFLOW_EXECUTION_QUEUE
+            WHERE CLAIMED_BY IS NULL AND AVAILABLE_AT <= CURRENT_TIMESTAMP()::TIMESTAMP_NTZ
+        """
+        params: List[Any] = [token]
+        if exclude_workflows:
+            subquery += f" AND WORKFLOW_ID NOT IN ({', '.join(['%s'] * len(exclude_workflows))})"
+            params.extend(exclude_workflows)
+        subquery += " ORDER BY ENQUEUED_AT LIMIT %s"
+        params.append(limit)
+
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                UPDATE WORKFLOW_EXECUTION_QUEUE
+                SET CLAIMED_BY = %s, CLAIMED_AT = CURRENT_TIMESTAMP()::TIMESTAMP_NTZ
+                WHERE CLAIMED_BY IS NULL AND EXECUTION_ID IN ({subquery})
+            """, params)
+            claimed = cursor.rowcount
+            conn.commit()
+            if not claimed:
+                cursor.close()
+                return []
+            cursor.execute("""
+                SELECT EXECUTION_ID, WORKFLOW_ID, ENTITY_ID, INPUT_DATA, ATTEMPTS
+                FROM WORKFLOW_EXECUTION_QUEUE
+                WHERE CLAIMED_BY = %s
+                ORDER BY ENQUEUED_AT
+            """, (token,))
+            rows = cursor.fetchall()
+            cursor.close()
+        return [QueuedExecution(row[0], row[1], row[2], json.loads(row[3]) if row[3] else {}, row[4]) for row in rows]
+
+    def _execute(self, query: str, params: Sequence[Any]) -> int:
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rowcount = cursor.rowcount
+            conn.commit()
+            cursor.close()
+            return rowcount
+
+    def ack(self, execution_id: str):
+        self._execute("DELETE FROM WORKFLOW_EXECUTION_QUEUE WHERE EXECUTION_ID = %s", (execution_id,))
+
+    def retry(self, execution_id: str, delay_seconds: float):
+        self._execute("""
+            UPDATE WORKFLOW_EXECUTION_QUEUE
+            SET ATTEMPTS = ATTEMPTS + 1,
+                AVAILABLE_AT = DATEADD(millisecond, %s, CURRENT_TIMESTAMP()::TIMESTAMP_NTZ),
+                CLAIMED_BY = NULL,
+                CLAIMED_AT = NULL
+            WHERE EXECUTION_ID = %s
+        """, (int(delay_seconds * 1000), execution_id))
+
+    def release(self, execution_id: str):
+        self._execute(
+            "UPDATE WORKFLOW_EXECUTION_QUEUE SET CLAIMED_BY = NULL, CLAIMED_AT = NULL WHERE EXECUTION_ID = %s",
+            (execution_id,)
+        )
+
+    def release_stale(self, claim_timeout_seconds: float) -> int:
+        return self._execute("""
+            UPDATE WORKFLOW_EXECUTION_QUEUE
+            SET CLAIMED_BY = NULL, CLAIMED_AT = NULL
+            WHERE CLAIMED_BY IS NOT NULL
+              AND CLAIMED_AT < DATEADD(second, %s, CURRENT_TIMESTAMP()::TIMESTAMP_NTZ)
+        """, (-int(claim_timeout_seconds),))
+
+
+def create_queue_backend(kind: str, db: SnowflakeConnection, sqlite_path: str) -> QueueBackend:
+    if kind == "snowflake":
+        return SnowflakeQueueBackend(db)
+    if kind == "sqlite":
+        return SQLiteQueueBackend(sqlite_path)
+    raise ValueError(f"Unknown execution queue backend: {kind}")
+
+
+class ExecutionQueue:
+    """Runs queued workflow executions on a pool of worker threads.
+
+    A dispatcher thread claims executions whenever a worker is free (woken
+    by enqueue() and finished runs, or every poll_interval seconds for work
+    queued by other processes), never running more than workflow_concurrency
+    executions of one workflow at a time in this process. The handler is
+    called with (execution, last_attempt) and raises on failure; failed runs
+    are retried after an exponential backoff until max_attempts. Delivery is
+    at least once: a run whose process dies before ack is retried once its
+    claim is older than claim_timeout.
+    """
+
+    def __init__(
+        self,
+        backend: QueueBackend,
+        workers: int = 4,
+        workflow_concurrency: int = 2,
+        max_attempts: int = 3,
+        retry_base_seconds: float = 2.0,
+        retry_max_seconds: float = 300.0,
+        poll_interval: float = 2.0,
+        claim_timeout: float = 600.0
+    ):
+        self.backend = backend
+        self.workers = workers
+        self.workflow_concurrency = workflow_concurrency
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.worker_id = uuid.uuid4().hex
+
+        self._handler: Optional[Callable[[QueuedExecution, bool], Any]] = None
+        self._lock = threading.Lock()
+        self._running: Dict[str, int] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._last_stale_check = 0.0
+
+        self.enqueued = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.errors = 0
+
+    def enqueue(self, executions: Sequence[QueuedExecution]):
+        if not executions:
+            return
+        self.backend.enqueue(executions)
+        self.enqueued += len(executions)
+        self._wake.set()
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.retry_base_seconds * (2 ** (attempts - 1)), self.retry_max_seconds)
+        return delay * random.uniform(0.8, 1.2)
+
+    def _execute(self, execution: QueuedExecution):
+        last_attempt = execution.attempts + 1 >= self.max_attempts
+        try:
+            try:
+                self._handler(execution, last_attempt)
+            except Exception as e:
+                if last_attempt:
+                    logger.error(f"Execution {execution.execution_id} failed after {self.max_attempts} attempts: {e}")
+                    self.failed += 1
+                    self.backend.ack(execution.execution_id)
+                else:
+                    self.retried += 1
+                    self.backend.retry(execution.execution_id, self._backoff(execution.attempts + 1))
+            else:
+                self.completed += 1
+                self.backend.ack(execution.execution_id)
+        except Exception as e:
+            # The claim stays in place and is retried after claim_timeout
+            self.errors += 1
+            logger.error(f"Execution queue update for {execution.execution_id} failed: {e}")
+        finally:
+            with self._lock:
+                self._running[execution.workflow_id] -= 1
+                if not self._running[execution.workflow_id]:
+                    del self._running[execution.workflow_id]
+            self._wake.set()
+
+    def _dispatch(self) -> int:
+        """Claim and start executions for the free workers; returns how many were started"""
+        with self._lock:
+            free = self.workers - sum(self._running.values())
+            saturated = [w for w, count in self._running.items() if count >= self.workflow_concurrency]
+        if free <= 0:
+            return 0
+
+        started = 0
+        for execution in self.backend.claim(self.worker_id, free, saturated):
+            with self._lock:
+                running = self._running.get(execution.workflow_id, 0)
+                accepted = running < self.workflow_concurrency
+                if accepted:
+                    self._running[execution.workflow_id] = running + 1
+                    started += 1
+            if not accepted:
+                # Over the per-workflow limit within this claim; leave it for a later one
+                self.backend.release(execution.execution_id)
+                continue
+            self._pool.submit(self._execute, execution)
+        return started
+
+    def _release_stale(self):
+        if time.monotonic() - self._last_stale_check < self.claim_timeout / 2:
+            return
+        self._last_stale_check = time.monotonic()
+        released = self.backend.release_stale(self.claim_timeout)
+        if released:
+            logger.warning(f"Re-queued {released} executions with expired claims")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self._release_stale()
+                started = self._dispatch()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Execution queue dispatch failed: {e}")
+                started = 0
+            if not started:
+                self._wake.wait(self.poll_interval)
+
+    def start(self, handler: Callable[[QueuedExecution, bool], Any]):
+        if self._thread is None:
+            self._handler = handler
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="workflow-worker")
+            self._thread = threading.Thread(target=self._run, name="execution-queue", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop claiming and wait for running executions to finish"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": sum(self._running.values()),
+            "enqueued": self.enqueued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "errors": self.errors
+        }
@@ -0,0 +1,239 @@
+import heapq
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+# expand(frontier_ids, direction) -> [(source_id, relationship_id, neighbor_id, weight), ...]
+Expand = Callable[[List[str], str], List[Tuple[str, str, str, float]]]
+
+REVERSE_DIRECTION = {"outgoing": "incoming", "incoming": "outgoing", "both": "both"}
+
+
+def _expired(deadline: Optional[float]) -> bool:
+    """Whether the time.monotonic() deadline of a search has passed"""
+    return deadline is not None and time.monotonic() >= deadline
+
+
+class PathSearchResult:
+    """Outcome of a path search: the node/relationship sequence if found.
+
+    exhausted means the search gave up (visit budget or deadline) before
+    finding a path or ruling one out.
+    """
+
+    def __init__(
+        self,
+        node_ids: Optional[List[str]] = None,
+        relationship_ids: Optional[List[str]] = None,
+        cost: Optional[float] = None,
+        visited: int = 0,
+        exhausted: bool = False
+    ):
+        self.node_ids = node_ids
+        self.relationship_ids = relationship_ids
+        self.cost = cost
+        self.visited = visited
+        self.exhausted = exhausted
+
+    @property
+    def found(self) -> bool:
+        return self.node_ids is not None
+
+
+def _walk(parents: Dict[str, Optional[Tuple[str, str]]], node: str) -> Tuple[List[str], List[str]]:
+    """Follow parent pointers from node back to the search root"""
+    nodes = [node]
+    rels = []
+    while parents[node] is not None:
+        node, rel = parents[node]
+        nodes.append(node)
+        rels.append(rel)
+    return nodes, rels
+
+
+def bidirectional_bfs(
+    expand: Expand,
+    source: str,
+    target: str,
+    direction: str,
+    max_depth: int,
+    max_visited: int,
+    deadline: Optional[float] = None
+) -> PathSearchResult:
+    """Unweighted shortest path, alternately expanding the smaller frontier from each end.
+
+    Each step expands one whole level, so the first level on which the searches
+    meet contains a shortest path; the meeting node minimizing the combined
+    depth is chosen.
+    """
+    if source == target:
+        return PathSearchResult([source], [], cost=0.0, visited=1)
+
+    forward: Dict[str, Optional[Tuple[str, str]]] = {source: None}
+    backward: Dict[str, Optional[Tuple[str, str]]] = {target: None}
+    forward_depth = {source: 0}
+    backward_depth = {target: 0}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    depth_forward = 0
+    depth_backward = 0
+
+    while forward_frontier and backward_frontier and depth_forward + depth_backward < max_depth:
+        if len(forward) + len(backward) > max_visited or _expired(deadline):
+            return PathSearchResult(visited=len(forward) + len(backward), exhausted=True)
+
+        expand_forward = len(forward_frontier) <= len(backward_frontier)
+        if expand_forward:
+            frontier, parents, depths, other_depths = forward_frontier, forward, forward_depth, backward_depth
+            step_direction = direction
+            depth_forward += 1
+            depth = depth_forward
+        else:
+            frontier, parents, depths, other_depths = backward_frontier, backward, backward_depth, forward_depth
+            step_direction = REVERSE_DIRECTION.get(direction, "both")
+            depth_backward += 1
+            depth = depth_backward
+
+        next_frontier = []
+        best_meet = None
+        for src, rel, neighbor, _ in expand(frontier, step_direction):
+            if neighbor in parents:
+                continue
+            parents[neighbor] = (src, rel)
+            depths[neighbor] = depth
+            next_frontier.append(neighbor)
+            if neighbor in other_depths:
+                total = depth + other_depths[neighbor]
+                if best_meet is None or total < best_meet[0]:
+                    best_meet = (total, neighbor)
+
+        if expand_forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+        if best_meet is not None and best_meet[0] <= max_depth:
+            meet = best_meet[1]
+            forward_nodes, forward_rels = _walk(forward, meet)
+            backward_nodes, backward_rels = _walk(backward, meet)
+            node_ids = list(reversed(forward_nodes)) + backward_nodes[1:]
+            relationship_ids = list(reversed(forward_rels)) + backward_rels
+            return PathSearchResult(
+                node_ids, relationship_ids,
+                cost=float(len(relationship_ids)),
+                visited=len(forward) + len(backward)
+            )
+
+    return PathSearchResult(visited=len(forward) + len(backward))
+
+
+def dijkstra(
+    expand: Expand,
+    source: str,
+    target: str,
+    direction: str,
+    max_depth: int,
+    max_visited: int,
+    deadline: Optional[float] = None
+) -> PathSearchResult:
+    """Weighted shortest path (non-negative weights) limited to max_depth hops.
+
+    Search states are (node, hops), since with a hop limit the cheapest way
+    to reach a node is not always one that can still be extended to the
+    target. A state is skipped once the node has been settled with no more
+    hops (and, being settled earlier, no higher cost), so each node is
+    settled at most max_depth + 1 times. All states sharing the lowest cost
+    are settled together and expanded with one expand() call.
+    """
+    State = Tuple[str, int]
+    heap: List[Tuple[float, int, str]] = [(0.0, 0, source)]
+    best: Dict[State, float] = {(source, 0): 0.0}
+    parents: Dict[State, Optional[Tuple[State, str]]] = {(source, 0): None}
+    # Fewest hops each node has been settled with
+    settled_hops: Dict[str, int] = {}
+    settled = 0
+
+    while heap:
+        if _expired(deadline):
+            return PathSearchResult(visited=len(settled_hops), exhausted=True)
+
+        cost = heap[0][0]
+        # Nodes settled at this cost that can still be extended, with their hops
+        frontier: Dict[str, int] = {}
+        while heap and heap[0][0] == cost:
+            _, hops, node = heapq.heappop(heap)
+            if hops >= settled_hops.get(node, max_depth + 1):
+                continue
+            settled_hops[node] = hops
+            settled += 1
+
+            if node == target:
+                node_ids = []
+                relationship_ids = []
+                state: Optional[State] = (node, hops)
+                while state is not None:
+                    node_ids.append(state[0])
+                    parent = parents[state]
+                    if parent is not None:
+                        relationship_ids.append(parent[1])
+                    state = parent[0] if parent is not None else None
+                return PathSearchResult(
+                    list(reversed(node_ids)), list(reversed(relationship_ids)),
+                    cost=cost, visited=len(settled_hops)
+                )
+            if hops < max_depth:
+                frontier[node] = hops
+        if settled > max_visited:
+            return PathSearchResult(visited=len(settled_hops), exhausted=True)
+        if not frontier:
+            continue
+
+        for src, rel, neighbor, weight in expand(list(frontier), direction):
+            if weight < 0:
+                raise ValueError(f"Negative weight on relationship {rel}")
+            hops = frontier[src]
+            new_cost = cost + weight
+            next_state = (neighbor, hops + 1)
+            if hops + 1 < settled_hops.get(neighbor, max_depth + 1) and new_cost < best.get(next_state, float("inf")):
+                best[next_state] = new_cost
+                parents[next_state] = ((src, hops), rel)
+                heapq.heappush(heap, (new_cost, hops + 1, neighbor))
+
+    return PathSearchResult(visited=len(settled_hops))
+
+
+def reachable_within(
+    expand: Expand,
+    source: str,
+    direction: str,
+    max_depth: int,
+    max_visited: int,
+    deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    """Count entities reachable from source within max_depth hops (source excluded)"""
+    visited = {source}
+    frontier = [source]
+    per_depth = []
+    exhausted = False
+
+    for _ in range(max_depth):
+        if not frontier:
+            break
+        if _expired(deadline):
+            exhausted = True
+            break
+        next_frontier = []
+        for _, _, neighbor, _ in expand(frontier, direction):
+            if neighbor not in visited:
+                visited.add(neighbor)
+                next_frontier.append(neighbor)
+        per_depth.append(len(next_frontier))
+        frontier = next_frontier
+        if len(visited) > max_visited:
+            exhausted = True
+            break
+
+    return {
+        "count": len(visited) - 1,
+        "count_by_depth": per_depth,
+        "exhausted": exhausted
+    }
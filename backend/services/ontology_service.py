@@ -1,109 +1,530 @@
 import json
+import logging
+import threading
+import time
 import uuid
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Union
+from config import settings
 from database import SnowflakeConnection
-from models import Entity, EntityResponse, Relationship, RelationshipResponse, GraphQuery
+from models import (
+    Entity, EntityResponse, Relationship, RelationshipResponse,
+    GraphQuery, PathQuery, ReachabilityQuery, PaginatedResponse, EntityFilter
+)
+from services.adjacency_index import AdjacencyIndex
+from services.cache import TTLCache, SingleFlight, ALL_KEYS
+from services.cache_invalidation import CacheInvalidationBus
+from services.bulk_load import insert_values, create_temp_table, copy_into_temp_table, duplicate_ids, split_rows
+from services.entity_search import compile_entity_filter
+from services.graph_paths import Expand, bidirectional_bfs, dijkstra, reachable_within
+from services.pagination import Cursor, decode_cursor, keyset_predicate, build_page
+from services.projection import Projection, ENTITY_COLUMNS, RELATIONSHIP_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Bulk loads with more supplied IDs than this clear the entity cache instead of invalidating each ID
+_MAX_BULK_INVALIDATIONS = 1000
+
+def _adjacency_sql(
+    direction: str,
+    relationship_types: Optional[List[str]] = None,
+    entity_types: Optional[List[str]] = None
+) -> Tuple[str, List[Any]]:
+    """Build the traversal adjacency for a direction with its filters pushed down.
+    
+    Returns one row per traversable (SOURCE_ID -> TARGET_ID) orientation of an
+    edge along with its PREDICATE and the target's ENTITY_TYPE. Edges whose far
+    endpoint is missing from ENTITIES are not traversable.
+    """
+    filters = ""
+    params: List[Any] = []
+    if relationship_types:
+        filters += " AND r.PREDICATE IN ({})".format(", ".join(["%s"] * len(relationship_types)))
+        params.extend(relationship_types)
+    if entity_types:
+        filters += " AND e.ENTITY_TYPE IN ({})".format(", ".join(["%s"] * len(entity_types)))
+        params.extend(entity_types)
+    
+    outgoing = f"""
+        SELECT r.RELATIONSHIP_ID, r.SUBJECT_ID AS SOURCE_ID, r.OBJECT_ID AS TARGET_ID,
+               r.PREDICATE, e.ENTITY_TYPE AS TARGET_TYPE
+        FROM RELATIONSHIPS r
+        JOIN ENTITIES e ON e.ENTITY_ID = r.OBJECT_ID
+        WHERE 1=1{filters}
+    """
+    incoming = f"""
+        SELECT r.RELATIONSHIP_ID, r.OBJECT_ID AS SOURCE_ID, r.SUBJECT_ID AS TARGET_ID,
+               r.PREDICATE, e.ENTITY_TYPE AS TARGET_TYPE
+        FROM RELATIONSHIPS r
+        JOIN ENTITIES e ON e.ENTITY_ID = r.SUBJECT_ID
+        WHERE 1=1{filters}
+    """
+    
+    if direction == "outgoing":
+        return outgoing, params
+    if direction == "incoming":
+        return incoming, params
+    return f"{outgoing} UNION ALL {incoming}", params + params
+
+
+def _entity_response(row: Tuple[Any, ...]) -> EntityResponse:
+    return EntityResponse(
+        entity_id=row[0],
+        entity_type=row[1],
+        label=row[2],
+        properties=json.loads(row[3]) if row[3] else {},
+        tags=json.loads(row[4]) if row[4] else [],
+        created_at=row[5],
+        updated_at=row[6]
+    )
+
+
+def _properties_sql(projection: Optional[Projection], column: str) -> str:
+    return projection.properties_sql(column) if projection is not None else column
+
+
+def _graph_budget(query: GraphQuery) -> Tuple[int, int]:
+    """Node and edge budgets for a query; the configured limits are also the ceiling"""
+    max_nodes = min(query.max_nodes or settings.graph_max_nodes, settings.graph_max_nodes)
+    max_edges = min(query.max_edges or settings.graph_max_edges, settings.graph_max_edges)
+    return max_nodes, max_edges
+
+
+def _effective_max_depth(query: GraphQuery) -> int:
+    """A hop predicate sequence bounds the traversal depth"""
+    if query.hop_predicates:
+        return min(query.max_depth, len(query.hop_predicates))
+    return query.max_depth
+
+
+# Graph statistics in one statement. {degrees} yields (ENTITY_TYPE, DEGREE) per
+# entity and {predicates} yields (PREDICATE, RELATIONSHIP_COUNT); both read the
+# summary dynamic tables, or the base tables as a fallback.
+_GRAPH_STATS_SQL = """
+    WITH degrees AS ({degrees}),
+    predicates AS ({predicates}),
+    degree_stats AS (
+        SELECT
+            SUM(DEGREE)::FLOAT AS DEGREE_SUM,
+            MAX(DEGREE)::FLOAT AS MAX_DEGREE,
+            COUNT_IF(DEGREE = 0)::FLOAT AS ISOLATED,
+            APPROX_PERCENTILE(DEGREE, 0.5)::FLOAT AS P50,
+            APPROX_PERCENTILE(DEGREE, 0.9)::FLOAT AS P90,
+            APPROX_PERCENTILE(DEGREE, 0.99)::FLOAT AS P99
+        FROM degrees
+    )
+    SELECT 'ENTITY_TYPE' AS KIND, ENTITY_TYPE AS NAME, COUNT(*)::FLOAT AS VALUE
+    FROM degrees GROUP BY ENTITY_TYPE
+    UNION ALL
+    SELECT 'PREDICATE', PREDICATE, RELATIONSHIP_COUNT::FLOAT FROM predicates
+    UNION ALL
+    SELECT 'DEGREE', NAME, VALUE
+    FROM degree_stats UNPIVOT (VALUE FOR NAME IN (DEGREE_SUM, MAX_DEGREE, ISOLATED, P50, P90, P99))
+"""
+
+_SUMMARY_DEGREES = """
+    SELECT ENTITY_TYPE, OUTGOING_RELATIONSHIPS + INCOMING_RELATIONSHIPS AS DEGREE
+    FROM ENTITY_RELATIONSHIP_SUMMARY
+"""
+_SUMMARY_PREDICATES = "SELECT PREDICATE, RELATIONSHIP_COUNT FROM PREDICATE_SUMMARY"
+
+_BASE_DEGREES = """
+    SELECT e.ENTITY_TYPE, COALESCE(o.N, 0) + COALESCE(i.N, 0) AS DEGREE
+    FROM ENTITIES e
+    LEFT JOIN (SELECT SUBJECT_ID AS ID, COUNT(*) AS N FROM RELATIONSHIPS GROUP BY SUBJECT_ID) o ON o.ID = e.ENTITY_ID
+    LEFT JOIN (SELECT OBJECT_ID AS ID, COUNT(*) AS N FROM RELATIONSHIPS GROUP BY OBJECT_ID) i ON i.ID = e.ENTITY_ID
+"""
+_BASE_PREDICATES = "SELECT PREDICATE, COUNT(*) AS RELATIONSHIP_COUNT FROM RELATIONSHIPS GROUP BY PREDICATE"
+
+
+class GraphAssembler:
+    """Accumulates traversal results with hashed node/edge deduplication.
+    
+    Rows are keyed by ID in insertion-ordered dicts, so adding is O(1) and nodes
+    come out in discovery (depth) order. PROPERTIES stay as raw JSON strings
+    until result() and are decoded only for rows that are actually returned.
+    """
+    
+    def __init__(self):
+        self.nodes: Dict[str, tuple] = {}
+        self.edges: Dict[str, tuple] = {}
+    
+    def add_node(self, entity_id: str, entity_type: str, label: str, raw_properties: Optional[str], depth: int) -> bool:
+        """Add a node unless already present; returns True if it was new"""
+        if entity_id in self.nodes:
+            return False
+        self.nodes[entity_id] = (entity_type, label, raw_properties, depth)
+        return True
+    
+    def add_edge(self, relationship_id: str, subject_id: str, predicate: str, object_id: str, raw_properties: Optional[str]):
+        if relationship_id not in self.edges:
+            self.edges[relationship_id] = (subject_id, predicate, object_id, raw_properties)
+    
+    def result(self, truncated: bool = False) -> Dict[str, Any]:
+        nodes = [
+            {
+                "entity_id": entity_id,
+                "entity_type": entity_type,
+                "label": label,
+                "properties": json.loads(props) if props else {},
+                "depth": depth
+            }
+            for entity_id, (entity_type, label, props, depth) in self.nodes.items()
+        ]
+        edges = [
+            {
+                "relationship_id": relationship_id,
+                "subject_id": subject_id,
+                "predicate": predicate,
+                "object_id": object_id,
+                "properties": json.loads(props) if props else {}
+            }
+            for relationship_id, (subject_id, predicate, object_id, props) in self.edges.items()
+        ]
+        return {
+            "nodes": nodes,
+            "edges": edges,
+            "total_nodes": len(nodes),
+            "total_edges": len(edges),
+            "truncated": truncated
+        }
 
 
 class OntologyService:
     """Service for managing ontology entities and relationships"""
     
-    def __init__(self, db: SnowflakeConnection):
+    def __init__(
+        self,
+        db: SnowflakeConnection,
+        adjacency_index: Optional[AdjacencyIndex] = None,
+        invalidation_bus: Optional[CacheInvalidationBus] = None
+    ):
         self.db = db
+        self.adjacency_index = adjacency_index
+        self.invalidation_bus = invalidation_bus
+        
+        # Graph stats snapshot plus adjustments from this process's writes since it was loaded
+        self._stats_lock = threading.Lock()
+        self._stats: Optional[Dict[str, Any]] = None
+        self._stats_loaded_at = 0.0
+        
+        # Read-through entity cache, invalidated by this service's writes (and other
+        # workers' through the invalidation bus); concurrent misses for the same ID share one query
+        self._entity_cache = TTLCache(settings.entity_cache_max_bytes, settings.cache_ttl_seconds)
+        self._entity_loads = SingleFlight()
+        if invalidation_bus is not None:
+            invalidation_bus.register("entity", self._entity_cache)
+    
+    def _index_ready(self) -> bool:
+        return self.adjacency_index is not None and self.adjacency_index.ready
     
     def create_entity(self, entity: Entity) -> EntityResponse:
         """Create a new entity in the ontology"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            entity_id = str(uuid.uuid4())
+            now = datetime.utcnow()
+            
+            cursor.execute("""
+                INSERT INTO ENTITIES (
+                    ENTITY_ID, ENTITY_TYPE, LABEL, PROPERTIES, TAGS, CREATED_AT, UPDATED_AT
+                ) VALUES (%s, %s, %s, PARSE_JSON(%s), PARSE_JSON(%s), %s, %s)
+            """, (
+                entity_id,
+                entity.entity_type,
+                entity.label,
+                json.dumps(entity.properties),
+                json.dumps(entity.tags),
+                now,
+                now
+            ))
+            
+            conn.commit()
+            cursor.close()
+            
+            if self.adjacency_index is not None:
+                self.adjacency_index.upsert_entity(entity_id, entity.entity_type, entity.label, entity.properties)
+            self._adjust_stats(entity_type=entity.entity_type)
+            
+            created = EntityResponse(
+                entity_id=entity_id,
+                entity_type=entity.entity_type,
+                label=entity.label,
+                properties=entity.properties,
+                tags=entity.tags,
+                created_at=now,
+                updated_at=now
+            )
+            self._entity_cache.put(entity_id, created)
+            return created
         
-        entity_id = str(uuid.uuid4())
+    def bulk_create_entities(self, entities: List[Tuple[int, Entity]]) -> Dict[str, Any]:
+        """Insert a batch of (input index, entity) pairs.
+        
+        Batches below BULK_COPY_THRESHOLD rows use multi-row INSERT ... SELECT
+        PARSE_JSON statements. Larger batches are written to a CSV, PUT to the
+        stage of a temporary table, loaded with COPY INTO (ON_ERROR = CONTINUE)
+        and moved into ENTITIES with one INSERT ... SELECT. A supplied entity_id
+        is kept; otherwise one is generated. Supplied IDs that already exist or
+        repeat within the batch are reported as row errors rather than inserted.
+        Returns the created IDs by input index and per-row errors.
+        """
         now = datetime.utcnow()
+        rows = [
+            (index, (
+                entity.entity_id or str(uuid.uuid4()),
+                entity.entity_type,
+                entity.label,
+                json.dumps(entity.properties),
+                json.dumps(entity.tags),
+                now
+            ))
+            for index, entity in entities
+        ]
+        values = [row for _, row in rows]
         
-        cursor.execute("""
-            INSERT INTO ENTITIES (
-                ENTITY_ID, ENTITY_TYPE, LABEL, PROPERTIES, TAGS, CREATED_AT, UPDATED_AT
-            ) VALUES (%s, %s, %s, PARSE_JSON(%s), PARSE_JSON(%s), %s, %s)
-        """, (
-            entity_id,
-            entity.entity_type,
-            entity.label,
-            json.dumps(entity.properties),
-            json.dumps(entity.tags),
-            now,
-            now
-        ))
-        
-        conn.commit()
-        cursor.close()
-        
-        return EntityResponse(
-            entity_id=entity_id,
-            entity_type=entity.entity_type,
-            label=entity.label,
-            properties=entity.properties,
-            tags=entity.tags,
-            created_at=now,
-            updated_at=now
-        )
-    
-    def get_entity(self, entity_id: str) -> Optional[EntityResponse]:
-        """Get an entity by ID"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            errors = duplicate_ids(cursor, "ENTITIES", "ENTITY_ID", [entity.entity_id for _, entity in entities])
+            positions = [position for position in range(len(values)) if position not in errors]
+            staged = [values[position] for position in positions]
+            
+            if len(staged) >= settings.bulk_copy_threshold:
+                method = "copy"
+                table = create_temp_table(
+                    cursor, "ENTITIES_BULK",
+                    "ENTITY_ID VARCHAR, ENTITY_TYPE VARCHAR, LABEL VARCHAR, "
+                    "PROPERTIES VARCHAR, TAGS VARCHAR, CREATED_AT TIMESTAMP_NTZ"
+                )
+                try:
+                    load_errors = copy_into_temp_table(cursor, table, staged)
+                    cursor.execute(f"""
+                        INSERT INTO ENTITIES (
+                            ENTITY_ID, ENTITY_TYPE, LABEL, PROPERTIES, TAGS, CREATED_AT, UPDATED_AT
+                        )
+                        SELECT ENTITY_ID, ENTITY_TYPE, LABEL, PARSE_JSON(PROPERTIES), PARSE_JSON(TAGS),
+                               CREATED_AT, CREATED_AT
+                        FROM {table}
+                    """)
+                finally:
+                    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            else:
+                method = "insert"
+                load_errors = insert_values(
+                    cursor,
+                    "INSERT INTO ENTITIES (ENTITY_ID, ENTITY_TYPE, LABEL, PROPERTIES, TAGS, CREATED_AT, UPDATED_AT)",
+                    "column1, column2, column3, PARSE_JSON(column4), PARSE_JSON(column5), column6, column6",
+                    staged,
+                    settings.bulk_insert_batch_size
+                )
+            errors.update({positions[position]: error for position, error in load_errors.items()})
+            
+            conn.commit()
+            cursor.close()
         
-        cursor.execute("""
-            SELECT ENTITY_ID, ENTITY_TYPE, LABEL, PROPERTIES, TAGS, CREATED_AT, UPDATED_AT
-            FROM ENTITIES
-            WHERE ENTITY_ID = %s
-        """, (entity_id,))
+        loaded, failed = split_rows(rows, errors)
         
-        row = cursor.fetchone()
-        cursor.close()
+        entities_by_index = dict(entities)
+        if self.adjacency_index is not None:
+            for index, row in loaded:
+                entity = entities_by_index[index]
+                self.adjacency_index.upsert_entity(row[0], entity.entity_type, entity.label, entity.properties)
+        # Only supplied IDs can already be cached
+        supplied = [row[0] for index, row in loaded if entities_by_index[index].entity_id]
+        if len(supplied) > _MAX_BULK_INVALIDATIONS:
+            self.invalidate_entity(ALL_KEYS)
+        else:
+            for entity_id in supplied:
+                self.invalidate_entity(entity_id)
+        if loaded:
+            self._invalidate_stats()
         
-        if not row:
-            return None
+        return {
+            "method": method,
+            "entity_ids": {index: row[0] for index, row in loaded},
+            "errors": failed
+        }
         
-        return EntityResponse(
-            entity_id=row[0],
-            entity_type=row[1],
-            label=row[2],
-            properties=json.loads(row[3]) if row[3] else {},
-            tags=json.loads(row[4]) if row[4] else [],
-            created_at=row[5],
-            updated_at=row[6]
-        )
+    def invalidate_entity(self, entity_id: str):
+        """Drop a cached entity here and, through the bus, in other workers; ALL_KEYS drops every entity"""
+        if entity_id == ALL_KEYS:
+            self._entity_cache.clear()
+        else:
+            self._entity_cache.invalidate(entity_id)
+            self._entity_loads.forget(entity_id)
+        if self.invalidation_bus is not None:
+            self.invalidation_bus.publish("entity", entity_id)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        return {"entity": {**self._entity_cache.stats(), "coalesced": self._entity_loads.coalesced}}
+    
+    def get_entity(
+        self,
+        entity_id: str,
+        projection: Optional[Projection] = None
+    ) -> Optional[Union[EntityResponse, Dict[str, Any]]]:
+        """Get an entity by ID; with a projection, only the selected fields are read and returned as a dict.
+        
+        Full entities are served from the entity cache when present.
+        """
+        if projection:
+            return self._fetch_entity(entity_id, projection)
+        cached = self._entity_cache.get(entity_id)
+        if cached is not None:
+            return cached
+        return self._entity_loads.do(entity_id, lambda: self._load_entity(entity_id))
+    
+    def _load_entity(self, entity_id: str) -> Optional[EntityResponse]:
+        generation = self._entity_cache.generation()
+        entity = self._fetch_entity(entity_id)
+        if entity is not None:
+            self._entity_cache.put(entity_id, entity, generation)
+        return entity
     
+    def _fetch_entity(
+        self,
+        entity_id: str,
+        projection: Optional[Projection] = None
+    ) -> Optional[Union[EntityResponse, Dict[str, Any]]]:
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            select_list = projection.select_list(ENTITY_COLUMNS) if projection else ", ".join(ENTITY_COLUMNS.values())
+            cursor.execute(f"""
+                SELECT {select_list}
+                FROM ENTITIES
+                WHERE ENTITY_ID = %s
+            """, (entity_id,))
+            
+            row = cursor.fetchone()
+            cursor.close()
+            
+            if not row:
+                return None
+            if projection:
+                return projection.row_to_dict(row)
+            return _entity_response(row)
+    
+    def batch_get_entities(self, entity_ids: List[str]) -> List[Optional[EntityResponse]]:
+        """Entities for a list of IDs, in request order with None for IDs that do not exist.
+        
+        Cached entities are served first; the rest are read with chunked IN
+        queries (BATCH_GET_CHUNK_SIZE IDs each) on one connection and cached.
+        """
+        unique_ids = list(dict.fromkeys(entity_ids))
+        found = self._entity_cache.get_many(unique_ids)
+        missing = [entity_id for entity_id in unique_ids if entity_id not in found]
+        
+        if missing:
+            generation = self._entity_cache.generation()
+            chunk_size = settings.batch_get_chunk_size
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(missing), chunk_size):
+                    chunk = missing[start:start + chunk_size]
+                    cursor.execute(f"""
+                        SELECT ENTITY_ID, ENTITY_TYPE, LABEL, PROPERTIES, TAGS, CREATED_AT, UPDATED_AT
+                        FROM ENTITIES
+                        WHERE ENTITY_ID IN ({", ".join(["%s"] * len(chunk))})
+                    """, chunk)
+                    for row in cursor.fetchall():
+                        entity = _entity_response(row)
+                        found[entity.entity_id] = entity
+                        self._entity_cache.put(entity.entity_id, entity, generation)
+                cursor.close()
+        
+        return [found.get(entity_id) for entity_id in entity_ids]
+        
     def list_entities(
         self,
         entity_type: Optional[str] = None,
         limit: int = 100,
-        offset: int = 0
-    ) -> List[EntityResponse]:
-        """List entities with optional filtering"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+        offset: int = 0,
+        after: Optional[Cursor] = None,
+        projection: Optional[Projection] = None
+    ) -> Union[List[EntityResponse], List[Dict[str, Any]]]:
+        """List entities with optional filtering, newest first.
         
-        if entity_type:
-            cursor.execute("""
-                SELECT ENTITY_ID, ENTITY_TYPE, LABEL, PROPERTIES, TAGS, CREATED_AT, UPDATED_AT
-                FROM ENTITIES
-                WHERE ENTITY_TYPE = %s
-                ORDER BY CREATED_AT DESC
-                LIMIT %s OFFSET %s
-            """, (entity_type, limit, offset))
-        else:
-            cursor.execute("""
-                SELECT ENTITY_ID, ENTITY_TYPE, LABEL, PROPERTIES, TAGS, CREATED_AT, UPDATED_AT
+        after is a (CREATED_AT, ENTITY_ID) position from a page cursor; rows are
+        sought past it instead of skipped with OFFSET. With a projection, only
+        the selected fields are read and dicts are returned.
+        """
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            select_list = projection.select_list(ENTITY_COLUMNS) if projection else ", ".join(ENTITY_COLUMNS.values())
+            query = f"""
+                SELECT {select_list}
                 FROM ENTITIES
-                ORDER BY CREATED_AT DESC
-                LIMIT %s OFFSET %s
-            """, (limit, offset))
+                WHERE 1=1
+            """
+            params: List[Any] = []
+            
+            if entity_type:
+                query += " AND ENTITY_TYPE = %s"
+                params.append(entity_type)
+            
+            if after:
+                query += " AND " + keyset_predicate("CREATED_AT", "ENTITY_ID")
+                params.extend([after[0], after[0], after[1]])
+            
+            query += " ORDER BY CREATED_AT DESC, ENTITY_ID DESC LIMIT %s OFFSET %s"
+            params.extend([limit, offset])
+            
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            cursor.close()
+            
+            if projection:
+                return [projection.row_to_dict(row) for row in rows]
+            return [
+                EntityResponse(
+                    entity_id=row[0],
+                    entity_type=row[1],
+                    label=row[2],
+                    properties=json.loads(row[3]) if row[3] else {},
+                    tags=json.loads(row[4]) if row[4] else [],
+                    created_at=row[5],
+                    updated_at=row[6]
+                )
+                for row in rows
+            ]
+    
+    def list_entities_page(
+        self,
+        entity_type: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> PaginatedResponse:
+        """Keyset-paginated entities; total is estimated from the cached graph stats"""
+        after = decode_cursor(cursor) if cursor else None
+        items = self.list_entities(entity_type=entity_type, limit=limit + 1, after=after)
+        total = None
+        if include_total:
+            stats = self.get_graph_stats()
+            total = stats["entities_by_type"].get(entity_type, 0) if entity_type else stats["total_entities"]
+        return build_page(items, limit, lambda e: (e.created_at, e.entity_id), total)
         
-        rows = cursor.fetchall()
-        cursor.close()
+    def search_entities(
+        self,
+        entity_filter: EntityFilter,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> PaginatedResponse:
+        """Server-side entity search; the filter compiles to one statement (see services.entity_search)"""
+        after = decode_cursor(cursor) if cursor else None
+        sql, params = compile_entity_filter(entity_filter, limit + 1, after)
         
-        return [
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            cursor.close()
+        
+        items = [
             EntityResponse(
                 entity_id=row[0],
                 entity_type=row[1],
@@ -115,344 +536,933 @@ class OntologyService:
             )
             for row in rows
         ]
-    
-    def update_entity(self, entity_id: str, entity: Entity) -> Optional[EntityResponse]:
-        """Update an existing entity"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+        return build_page(items, limit, lambda e: (e.created_at, e.entity_id))
         
-        now = datetime.utcnow()
+    def update_entity(self, entity_id: str, entity: Entity) -> Optional[EntityResponse]:
+        """Update an existing entity.
         
-        cursor.execute("""
-            UPDATE ENTITIES
-            SET ENTITY_TYPE = %s,
-                LABEL = %s,
-                PROPERTIES = PARSE_JSON(%s),
-                TAGS = PARSE_JSON(%s),
-                UPDATED_AT = %s
-            WHERE ENTITY_ID = %s
-        """, (
-            entity.entity_type,
-            entity.label,
-            json.dumps(entity.properties),
-            json.dumps(entity.tags),
-            now,
-            entity_id
-        ))
-        
-        conn.commit()
-        
-        if cursor.rowcount == 0:
+        The response is built from the update itself; only CREATED_AT is read
+        back, and not even that when the entity is cached.
+        """
+        cached = self._entity_cache.get(entity_id)
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            now = datetime.utcnow()
+            
+            cursor.execute("""
+                UPDATE ENTITIES
+                SET ENTITY_TYPE = %s,
+                    LABEL = %s,
+                    PROPERTIES = PARSE_JSON(%s),
+                    TAGS = PARSE_JSON(%s),
+                    UPDATED_AT = %s
+                WHERE ENTITY_ID = %s
+            """, (
+                entity.entity_type,
+                entity.label,
+                json.dumps(entity.properties),
+                json.dumps(entity.tags),
+                now,
+                entity_id
+            ))
+            
+            conn.commit()
+            
+            if cursor.rowcount == 0:
+                cursor.close()
+                return None
+            
+            if cached is not None:
+                created_at = cached.created_at
+            else:
+                cursor.execute("SELECT CREATED_AT FROM ENTITIES WHERE ENTITY_ID = %s", (entity_id,))
+                created_at = cursor.fetchone()[0]
             cursor.close()
-            return None
+            
+            if self.adjacency_index is not None:
+                self.adjacency_index.upsert_entity(entity_id, entity.entity_type, entity.label, entity.properties)
+            # The previous type is unknown here; reload stats on next read
+            self._invalidate_stats()
+            
+            updated = EntityResponse(
+                entity_id=entity_id,
+                entity_type=entity.entity_type,
+                label=entity.label,
+                properties=entity.properties,
+                tags=entity.tags,
+                created_at=created_at,
+                updated_at=now
+            )
+            self.invalidate_entity(entity_id)
+            self._entity_cache.put(entity_id, updated)
+            return updated
         
-        cursor.close()
-        return self.get_entity(entity_id)
-    
     def delete_entity(self, entity_id: str) -> bool:
         """Delete an entity"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        # Delete related relationships first
-        cursor.execute("""
-            DELETE FROM RELATIONSHIPS
-            WHERE SUBJECT_ID = %s OR OBJECT_ID = %s
-        """, (entity_id, entity_id))
-        
-        # Delete the entity
-        cursor.execute("""
-            DELETE FROM ENTITIES
-            WHERE ENTITY_ID = %s
-        """, (entity_id,))
-        
-        conn.commit()
-        success = cursor.rowcount > 0
-        cursor.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Delete related relationships first
+            cursor.execute("""
+                DELETE FROM RELATIONSHIPS
+                WHERE SUBJECT_ID = %s OR OBJECT_ID = %s
+            """, (entity_id, entity_id))
+            
+            # Delete the entity
+            cursor.execute("""
+                DELETE FROM ENTITIES
+                WHERE ENTITY_ID = %s
+            """, (entity_id,))
+            
+            conn.commit()
+            success = cursor.rowcount > 0
+            cursor.close()
+            
+            if self.adjacency_index is not None:
+                self.adjacency_index.remove_entity(entity_id)
+            self.invalidate_entity(entity_id)
+            if success:
+                self._invalidate_stats()
+            
+            return success
         
-        return success
-    
     def create_relationship(self, relationship: Relationship) -> RelationshipResponse:
         """Create a new relationship between entities"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            relationship_id = str(uuid.uuid4())
+            now = datetime.utcnow()
+            
+            cursor.execute("""
+                INSERT INTO RELATIONSHIPS (
+                    RELATIONSHIP_ID, SUBJECT_ID, PREDICATE, OBJECT_ID, PROPERTIES, CREATED_AT
+                ) VALUES (%s, %s, %s, %s, PARSE_JSON(%s), %s)
+            """, (
+                relationship_id,
+                relationship.subject_id,
+                relationship.predicate,
+                relationship.object_id,
+                json.dumps(relationship.properties),
+                now
+            ))
+            
+            conn.commit()
+            cursor.close()
+            
+            result = RelationshipResponse(
+                relationship_id=relationship_id,
+                subject_id=relationship.subject_id,
+                predicate=relationship.predicate,
+                object_id=relationship.object_id,
+                properties=relationship.properties,
+                created_at=now
+            )
+            
+            if self.adjacency_index is not None:
+                self.adjacency_index.add_relationship(result)
+            self._adjust_stats(predicate=relationship.predicate)
+            
+            return result
         
-        relationship_id = str(uuid.uuid4())
+    def bulk_create_relationships(self, relationships: List[Tuple[int, Relationship]]) -> Dict[str, Any]:
+        """Insert a batch of (input index, relationship) pairs with referential checks.
+        
+        The batch is staged in a temporary table (multi-row INSERT, or COPY INTO
+        from a CSV at BULK_COPY_THRESHOLD rows and above). One anti-join against
+        ENTITIES reports edges with a missing subject or object, and a single
+        INSERT ... SELECT copies the remaining edges into RELATIONSHIPS. Supplied
+        relationship IDs that already exist or repeat within the batch are
+        reported as row errors and not staged.
+        """
         now = datetime.utcnow()
+        rows = [
+            (index, (
+                position,
+                relationship.relationship_id or str(uuid.uuid4()),
+                relationship.subject_id,
+                relationship.predicate,
+                relationship.object_id,
+                json.dumps(relationship.properties),
+                now
+            ))
+            for position, (index, relationship) in enumerate(relationships)
+        ]
+        values = [row for _, row in rows]
         
-        cursor.execute("""
-            INSERT INTO RELATIONSHIPS (
-                RELATIONSHIP_ID, SUBJECT_ID, PREDICATE, OBJECT_ID, PROPERTIES, CREATED_AT
-            ) VALUES (%s, %s, %s, %s, PARSE_JSON(%s), %s)
-        """, (
-            relationship_id,
-            relationship.subject_id,
-            relationship.predicate,
-            relationship.object_id,
-            json.dumps(relationship.properties),
-            now
-        ))
-        
-        conn.commit()
-        cursor.close()
-        
-        return RelationshipResponse(
-            relationship_id=relationship_id,
-            subject_id=relationship.subject_id,
-            predicate=relationship.predicate,
-            object_id=relationship.object_id,
-            properties=relationship.properties,
-            created_at=now
-        )
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            errors = duplicate_ids(
+                cursor, "RELATIONSHIPS", "RELATIONSHIP_ID",
+                [relationship.relationship_id for _, relationship in relationships]
+            )
+            staged = [row for row in values if row[0] not in errors]
+            table = create_temp_table(
+                cursor, "RELATIONSHIPS_BULK",
+                "ROW_POS INTEGER, RELATIONSHIP_ID VARCHAR, SUBJECT_ID VARCHAR, PREDICATE VARCHAR, "
+                "OBJECT_ID VARCHAR, PROPERTIES VARCHAR, CREATED_AT TIMESTAMP_NTZ"
+            )
+            try:
+                if len(staged) >= settings.bulk_copy_threshold:
+                    method = "copy"
+                    load_errors = copy_into_temp_table(cursor, table, staged)
+                else:
+                    method = "insert"
+                    load_errors = insert_values(
+                        cursor, f"INSERT INTO {table}", "*", staged, settings.bulk_insert_batch_size
+                    )
+                # Staged rows carry their ROW_POS
+                errors.update({staged[position][0]: error for position, error in load_errors.items()})
+                
+                # Reject dangling endpoints in one set-based pass
+                cursor.execute(f"""
+                    SELECT b.ROW_POS,
+                           NOT EXISTS (SELECT 1 FROM ENTITIES e WHERE e.ENTITY_ID = b.SUBJECT_ID),
+                           NOT EXISTS (SELECT 1 FROM ENTITIES e WHERE e.ENTITY_ID = b.OBJECT_ID)
+                    FROM {table} b
+                    WHERE NOT EXISTS (SELECT 1 FROM ENTITIES e WHERE e.ENTITY_ID = b.SUBJECT_ID)
+                       OR NOT EXISTS (SELECT 1 FROM ENTITIES e WHERE e.ENTITY_ID = b.OBJECT_ID)
+                """)
+                for position, missing_subject, missing_object in cursor.fetchall():
+                    missing = [name for name, flag in (("subject_id", missing_subject), ("object_id", missing_object)) if flag]
+                    errors[position] = f"Unknown {' and '.join(missing)}"
+                
+                cursor.execute(f"""
+                    INSERT INTO RELATIONSHIPS (
+                        RELATIONSHIP_ID, SUBJECT_ID, PREDICATE, OBJECT_ID, PROPERTIES, CREATED_AT
+                    )
+                    SELECT b.RELATIONSHIP_ID, b.SUBJECT_ID, b.PREDICATE, b.OBJECT_ID,
+                           PARSE_JSON(b.PROPERTIES), b.CREATED_AT
+                    FROM {table} b
+                    WHERE EXISTS (SELECT 1 FROM ENTITIES e WHERE e.ENTITY_ID = b.SUBJECT_ID)
+                      AND EXISTS (SELECT 1 FROM ENTITIES e WHERE e.ENTITY_ID = b.OBJECT_ID)
+                """)
+                conn.commit()
+            finally:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+                cursor.close()
+        
+        loaded, failed = split_rows(rows, errors)
+        
+        if self.adjacency_index is not None:
+            self.adjacency_index.add_relationship_rows([row[1:] for _, row in loaded])
+        if loaded:
+            self._invalidate_stats()
+        
+        return {
+            "method": method,
+            "relationship_ids": {index: row[1] for index, row in loaded},
+            "errors": failed
+        }
     
     def list_relationships(
         self,
         entity_id: Optional[str] = None,
         predicate: Optional[str] = None,
-        limit: int = 100
-    ) -> List[RelationshipResponse]:
-        """List relationships with optional filtering"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT RELATIONSHIP_ID, SUBJECT_ID, PREDICATE, OBJECT_ID, PROPERTIES, CREATED_AT
-            FROM RELATIONSHIPS
-            WHERE 1=1
+        limit: int = 100,
+        after: Optional[Cursor] = None,
+        projection: Optional[Projection] = None
+    ) -> Union[List[RelationshipResponse], List[Dict[str, Any]]]:
+        """List relationships with optional filtering, newest first.
+        
+        after is a (CREATED_AT, RELATIONSHIP_ID) position. With a projection,
+        only the selected fields are read and dicts are returned.
         """
-        params = []
-        
-        if entity_id:
-            query += " AND (SUBJECT_ID = %s OR OBJECT_ID = %s)"
-            params.extend([entity_id, entity_id])
-        
-        if predicate:
-            query += " AND PREDICATE = %s"
-            params.append(predicate)
-        
-        query += " ORDER BY CREATED_AT DESC LIMIT %s"
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        cursor.close()
-        
-        return [
-            RelationshipResponse(
-                relationship_id=row[0],
-                subject_id=row[1],
-                predicate=row[2],
-                object_id=row[3],
-                properties=json.loads(row[4]) if row[4] else {},
-                created_at=row[5]
-            )
-            for row in rows
-        ]
+        if entity_id and self._index_ready():
+            relationships = self.adjacency_index.list_relationships(entity_id, predicate=predicate, limit=limit, after=after)
+            if projection:
+                return [projection.project(r.model_dump()) for r in relationships]
+            return relationships
+        
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            select_list = projection.select_list(RELATIONSHIP_COLUMNS) if projection else ", ".join(RELATIONSHIP_COLUMNS.values())
+            query = f"""
+                SELECT {select_list}
+                FROM RELATIONSHIPS
+                WHERE 1=1
+            """
+            params = []
+            
+            if entity_id:
+                query += " AND (SUBJECT_ID = %s OR OBJECT_ID = %s)"
+                params.extend([entity_id, entity_id])
+            
+            if predicate:
+                query += " AND PREDICATE = %s"
+                params.append(predicate)
+            
+            if after:
+                query += " AND " + keyset_predicate("CREATED_AT", "RELATIONSHIP_ID")
+                params.extend([after[0], after[0], after[1]])
+            
+            query += " ORDER BY CREATED_AT DESC, RELATIONSHIP_ID DESC LIMIT %s"
+            params.append(limit)
+            
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            cursor.close()
+            
+            if projection:
+                return [projection.row_to_dict(row) for row in rows]
+            return [
+                RelationshipResponse(
+                    relationship_id=row[0],
+                    subject_id=row[1],
+                    predicate=row[2],
+                    object_id=row[3],
+                    properties=json.loads(row[4]) if row[4] else {},
+                    created_at=row[5]
+                )
+                for row in rows
+            ]
     
+    def list_relationships_page(
+        self,
+        entity_id: Optional[str] = None,
+        predicate: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> PaginatedResponse:
+        """Keyset-paginated relationships.
+        
+        The total is estimated from the cached graph stats; it is not available
+        when filtering by entity_id.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        items = self.list_relationships(entity_id=entity_id, predicate=predicate, limit=limit + 1, after=after)
+        total = None
+        if include_total and not entity_id:
+            stats = self.get_graph_stats()
+            total = stats["relationships_by_predicate"].get(predicate, 0) if predicate else stats["total_relationships"]
+        return build_page(items, limit, lambda r: (r.created_at, r.relationship_id), total)
+        
     def delete_relationship(self, relationship_id: str) -> bool:
         """Delete a relationship"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                DELETE FROM RELATIONSHIPS
+                WHERE RELATIONSHIP_ID = %s
+            """, (relationship_id,))
+            
+            conn.commit()
+            success = cursor.rowcount > 0
+            cursor.close()
+            
+            if self.adjacency_index is not None:
+                self.adjacency_index.remove_relationship(relationship_id)
+            if success:
+                self._invalidate_stats()
+            
+            return success
+        
+    def query_graph(
+        self,
+        query: GraphQuery,
+        node_projection: Optional[Projection] = None,
+        edge_projection: Optional[Projection] = None
+    ) -> Dict[str, Any]:
+        """Query the ontology graph.
+
+        Served from the in-process adjacency index when it is enabled and built.
+        Otherwise uses a single recursive CTE by default; the level-by-level engine
+        is kept as a fallback (GRAPH_TRAVERSAL_ENGINE=iterative, or if the
+        recursive statement fails) and is always used when max_fanout is set,
+        since a recursive CTE cannot limit the rows of a single level, and
+        beyond GRAPH_RECURSIVE_MAX_DEPTH, since the CTE enumerates every
+        simple path and on hub-heavy graphs their number explodes with depth.
+        
+        Projections narrow the returned nodes and edges; the SQL engines also
+        select only the requested PROPERTIES paths.
+        """
+        if self._index_ready():
+            result = self.adjacency_index.query_graph(query, *_graph_budget(query))
+        else:
+            result = None
+            if (
+                settings.graph_traversal_engine == "recursive"
+                and query.max_fanout is None
+                and _effective_max_depth(query) <= settings.graph_recursive_max_depth
+            ):
+                try:
+                    result = self._query_graph_recursive(query, node_projection, edge_projection)
+                except Exception as e:
+                    logger.warning(f"Recursive graph traversal failed, falling back to iterative: {e}")
+            if result is None:
+                result = self._query_graph_iterative(query, node_projection, edge_projection)
+        
+        if node_projection is not None:
+            result["nodes"] = [node_projection.project(node) for node in result["nodes"]]
+        if edge_projection is not None:
+            result["edges"] = [edge_projection.project(edge) for edge in result["edges"]]
+        return result
+    
+    def _query_graph_recursive(
+        self,
+        query: GraphQuery,
+        node_projection: Optional[Projection] = None,
+        edge_projection: Optional[Projection] = None
+    ) -> Dict[str, Any]:
+        """Query the ontology graph in one round-trip using WITH RECURSIVE.
+        
+        The CTE expands every path from the start entity up to max_depth, skipping
+        targets already on the current path (cycle protection). Nodes are reported
+        at their minimum depth; edges are those leaving any node reached before the
+        last level, matching the iterative engine. Predicate, hop and entity type
+        filters are applied inside the recursion. With hop_predicates every
+        matching path is followed, whereas the level-by-level engines expand a
+        node only from its shallowest visit.
+        """
+        adjacency_sql, adjacency_params = _adjacency_sql(
+            query.direction, query.relationship_types, query.entity_types
+        )
+        max_depth = _effective_max_depth(query)
+        max_nodes, max_edges = _graph_budget(query)
+        
+        hops_cte = ""
+        hop_join_traversal = ""
+        hop_join_edges = ""
+        hop_params: List[Any] = []
+        if query.hop_predicates:
+            hops_cte = "hops (HOP, PREDICATE) AS (SELECT column1, column2 FROM VALUES {}),".format(
+                ", ".join(["(%s, %s)"] * len(query.hop_predicates))
+            )
+            for hop, predicate in enumerate(query.hop_predicates, start=1):
+                hop_params.extend([hop, predicate])
+            hop_join_traversal = "JOIN hops h ON h.HOP = t.DEPTH + 1 AND h.PREDICATE = a.PREDICATE"
+            hop_join_edges = "JOIN hops h ON h.HOP = rc.DEPTH + 1 AND h.PREDICATE = a.PREDICATE"
+        
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(f"""
+                WITH RECURSIVE adjacency AS ({adjacency_sql}),
+                {hops_cte}
+                traversal (ENTITY_ID, DEPTH, PATH) AS (
+                    SELECT ENTITY_ID, 0, ARRAY_CONSTRUCT(ENTITY_ID)
+                    FROM ENTITIES
+                    WHERE ENTITY_ID = %s
+                    UNION ALL
+                    SELECT a.TARGET_ID, t.DEPTH + 1, ARRAY_APPEND(t.PATH, a.TARGET_ID)
+                    FROM traversal t
+                    JOIN adjacency a ON a.SOURCE_ID = t.ENTITY_ID
+                    {hop_join_traversal}
+                    WHERE t.DEPTH < %s
+                      AND NOT ARRAY_CONTAINS(a.TARGET_ID::VARIANT, t.PATH)
+                ),
+                reached AS (
+                    SELECT ENTITY_ID, MIN(DEPTH) AS DEPTH
+                    FROM traversal
+                    GROUP BY ENTITY_ID
+                    QUALIFY ROW_NUMBER() OVER (ORDER BY MIN(DEPTH), ENTITY_ID) <= %s
+                ),
+                traversed_edges AS (
+                    SELECT a.RELATIONSHIP_ID
+                    FROM adjacency a
+                    JOIN reached rc ON a.SOURCE_ID = rc.ENTITY_ID
+                    JOIN reached tg ON a.TARGET_ID = tg.ENTITY_ID
+                    {hop_join_edges}
+                    WHERE rc.DEPTH < %s
+                    GROUP BY a.RELATIONSHIP_ID
+                    -- Shallowest edges first, as the iterative engine adds them, so the cut is deterministic
+                    ORDER BY MIN(rc.DEPTH), a.RELATIONSHIP_ID
+                    LIMIT %s
+                )
+                SELECT 'NODE' AS ROW_KIND, e.ENTITY_ID, e.ENTITY_TYPE, e.LABEL,
+                       {_properties_sql(node_projection, "e.PROPERTIES")} AS PROPERTIES,
+                       rc.DEPTH, NULL AS SUBJECT_ID, NULL AS OBJECT_ID
+                FROM reached rc
+                JOIN ENTITIES e ON e.ENTITY_ID = rc.ENTITY_ID
+                UNION ALL
+                SELECT 'EDGE', r.RELATIONSHIP_ID, r.PREDICATE, NULL,
+                       {_properties_sql(edge_projection, "r.PROPERTIES")},
+                       NULL, r.SUBJECT_ID, r.OBJECT_ID
+                FROM traversed_edges te
+                JOIN RELATIONSHIPS r ON r.RELATIONSHIP_ID = te.RELATIONSHIP_ID
+            """, adjacency_params + hop_params + [
+                query.start_entity_id, max_depth,
+                # One row over each budget tells us the result was truncated
+                max_nodes + 1, max_depth, max_edges + 1
+            ])
+            
+            rows = cursor.fetchall()
+            cursor.close()
+        
+        graph = GraphAssembler()
+        # Nodes in depth order; each appears once since reached is grouped by ENTITY_ID
+        node_rows = sorted((row for row in rows if row[0] == "NODE"), key=lambda row: (row[5], row[1]))
+        edge_rows = [row for row in rows if row[0] == "EDGE"]
+        truncated = len(node_rows) > max_nodes or len(edge_rows) > max_edges
         
-        cursor.execute("""
-            DELETE FROM RELATIONSHIPS
-            WHERE RELATIONSHIP_ID = %s
-        """, (relationship_id,))
+        for _, entity_id, entity_type, label, props, depth, _, _ in node_rows[:max_nodes]:
+            graph.add_node(entity_id, entity_type, label, props, depth)
+        for _, rel_id, pred, _, props, _, subj_id, obj_id in edge_rows:
+            if len(graph.edges) >= max_edges:
+                break
+            # Drop edges to the node cut by the budget probe row
+            if subj_id in graph.nodes and obj_id in graph.nodes:
+                graph.add_edge(rel_id, subj_id, pred, obj_id, props)
         
-        conn.commit()
-        success = cursor.rowcount > 0
-        cursor.close()
+        return graph.result(truncated=truncated)
+    
+    def _query_graph_iterative(
+        self,
+        query: GraphQuery,
+        node_projection: Optional[Projection] = None,
+        edge_projection: Optional[Projection] = None
+    ) -> Dict[str, Any]:
+        """Query the ontology graph using iterative traversal (one query per depth level)"""
+        graph = GraphAssembler()
+        truncated = False
         
-        return success
+        for level in self._iter_graph_levels(query, node_projection, edge_projection):
+            for entity_id, entity_type, label, props, depth in level["nodes"]:
+                graph.add_node(entity_id, entity_type, label, props, depth)
+            for rel_id, subj_id, pred, obj_id, props in level["edges"]:
+                graph.add_edge(rel_id, subj_id, pred, obj_id, props)
+            truncated = truncated or level["truncated"]
+        
+        return graph.result(truncated=truncated)
     
-    def query_graph(self, query: GraphQuery) -> Dict[str, Any]:
-        """Query the ontology graph using iterative traversal (Snowflake compatible)"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+    def stream_graph(self, query: GraphQuery) -> Iterator[Dict[str, Any]]:
+        """Traverse level by level, yielding each level's new nodes and edges as it is discovered.
+        
+        Only the current frontier and the sets of IDs already emitted are kept in
+        memory. Ends with a summary event carrying totals and the truncation flag.
+        """
+        total_nodes = 0
+        total_edges = 0
+        truncated = False
+        
+        for level in self._iter_graph_levels(query):
+            nodes = [
+                {
+                    "entity_id": entity_id,
+                    "entity_type": entity_type,
+                    "label": label,
+                    "properties": json.loads(props) if props else {},
+                    "depth": depth
+                }
+                for entity_id, entity_type, label, props, depth in level["nodes"]
+            ]
+            edges = [
+                {
+                    "relationship_id": rel_id,
+                    "subject_id": subj_id,
+                    "predicate": pred,
+                    "object_id": obj_id,
+                    "properties": json.loads(props) if props else {}
+                }
+                for rel_id, subj_id, pred, obj_id, props in level["edges"]
+            ]
+            total_nodes += len(nodes)
+            total_edges += len(edges)
+            truncated = truncated or level["truncated"]
+            yield {"type": "level", "depth": level["depth"], "nodes": nodes, "edges": edges}
         
-        # Simplified approach: Get entities within N hops
-        # Start with the initial entity
-        visited_entities = set()
-        all_nodes = []
-        all_edges = []
+        yield {
+            "type": "summary",
+            "total_nodes": total_nodes,
+            "total_edges": total_edges,
+            "truncated": truncated
+        }
+    
+    def _iter_graph_levels(
+        self,
+        query: GraphQuery,
+        node_projection: Optional[Projection] = None,
+        edge_projection: Optional[Projection] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Level-by-level traversal generator shared by the iterative engine and streaming.
+        
+        Yields {"depth", "nodes", "edges", "truncated"} per level with raw rows
+        (PROPERTIES undecoded). A pooled connection is checked out per level
+        rather than held across yields, since a streaming consumer may resume
+        the generator on a different thread. Stops after the level on which the
+        node or edge budget is exhausted. Projections select only the requested
+        PROPERTIES paths.
+        """
+        adjacency_sql, adjacency_params = _adjacency_sql(
+            query.direction, query.relationship_types, query.entity_types
+        )
+        max_depth = _effective_max_depth(query)
+        max_nodes, max_edges = _graph_budget(query)
         
         # Get start entity
-        cursor.execute("""
-            SELECT ENTITY_ID, ENTITY_TYPE, LABEL, PROPERTIES
-            FROM ENTITIES
-            WHERE ENTITY_ID = %s
-        """, (query.start_entity_id,))
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT ENTITY_ID, ENTITY_TYPE, LABEL, {_properties_sql(node_projection, "PROPERTIES")}
+                FROM ENTITIES
+                WHERE ENTITY_ID = %s
+            """, (query.start_entity_id,))
+            start_row = cursor.fetchone()
+            cursor.close()
         
-        start_row = cursor.fetchone()
         if not start_row:
-            cursor.close()
-            return {"nodes": [], "edges": [], "total_nodes": 0, "total_edges": 0}
+            return
         
-        all_nodes.append({
-            "entity_id": start_row[0],
-            "entity_type": start_row[1],
-            "label": start_row[2],
-            "properties": json.loads(start_row[3]) if start_row[3] else {},
-            "depth": 0
-        })
-        visited_entities.add(start_row[0])
+        visited_entities = {start_row[0]}
+        seen_edges = set()
+        yield {
+            "depth": 0,
+            "nodes": [(start_row[0], start_row[1], start_row[2], start_row[3], 0)],
+            "edges": [],
+            "truncated": False
+        }
         
         # Iteratively find connected entities up to max_depth
         current_level = [start_row[0]]
         
-        for depth in range(1, query.max_depth + 1):
+        for depth in range(1, max_depth + 1):
             if not current_level:
                 break
             
-            next_level = []
             placeholders = ", ".join(["%s"] * len(current_level))
+            params = adjacency_params + current_level
             
-            # Build query based on direction
-            if query.direction == "outgoing":
-                rel_query = f"""
-                    SELECT DISTINCT
-                        r.RELATIONSHIP_ID,
-                        r.SUBJECT_ID,
-                        r.PREDICATE,
-                        r.OBJECT_ID,
-                        r.PROPERTIES,
-                        e.ENTITY_TYPE,
-                        e.LABEL,
-                        e.PROPERTIES as ENTITY_PROPERTIES
-                    FROM RELATIONSHIPS r
-                    JOIN ENTITIES e ON r.OBJECT_ID = e.ENTITY_ID
-                    WHERE r.SUBJECT_ID IN ({placeholders})
-                """
-            elif query.direction == "incoming":
-                rel_query = f"""
-                    SELECT DISTINCT
-                        r.RELATIONSHIP_ID,
-                        r.SUBJECT_ID,
-                        r.PREDICATE,
-                        r.OBJECT_ID,
-                        r.PROPERTIES,
-                        e.ENTITY_TYPE,
-                        e.LABEL,
-                        e.PROPERTIES as ENTITY_PROPERTIES
-                    FROM RELATIONSHIPS r
-                    JOIN ENTITIES e ON r.SUBJECT_ID = e.ENTITY_ID
-                    WHERE r.OBJECT_ID IN ({placeholders})
-                """
-            else:  # both
-                rel_query = f"""
-                    SELECT DISTINCT
-                        r.RELATIONSHIP_ID,
-                        r.SUBJECT_ID,
-                        r.PREDICATE,
-                        r.OBJECT_ID,
-                        r.PROPERTIES,
-                        e.ENTITY_TYPE,
-                        e.LABEL,
-                        e.PROPERTIES as ENTITY_PROPERTIES
-                    FROM RELATIONSHIPS r
-                    JOIN ENTITIES e ON (
-                        (r.SUBJECT_ID IN ({placeholders}) AND e.ENTITY_ID = r.OBJECT_ID)
-                        OR (r.OBJECT_ID IN ({placeholders}) AND e.ENTITY_ID = r.SUBJECT_ID)
-                    )
-                    WHERE r.SUBJECT_ID IN ({placeholders}) OR r.OBJECT_ID IN ({placeholders})
-                """
+            rel_query = f"""
+                WITH adjacency AS ({adjacency_sql})
+                SELECT
+                    r.RELATIONSHIP_ID,
+                    r.SUBJECT_ID,
+                    r.PREDICATE,
+                    r.OBJECT_ID,
+                    {_properties_sql(edge_projection, "r.PROPERTIES")},
+                    a.TARGET_ID,
+                    e.ENTITY_TYPE,
+                    e.LABEL,
+                    {_properties_sql(node_projection, "e.PROPERTIES")} as ENTITY_PROPERTIES
+                FROM adjacency a
+                JOIN RELATIONSHIPS r ON r.RELATIONSHIP_ID = a.RELATIONSHIP_ID
+                JOIN ENTITIES e ON e.ENTITY_ID = a.TARGET_ID
+                WHERE a.SOURCE_ID IN ({placeholders})
+            """
             
-            # Execute query
-            if query.direction == "both":
-                params = current_level * 4
-            else:
-                params = current_level
+            # Only follow the predicate required at this hop
+            if query.hop_predicates:
+                rel_query += " AND a.PREDICATE = %s"
+                params.append(query.hop_predicates[depth - 1])
             
-            cursor.execute(rel_query, params)
-            rows = cursor.fetchall()
+            # Prune the level on the server: keep at most max_fanout neighbor entities
+            if query.max_fanout is not None:
+                rel_query += " QUALIFY DENSE_RANK() OVER (ORDER BY a.TARGET_ID) <= %s"
+                params.append(query.max_fanout)
+            
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(rel_query, params)
+                rows = cursor.fetchall()
+                cursor.close()
+            
+            level_nodes = []
+            level_edges = []
+            truncated = False
             
             for row in rows:
-                rel_id, subj_id, pred, obj_id, rel_props, ent_type, ent_label, ent_props = row
-                
-                # Add edge
-                edge = {
-                    "relationship_id": rel_id,
-                    "subject_id": subj_id,
-                    "predicate": pred,
-                    "object_id": obj_id,
-                    "properties": json.loads(rel_props) if rel_props else {}
-                }
-                if edge not in all_edges:
-                    all_edges.append(edge)
-                
-                # Determine the new entity based on direction
-                if query.direction == "outgoing":
-                    new_entity_id = obj_id
-                elif query.direction == "incoming":
-                    new_entity_id = subj_id
-                else:  # both
-                    # Find which one is new
-                    if subj_id in current_level and obj_id not in visited_entities:
-                        new_entity_id = obj_id
-                    elif obj_id in current_level and subj_id not in visited_entities:
-                        new_entity_id = subj_id
-                    else:
-                        continue
+                rel_id, subj_id, pred, obj_id, rel_props, new_entity_id, ent_type, ent_label, ent_props = row
                 
-                # Add node if not visited
+                # Add node if not visited and the node budget allows
                 if new_entity_id not in visited_entities:
-                    all_nodes.append({
-                        "entity_id": new_entity_id,
-                        "entity_type": ent_type,
-                        "label": ent_label,
-                        "properties": json.loads(ent_props) if ent_props else {},
-                        "depth": depth
-                    })
+                    if len(visited_entities) >= max_nodes:
+                        truncated = True
+                        continue
                     visited_entities.add(new_entity_id)
-                    next_level.append(new_entity_id)
+                    level_nodes.append((new_entity_id, ent_type, ent_label, ent_props, depth))
+                
+                if rel_id not in seen_edges:
+                    if len(seen_edges) >= max_edges:
+                        truncated = True
+                        continue
+                    seen_edges.add(rel_id)
+                    level_edges.append((rel_id, subj_id, pred, obj_id, rel_props))
             
-            current_level = next_level
+            yield {"depth": depth, "nodes": level_nodes, "edges": level_edges, "truncated": truncated}
+            
+            if truncated:
+                return
+            current_level = [node[0] for node in level_nodes]
+    
+    # ==================== PATHS ====================
+    
+    def _path_expander(
+        self,
+        relationship_types: Optional[List[str]] = None,
+        weight_property: Optional[str] = None
+    ) -> Expand:
+        """Neighbor expansion for the path searches, from the index when it is ready"""
+        if self._index_ready():
+            index = self.adjacency_index
+            return lambda frontier, direction: index.expand(frontier, direction, relationship_types, weight_property)
+        return lambda frontier, direction: self._expand_sql(frontier, direction, relationship_types, weight_property)
+    
+    def _expand_sql(
+        self,
+        frontier: List[str],
+        direction: str,
+        relationship_types: Optional[List[str]] = None,
+        weight_property: Optional[str] = None
+    ) -> List[Tuple[str, str, str, float]]:
+        """One-hop neighbors of the frontier as (source_id, relationship_id, neighbor_id, weight)"""
+        adjacency_sql, params = _adjacency_sql(direction, relationship_types)
+        placeholders = ", ".join(["%s"] * len(frontier))
         
-        cursor.close()
+        if weight_property:
+            sql = f"""
+                WITH adjacency AS ({adjacency_sql})
+                SELECT a.SOURCE_ID, a.RELATIONSHIP_ID, a.TARGET_ID,
+                       COALESCE(TRY_TO_DOUBLE(GET(r.PROPERTIES, %s)::STRING), 1.0)
+                FROM adjacency a
+                JOIN RELATIONSHIPS r ON r.RELATIONSHIP_ID = a.RELATIONSHIP_ID
+                WHERE a.SOURCE_ID IN ({placeholders})
+            """
+            params = params + [weight_property] + list(frontier)
+        else:
+            sql = f"""
+                WITH adjacency AS ({adjacency_sql})
+                SELECT a.SOURCE_ID, a.RELATIONSHIP_ID, a.TARGET_ID, 1.0
+                FROM adjacency a
+                WHERE a.SOURCE_ID IN ({placeholders})
+            """
+            params = params + list(frontier)
         
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            cursor.close()
+        
+        return [(src, rel_id, target, float(weight)) for src, rel_id, target, weight in rows]
+    
+    def _entities_exist(self, entity_ids: List[str]) -> bool:
+        if self._index_ready():
+            return all(self.adjacency_index.has_entity(entity_id) for entity_id in entity_ids)
+        
+        unique_ids = list(set(entity_ids))
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT COUNT(*) FROM ENTITIES WHERE ENTITY_ID IN ({})".format(", ".join(["%s"] * len(unique_ids))),
+                unique_ids
+            )
+            count = cursor.fetchone()[0]
+            cursor.close()
+        return count == len(unique_ids)
+    
+    def _path_details(
+        self,
+        entity_ids: List[str],
+        relationship_ids: List[str]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Node and edge payloads for a path, in path order"""
+        if self._index_ready():
+            return self.adjacency_index.path_details(entity_ids, relationship_ids)
+        
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT ENTITY_ID, ENTITY_TYPE, LABEL, PROPERTIES FROM ENTITIES WHERE ENTITY_ID IN ({})".format(
+                    ", ".join(["%s"] * len(entity_ids))
+                ),
+                entity_ids
+            )
+            entity_rows = {row[0]: row for row in cursor.fetchall()}
+            edge_rows = {}
+            if relationship_ids:
+                cursor.execute(
+                    """
+                    SELECT RELATIONSHIP_ID, SUBJECT_ID, PREDICATE, OBJECT_ID, PROPERTIES
+                    FROM RELATIONSHIPS WHERE RELATIONSHIP_ID IN ({})
+                    """.format(", ".join(["%s"] * len(relationship_ids))),
+                    relationship_ids
+                )
+                edge_rows = {row[0]: row for row in cursor.fetchall()}
+            cursor.close()
+        
+        nodes = []
+        for depth, entity_id in enumerate(entity_ids):
+            _, entity_type, label, props = entity_rows[entity_id]
+            nodes.append({
+                "entity_id": entity_id,
+                "entity_type": entity_type,
+                "label": label,
+                "properties": json.loads(props) if props else {},
+                "depth": depth
+            })
+        edges = []
+        for rel_id in relationship_ids:
+            _, subj_id, pred, obj_id, props = edge_rows[rel_id]
+            edges.append({
+                "relationship_id": rel_id,
+                "subject_id": subj_id,
+                "predicate": pred,
+                "object_id": obj_id,
+                "properties": json.loads(props) if props else {}
+            })
+        return nodes, edges
+    
+    def shortest_path(self, query: PathQuery) -> Optional[Dict[str, Any]]:
+        """Shortest path between two entities; None if either entity does not exist.
+        
+        Unweighted searches run a bidirectional BFS, expanding whichever frontier
+        is smaller. With weight_property set, a hop-bounded Dijkstra search runs
+        from the source instead, settling all nodes of the lowest cost at once.
+        Both expand one batch of neighbors per step, from the adjacency index when
+        it is ready or with one warehouse query otherwise. The search gives up
+        (exhausted) once graph_path_timeout_seconds have passed, so it doesn't
+        keep querying after the request has timed out.
+        """
+        deadline = time.monotonic() + settings.graph_path_timeout_seconds
+        if not self._entities_exist([query.source_entity_id, query.target_entity_id]):
+            return None
+        
+        expand = self._path_expander(query.relationship_types, query.weight_property)
+        search = dijkstra if query.weight_property else bidirectional_bfs
+        result = search(
+            expand, query.source_entity_id, query.target_entity_id,
+            query.direction, query.max_depth, settings.graph_path_max_visited, deadline
+        )
+        
+        nodes, edges = [], []
+        if result.found:
+            nodes, edges = self._path_details(result.node_ids, result.relationship_ids)
         return {
-            "nodes": all_nodes,
-            "edges": all_edges,
-            "total_nodes": len(all_nodes),
-            "total_edges": len(all_edges)
+            "found": result.found,
+            "length": len(edges) if result.found else None,
+            "cost": result.cost,
+            "nodes": nodes,
+            "edges": edges,
+            "visited": result.visited,
+            "exhausted": result.exhausted
         }
     
-    def get_graph_stats(self) -> Dict[str, Any]:
-        """Get statistics about the ontology graph"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        # Get entity counts by type
-        cursor.execute("""
-            SELECT ENTITY_TYPE, COUNT(*) as COUNT
-            FROM ENTITIES
-            GROUP BY ENTITY_TYPE
-            ORDER BY COUNT DESC
-        """)
-        entity_counts = {row[0]: row[1] for row in cursor.fetchall()}
-        
-        # Get total entities
-        cursor.execute("SELECT COUNT(*) FROM ENTITIES")
-        total_entities = cursor.fetchone()[0]
-        
-        # Get relationship counts by predicate
-        cursor.execute("""
-            SELECT PREDICATE, COUNT(*) as COUNT
-            FROM RELATIONSHIPS
-            GROUP BY PREDICATE
-            ORDER BY COUNT DESC
-        """)
-        relationship_counts = {row[0]: row[1] for row in cursor.fetchall()}
-        
-        # Get total relationships
-        cursor.execute("SELECT COUNT(*) FROM RELATIONSHIPS")
-        total_relationships = cursor.fetchone()[0]
-        
-        cursor.close()
+    def reachable(self, query: ReachabilityQuery) -> Optional[Dict[str, Any]]:
+        """k-hop reachability; None if a referenced entity does not exist.
+        
+        With target_entity_id, answers whether the target is within max_depth
+        hops (and at what depth). Without, counts the distinct entities
+        reachable within max_depth hops.
+        """
+        deadline = time.monotonic() + settings.graph_path_timeout_seconds
+        entity_ids = [query.start_entity_id]
+        if query.target_entity_id:
+            entity_ids.append(query.target_entity_id)
+        if not self._entities_exist(entity_ids):
+            return None
+        
+        expand = self._path_expander(query.relationship_types)
+        if query.target_entity_id:
+            result = bidirectional_bfs(
+                expand, query.start_entity_id, query.target_entity_id,
+                query.direction, query.max_depth, settings.graph_path_max_visited, deadline
+            )
+            return {
+                "reachable": result.found,
+                "depth": len(result.relationship_ids) if result.found else None,
+                "visited": result.visited,
+                "exhausted": result.exhausted
+            }
+        
+        return reachable_within(
+            expand, query.start_entity_id, query.direction,
+            query.max_depth, settings.graph_path_max_visited, deadline
+        )
+    
+    # ==================== STATISTICS ====================
+    
+    def _invalidate_stats(self):
+        with self._stats_lock:
+            self._stats = None
+    
+    def _adjust_stats(self, entity_type: Optional[str] = None, predicate: Optional[str] = None):
+        """Apply a create from this process to the cached stats snapshot"""
+        with self._stats_lock:
+            if self._stats is None:
+                return
+            if entity_type is not None:
+                by_type = self._stats["entities_by_type"]
+                by_type[entity_type] = by_type.get(entity_type, 0) + 1
+                self._stats["total_entities"] += 1
+            if predicate is not None:
+                by_predicate = self._stats["relationships_by_predicate"]
+                by_predicate[predicate] = by_predicate.get(predicate, 0) + 1
+                self._stats["total_relationships"] += 1
+                self._stats["degree_sum"] += 2
+    
+    def _load_graph_stats(self) -> Dict[str, Any]:
+        """Read a stats snapshot from the summary dynamic tables in a single query"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(_GRAPH_STATS_SQL.format(degrees=_SUMMARY_DEGREES, predicates=_SUMMARY_PREDICATES))
+            except Exception as e:
+                logger.warning(f"Graph summary tables unavailable, computing stats from base tables: {e}")
+                cursor.execute(_GRAPH_STATS_SQL.format(degrees=_BASE_DEGREES, predicates=_BASE_PREDICATES))
+            rows = cursor.fetchall()
+            cursor.close()
+        
+        entity_counts: Dict[str, int] = {}
+        relationship_counts: Dict[str, int] = {}
+        degree: Dict[str, float] = {}
+        for kind, name, value in rows:
+            if kind == "ENTITY_TYPE":
+                entity_counts[name] = int(value)
+            elif kind == "PREDICATE":
+                relationship_counts[name] = int(value)
+            else:
+                degree[name] = value
         
         return {
-            "total_entities": total_entities,
-            "total_relationships": total_relationships,
+            "total_entities": sum(entity_counts.values()),
+            "total_relationships": sum(relationship_counts.values()),
             "entities_by_type": entity_counts,
-            "relationships_by_predicate": relationship_counts
+            "relationships_by_predicate": relationship_counts,
+            "degree_sum": degree.get("DEGREE_SUM", 0.0),
+            "max_connections_per_entity": int(degree.get("MAX_DEGREE", 0)),
+            "isolated_entities": int(degree.get("ISOLATED", 0)),
+            "degree_percentiles": {
+                "p50": degree.get("P50", 0.0),
+                "p90": degree.get("P90", 0.0),
+                "p99": degree.get("P99", 0.0)
+            },
+            "computed_at": datetime.utcnow()
         }
+    
+    def get_graph_stats(self) -> Dict[str, Any]:
+        """Get statistics about the ontology graph.
+        
+        Served from a snapshot of the ENTITY_RELATIONSHIP_SUMMARY and
+        PREDICATE_SUMMARY dynamic tables that is reloaded once it is older than
+        GRAPH_STATS_MAX_STALENESS_SECONDS. Creates made through this service are
+        applied to the snapshot immediately (counts only; the isolated count,
+        degree percentiles and maximum stay as of the snapshot, as a create
+        can't tell whether it ended an entity's isolation), and updates or
+        deletes force a reload.
+        """
+        with self._stats_lock:
+            snapshot = self._stats
+            if snapshot is not None and time.monotonic() - self._stats_loaded_at >= settings.graph_stats_max_staleness_seconds:
+                snapshot = None
+        if snapshot is None:
+            snapshot = self._load_graph_stats()
+            with self._stats_lock:
+                self._stats = snapshot
+                self._stats_loaded_at = time.monotonic()
+        
+        with self._stats_lock:
+            stats = dict(snapshot)
+            stats["entities_by_type"] = dict(sorted(snapshot["entities_by_type"].items(), key=lambda item: -item[1]))
+            stats["relationships_by_predicate"] = dict(
+                sorted(snapshot["relationships_by_predicate"].items(), key=lambda item: -item[1])
+            )
+            stats["degree_percentiles"] = dict(snapshot["degree_percentiles"])
+            degree_sum = stats.pop("degree_sum")
+        
+        total_entities = stats["total_entities"]
+        stats["avg_connections_per_entity"] = round(degree_sum / total_entities, 2) if total_entities else 0.0
+        return stats
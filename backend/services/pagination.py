@@ -0,0 +1,49 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Any, Callable, Optional, Tuple
+from models import PaginatedResponse
+
+Cursor = Tuple[datetime, str]
+
+
+def encode_cursor(sort_value: datetime, row_id: str) -> str:
+    """Opaque token for the position after (sort_value, row_id)"""
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """Inverse of encode_cursor; raises ValueError for a malformed token"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), str(row_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def keyset_predicate(sort_column: str, id_column: str) -> str:
+    """WHERE fragment selecting rows after a cursor in (sort_column DESC, id_column DESC) order.
+
+    Takes three parameters: sort value, sort value, id.
+    """
+    return f"({sort_column} < %s OR ({sort_column} = %s AND {id_column} < %s))"
+
+
+def build_page(
+    items: List[Any],
+    limit: int,
+    key: Callable[[Any], Cursor],
+    total: Optional[int] = None
+) -> PaginatedResponse:
+    """Page from limit + 1 fetched items; the extra item only signals that more exist"""
+    has_more = len(items) > limit
+    items = items[:limit]
+    return PaginatedResponse(
+        items=items,
+        total=total,
+        limit=limit,
+        has_more=has_more,
+        next_cursor=encode_cursor(*key(items[-1])) if has_more else None
+    )
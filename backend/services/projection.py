@@ -0,0 +1,169 @@
+import json
+import re
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+# API field -> column, in the default response order
+ENTITY_COLUMNS = {
+    "entity_id": "ENTITY_ID",
+    "entity_type": "ENTITY_TYPE",
+    "label": "LABEL",
+    "properties": "PROPERTIES",
+    "tags": "TAGS",
+    "created_at": "CREATED_AT",
+    "updated_at": "UPDATED_AT"
+}
+RELATIONSHIP_COLUMNS = {
+    "relationship_id": "RELATIONSHIP_ID",
+    "subject_id": "SUBJECT_ID",
+    "predicate": "PREDICATE",
+    "object_id": "OBJECT_ID",
+    "properties": "PROPERTIES",
+    "created_at": "CREATED_AT"
+}
+GRAPH_NODE_FIELDS = ("entity_id", "entity_type", "label", "properties", "depth")
+GRAPH_EDGE_FIELDS = ("relationship_id", "subject_id", "predicate", "object_id", "properties")
+
+# VARIANT columns and the value returned when they are NULL
+_VARIANT_DEFAULTS = {"properties": dict, "tags": list}
+
+_FIELD = re.compile(r"^([a-z_]+)(?:\.([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*))?$")
+
+# Nested property paths, e.g. {"address": {"city": None}}; None marks a selected leaf
+PathTree = Dict[str, Optional["PathTree"]]
+
+
+def _path_tree(paths: List[str]) -> PathTree:
+    tree: PathTree = {}
+    # Shorter paths first so that selecting "a" wins over "a.b"
+    for path in sorted(paths, key=lambda p: p.count(".")):
+        node = tree
+        parts = path.split(".")
+        for part in parts[:-1]:
+            if node.get(part, {}) is None:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def _object_sql(column: str, tree: PathTree, prefix: str = "") -> str:
+    """OBJECT_CONSTRUCT rebuilding only the selected paths of a VARIANT column"""
+    parts = []
+    for key, child in tree.items():
+        path = f"{prefix}{key}"
+        value = f"GET_PATH({column}, '{path}')" if child is None else _object_sql(column, child, path + ".")
+        parts.append(f"'{key}', {value}")
+    return f"OBJECT_CONSTRUCT({', '.join(parts)})"
+
+
+def _prune(value: Any, tree: PathTree) -> Dict[str, Any]:
+    """Python equivalent of _object_sql for already-decoded properties"""
+    pruned = {}
+    for key, child in tree.items():
+        if child is not None:
+            pruned[key] = _prune(value.get(key) if isinstance(value, dict) else None, child)
+        elif isinstance(value, dict) and key in value:
+            pruned[key] = value[key]
+    return pruned
+
+
+class Projection:
+    """A parsed fields= list.
+
+    fields are the top-level names to return, in the default response order.
+    property_paths is None when all of properties is wanted, otherwise the tree
+    of selected sub-paths; only those are read from the VARIANT.
+    """
+
+    def __init__(self, fields: Tuple[str, ...], property_paths: Optional[PathTree]):
+        self.fields = fields
+        self.property_paths = property_paths
+
+    def properties_sql(self, column: str) -> str:
+        """Expression to select in place of a PROPERTIES column"""
+        if "properties" not in self.fields:
+            return "NULL"
+        if self.property_paths is None:
+            return column
+        return _object_sql(column, self.property_paths)
+
+    def select_list(self, columns: Dict[str, str]) -> str:
+        return ", ".join(
+            self.properties_sql(columns[field]) if field == "properties" else columns[field]
+            for field in self.fields
+        )
+
+    def row_to_dict(self, row: Sequence[Any]) -> Dict[str, Any]:
+        """Map a row selected with select_list, decoding only the VARIANT columns it contains"""
+        item = {}
+        for field, value in zip(self.fields, row):
+            if field in _VARIANT_DEFAULTS:
+                value = json.loads(value) if value else _VARIANT_DEFAULTS[field]()
+            item[field] = value
+        return item
+
+    def project(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Narrow an already-built response dict"""
+        projected = {field: item[field] for field in self.fields if field in item}
+        if "properties" in projected and self.property_paths is not None:
+            projected["properties"] = _prune(projected["properties"], self.property_paths)
+        return projected
+
+
+def _parse(fields: str) -> List[Tuple[str, Optional[str]]]:
+    parsed = []
+    for token in fields.split(","):
+        token = token.strip()
+        if not token:
+            continue
+        match = _FIELD.match(token)
+        if not match:
+            raise ValueError(f"Invalid field: {token}")
+        name, path = match.groups()
+        if path is not None and name != "properties":
+            raise ValueError(f"Only properties supports sub-path selection: {token}")
+        parsed.append((name, path))
+    return parsed
+
+
+def _projection(parsed: List[Tuple[str, Optional[str]]], allowed: Sequence[str], required: Sequence[str]) -> Projection:
+    names = set(required) | {name for name, _ in parsed if name in allowed}
+    paths = [path for name, path in parsed if name == "properties"]
+    # properties alone selects the whole column; properties.x selects sub-paths
+    property_paths = None if None in paths else _path_tree(paths)
+    return Projection(tuple(field for field in allowed if field in names), property_paths)
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str], required: Sequence[str]) -> Optional[Projection]:
+    """Parse a comma-separated fields= value, e.g. "label,properties.health_score".
+
+    Returns None when no projection was asked for. Required (identity) fields
+    are always included. Raises ValueError for unknown or malformed fields.
+    """
+    if not fields:
+        return None
+    parsed = _parse(fields)
+    for name, _ in parsed:
+        if name not in allowed:
+            raise ValueError(f"Unknown field: {name}")
+    return _projection(parsed, allowed, required)
+
+
+def parse_graph_fields(fields: Optional[str]) -> Tuple[Optional[Projection], Optional[Projection]]:
+    """Node and edge projections for a graph query.
+
+    Each field applies to the nodes and/or edges that have it; properties
+    (and its sub-paths) apply to both. Node IDs and depth, and the edge
+    endpoints and predicate, are always returned.
+    """
+    if not fields:
+        return None, None
+    parsed = _parse(fields)
+    for name, _ in parsed:
+        if name not in GRAPH_NODE_FIELDS and name not in GRAPH_EDGE_FIELDS:
+            raise ValueError(f"Unknown field: {name}")
+    return (
+        _projection(parsed, GRAPH_NODE_FIELDS, ("entity_id", "depth")),
+        _projection(parsed, GRAPH_EDGE_FIELDS, ("relationship_id", "subject_id", "predicate", "object_id"))
+    )
@@ -0,0 +1,134 @@
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+# One hop of a relationship path: "-[PREDICATE]-> TYPE" (forward) or "<-[PREDICATE]- TYPE" (backward)
+_HOP = re.compile(r"\s*(<-|-)\[\s*([^\]\s]+)\s*\](->|-)\s*([A-Za-z0-9_*]+)")
+_START = re.compile(r"\s*([A-Za-z0-9_*]+)")
+
+
+class Hop:
+    """One step of a relationship path; "*" matches any predicate or entity type"""
+
+    def __init__(self, predicate: str, forward: bool, target_type: str):
+        self.predicate = predicate
+        self.forward = forward
+        self.target_type = target_type
+
+    def __repr__(self) -> str:
+        arrow = f"-[{self.predicate}]->" if self.forward else f"<-[{self.predicate}]-"
+        return f"{arrow} {self.target_type}"
+
+
+def parse_relationship_path(path: str) -> Tuple[str, List[Hop]]:
+    """Parse "PRODUCT -[INCLUDED_IN]-> QUOTE <-[HAS_QUOTE]- ACCOUNT" into (start type, hops).
+
+    Raises ValueError if the path has no hops or an arrow points both or neither way.
+    """
+    match = _START.match(path)
+    if not match:
+        raise ValueError(f"Relationship path must start with an entity type: {path!r}")
+    start_type = match.group(1)
+    position = match.end()
+
+    hops = []
+    while position < len(path.rstrip()):
+        match = _HOP.match(path, position)
+        if not match:
+            raise ValueError(f"Cannot parse relationship path at {path[position:].strip()!r}")
+        head, predicate, tail, target_type = match.groups()
+        if (head == "<-") == (tail == "->"):
+            raise ValueError(f"Relationship {predicate} must point in exactly one direction")
+        hops.append(Hop(predicate, tail == "->", target_type))
+        position = match.end()
+    if not hops:
+        raise ValueError(f"Relationship path has no relationships: {path!r}")
+    return start_type, hops
+
+
+def effective_depth(start_type: str, hops: List[Hop], max_depth: int) -> int:
+    """Number of hops to follow.
+
+    A path that ends on the type it starts from (PART -[PART_OF]-> PART) is
+    repeated up to max_depth hops; any other path is followed once, cut at
+    max_depth.
+    """
+    end_type = hops[-1].target_type
+    repeats = start_type == end_type or "*" in (start_type, end_type)
+    return max_depth if repeats else min(max_depth, len(hops))
+
+
+def compile_propagation(
+    relationship_path: str,
+    update_fields: Dict[str, Any],
+    max_depth: int,
+    entity_id: str,
+    updated_at: datetime
+) -> Tuple[str, List[Any]]:
+    """Compile a propagation into a single MERGE over ENTITIES.
+
+    The path is expanded level by level from entity_id, level k joining the
+    relationships of hop k's predicate and direction whose far end has hop
+    k's target type. Each level keeps an entity once however many paths
+    reach it, so the work grows with depth times the relationships followed
+    rather than with the number of paths, which on diamond-shaped or cyclic
+    graphs is exponential. Every entity reached (other than the start) gets
+    update_fields set in its PROPERTIES via OBJECT_INSERT, so the whole
+    subgraph is updated by one statement.
+    """
+    if not update_fields:
+        raise ValueError("update_fields must not be empty")
+    start_type, hops = parse_relationship_path(relationship_path)
+    depth = effective_depth(start_type, hops, max_depth)
+
+    adjacency = []
+    params: List[Any] = []
+    for number, hop in enumerate(hops, start=1):
+        source, target = ("SUBJECT_ID", "OBJECT_ID") if hop.forward else ("OBJECT_ID", "SUBJECT_ID")
+        sql = f"SELECT {number} AS HOP, r.{source} AS SOURCE_ID, r.{target} AS TARGET_ID FROM RELATIONSHIPS r"
+        if hop.target_type != "*":
+            sql += f" JOIN ENTITIES te ON te.ENTITY_ID = r.{target} AND te.ENTITY_TYPE = %s"
+            params.append(hop.target_type)
+        if hop.predicate != "*":
+            sql += " WHERE r.PREDICATE = %s"
+            params.append(hop.predicate)
+        adjacency.append(sql)
+
+    start_filter = ""
+    start_params: List[Any] = [entity_id]
+    if start_type != "*":
+        start_filter = " AND ENTITY_TYPE = %s"
+        start_params.append(start_type)
+
+    properties = "COALESCE(e.PROPERTIES::OBJECT, OBJECT_CONSTRUCT())"
+    update_params: List[Any] = []
+    for field, value in update_fields.items():
+        properties = f"OBJECT_INSERT({properties}, %s, PARSE_JSON(%s), TRUE)"
+        update_params.extend([field, json.dumps(value)])
+
+    # max_depth is small (PropagateConfig allows 5), so the levels are unrolled: a recursive CTE can't
+    # deduplicate within its recursive step
+    levels = [f"level_0 AS (SELECT ENTITY_ID FROM ENTITIES WHERE ENTITY_ID = %s{start_filter})"]
+    for level in range(1, depth + 1):
+        levels.append(f"""level_{level} AS (
+                SELECT DISTINCT a.TARGET_ID AS ENTITY_ID
+                FROM level_{level - 1} l
+                JOIN adjacency a ON a.SOURCE_ID = l.ENTITY_ID AND a.HOP = {(level - 1) % len(hops) + 1}
+            )""")
+    level_ctes = ",\n            ".join(levels)
+    reached = " UNION ".join(f"SELECT ENTITY_ID FROM level_{level}" for level in range(1, depth + 1))
+
+    sql = f"""
+        MERGE INTO ENTITIES e
+        USING (
+            WITH adjacency AS ({" UNION ALL ".join(adjacency)}),
+            {level_ctes}
+            SELECT ENTITY_ID FROM ({reached}) WHERE ENTITY_ID != %s
+        ) reached
+        ON e.ENTITY_ID = reached.ENTITY_ID
+        WHEN MATCHED THEN UPDATE SET
+            PROPERTIES = {properties},
+            UPDATED_AT = %s
+    """
+    return sql, params + start_params + [entity_id] + update_params + [updated_at]
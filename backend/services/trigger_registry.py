@@ -0,0 +1,347 @@
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+WILDCARD = "*"
+
+_CLAUSE = re.compile(
+    r"^\s*(?P<field>[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*)\s*"
+    r"(?:(?P<op>!=|>=|<=|=|>|<)\s*(?P<value>.+?)|\s(?P<word_op>IN|LIKE)\s*(?P<word_value>.+?))\s*$",
+    re.IGNORECASE
+)
+_BARE_STATE = re.compile(r"^[A-Za-z0-9_]+$")
+_TRANSITION = re.compile(r"^\s*(?P<previous>[A-Za-z0-9_*]+)\s*->\s*(?P<current>[A-Za-z0-9_*]+)\s*$")
+_AND = re.compile(r"\s+AND\s+", re.IGNORECASE)
+_OR = re.compile(r"\bOR\b", re.IGNORECASE)
+
+_STATE_FIELDS = {"current_state", "previous_state"}
+_ENTITY_FIELDS = {"entity_type", "tags", "properties"}
+
+
+def _strip_quotes(value: str) -> str:
+    """The value without its enclosing quotes; raises ValueError for quotes anywhere else.
+
+    A stray quote means the clause is not a single comparison (e.g. "= 'A' OR x = 'B'"),
+    which the grammar can't express.
+    """
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        value = value[1:-1]
+    if "'" in value or '"' in value:
+        raise ValueError(f"Unbalanced or embedded quotes in trigger value: {value}")
+    return value
+
+
+def _like_regex(pattern: str) -> "re.Pattern[str]":
+    return re.compile("^" + re.escape(pattern).replace("%", ".*").replace("_", ".") + "$", re.DOTALL)
+
+
+class Predicate:
+    """One field/operator/value clause of a trigger condition"""
+
+    def __init__(self, field: str, op: str, values: Tuple[str, ...]):
+        self.field = field
+        self.op = op
+        self.values = values
+        self._like = _like_regex(values[0]) if op == "LIKE" else None
+
+    def _resolve(self, context: Dict[str, Any]) -> Any:
+        head, _, path = self.field.partition(".")
+        value = context.get(head)
+        for part in path.split(".") if path else []:
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+
+    def _compare(self, actual: Any) -> bool:
+        if actual is None:
+            return self.op == "!="
+        if self.op == "=":
+            return str(actual) == self.values[0]
+        if self.op == "!=":
+            return str(actual) != self.values[0]
+        if self.op == "IN":
+            return str(actual) in self.values
+        if self.op == "LIKE":
+            return bool(self._like.match(str(actual)))
+        try:
+            left, right = float(actual), float(self.values[0])
+        except (TypeError, ValueError):
+            left, right = str(actual), self.values[0]
+        return {">": left > right, "<": left < right, ">=": left >= right, "<=": left <= right}[self.op]
+
+    def matches(self, context: Dict[str, Any]) -> bool:
+        actual = self._resolve(context)
+        if self.field == "tags":
+            tags = actual or []
+            if self.op == "!=":
+                return self.values[0] not in tags
+            return any(self._compare(tag) for tag in tags)
+        return self._compare(actual)
+
+
+class TriggerCondition:
+    """A parsed trigger_condition.
+
+    states / previous_states are the current and previous states the
+    condition can match (None means any) and decide where it is indexed;
+    predicates are all clauses, evaluated on the candidates a lookup returns.
+    A condition that cannot be parsed keeps the original substring test
+    (legacy) and is evaluated for every state change.
+    """
+
+    def __init__(
+        self,
+        states: Optional[FrozenSet[str]] = None,
+        previous_states: Optional[FrozenSet[str]] = None,
+        predicates: Iterable[Predicate] = (),
+        legacy: Optional[str] = None
+    ):
+        self.states = states
+        self.previous_states = previous_states
+        self.predicates = list(predicates)
+        self.legacy = legacy
+        self.needs_entity = any(p.field.partition(".")[0] in _ENTITY_FIELDS for p in self.predicates)
+
+    def matches(self, context: Dict[str, Any]) -> bool:
+        if self.legacy is not None:
+            return context["current_state"] in self.legacy
+        return all(predicate.matches(context) for predicate in self.predicates)
+
+
+def parse_trigger(condition: str) -> TriggerCondition:
+    """Parse a trigger condition; raises ValueError if it is not in the trigger grammar.
+
+    Accepted forms: "*" (every state change), a bare state ("AT_RISK"), a
+    transition ("ACTIVE->AT_RISK", either side may be "*"), or clauses joined
+    by AND: "entity_type=CUSTOMER AND current_state IN (AT_RISK, CHURNED)".
+    Clause operators are =, !=, >, <, >=, <=, IN and LIKE on current_state,
+    previous_state, entity_type, tags and properties.<path>. OR is not part
+    of the grammar, so conditions using it keep the legacy substring test.
+    """
+    condition = (condition or "").strip()
+    if condition == WILDCARD:
+        return TriggerCondition()
+    if _BARE_STATE.match(condition):
+        return TriggerCondition(states=frozenset([condition]), predicates=[Predicate("current_state", "=", (condition,))])
+    transition = _TRANSITION.match(condition)
+    if transition:
+        predicates = []
+        for field, state in (("previous_state", transition["previous"]), ("current_state", transition["current"])):
+            if state != WILDCARD:
+                predicates.append(Predicate(field, "=", (state,)))
+        return _indexed(predicates)
+
+    predicates = []
+    for clause in _AND.split(condition):
+        match = _CLAUSE.match(clause)
+        if not match:
+            raise ValueError(f"Invalid trigger clause: {clause}")
+        if _OR.search(match["value"] or match["word_value"]):
+            raise ValueError(f"OR is not supported in trigger conditions: {clause}")
+        field = match["field"]
+        if field.partition(".")[0] not in _STATE_FIELDS | _ENTITY_FIELDS or field == "properties":
+            raise ValueError(f"Unknown trigger field: {field}")
+        if match["op"]:
+            predicates.append(Predicate(field, match["op"], (_strip_quotes(match["value"]),)))
+        elif match["word_op"].upper() == "IN":
+            values = match["word_value"].strip()
+            if not (values.startswith("(") and values.endswith(")")):
+                raise ValueError(f"IN expects a parenthesized list: {clause}")
+            predicates.append(Predicate(field, "IN", tuple(_strip_quotes(v) for v in values[1:-1].split(","))))
+        else:
+            predicates.append(Predicate(field, "LIKE", (_strip_quotes(match["word_value"]),)))
+    return _indexed(predicates)
+
+
+def _indexed(predicates: List[Predicate]) -> TriggerCondition:
+    """Derive the index keys from equality/IN clauses on the state fields"""
+    keys: Dict[str, FrozenSet[str]] = {}
+    for predicate in predicates:
+        if predicate.field in _STATE_FIELDS and predicate.op in ("=", "IN"):
+            values = frozenset(predicate.values)
+            keys[predicate.field] = keys[predicate.field] & values if predicate.field in keys else values
+    return TriggerCondition(
+        states=keys.get("current_state"),
+        previous_states=keys.get("previous_state"),
+        predicates=predicates
+    )
+
+
+class TriggerRegistry:
+    """In-memory index of enabled workflows' trigger conditions.
+
+    Conditions are indexed by transition (previous, current), by current
+    state, and otherwise kept in a wildcard bucket, so matching a state
+    change is a few hash lookups plus predicate checks on the candidates.
+    The registry is updated directly by this process's workflow writes and
+    reloaded when the version returned by version() changes; that check runs
+    at most every check_interval seconds, on the matching path.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], List[Tuple[str, str]]],
+        version: Callable[[], Any],
+        check_interval: float = 5.0
+    ):
+        self._load = load
+        self._version = version
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._conditions: Dict[str, TriggerCondition] = {}
+        self._by_transition: Dict[Tuple[str, str], Set[str]] = {}
+        self._by_state: Dict[str, Set[str]] = {}
+        self._wildcard: Set[str] = set()
+
+        self._loaded_version: Any = None
+        self._checked_at: Optional[float] = None
+        self.reloads = 0
+        self.lookups = 0
+
+    def _index(self, workflow_id: str, condition: TriggerCondition):
+        self._conditions[workflow_id] = condition
+        if condition.states is None:
+            self._wildcard.add(workflow_id)
+        elif condition.previous_states is None:
+            for state in condition.states:
+                self._by_state.setdefault(state, set()).add(workflow_id)
+        else:
+            for previous in condition.previous_states:
+                for state in condition.states:
+                    self._by_transition.setdefault((previous, state), set()).add(workflow_id)
+
+    def _unindex(self, workflow_id: str):
+        condition = self._conditions.pop(workflow_id, None)
+        if condition is None:
+            return
+        self._wildcard.discard(workflow_id)
+        for buckets in (self._by_state, self._by_transition):
+            for key in [key for key, ids in buckets.items() if workflow_id in ids]:
+                buckets[key].discard(workflow_id)
+                if not buckets[key]:
+                    del buckets[key]
+
+    @staticmethod
+    def _parse(workflow_id: str, trigger_condition: str) -> TriggerCondition:
+        try:
+            return parse_trigger(trigger_condition)
+        except ValueError as e:
+            logger.warning(f"Workflow {workflow_id}: {e}; falling back to substring matching")
+            return TriggerCondition(legacy=trigger_condition or "")
+
+    def upsert(self, workflow_id: str, trigger_condition: str, enabled: bool = True):
+        condition = self._parse(workflow_id, trigger_condition) if enabled else None
+        with self._lock:
+            self._unindex(workflow_id)
+            if condition is not None:
+                self._index(workflow_id, condition)
+
+    def remove(self, workflow_id: str):
+        with self._lock:
+            self._unindex(workflow_id)
+
+    def reload(self):
+        version = self._version()
+        rows = self._load()
+        conditions = [(workflow_id, self._parse(workflow_id, trigger)) for workflow_id, trigger in rows]
+        with self._lock:
+            self._conditions = {}
+            self._by_transition = {}
+            self._by_state = {}
+            self._wildcard = set()
+            for workflow_id, condition in conditions:
+                self._index(workflow_id, condition)
+            self._loaded_version = version
+            self._checked_at = time.monotonic()
+        self.reloads += 1
+
+    def _ensure_current(self):
+        if self._checked_at is None:
+            return self.reload()
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        version = self._version()
+        self._checked_at = time.monotonic()
+        if version != self._loaded_version:
+            self.reload()
+
+    def _candidates(self, current_state: str, previous_state: Optional[str]) -> List[Tuple[str, TriggerCondition]]:
+        with self._lock:
+            candidates = set(self._wildcard)
+            candidates |= self._by_state.get(current_state, set())
+            if previous_state is not None:
+                candidates |= self._by_transition.get((previous_state, current_state), set())
+            return [(workflow_id, self._conditions[workflow_id]) for workflow_id in candidates]
+
+    def match(
+        self,
+        current_state: str,
+        previous_state: Optional[str],
+        load_entity: Callable[[], Optional[Dict[str, Any]]]
+    ) -> List[str]:
+        """IDs of the enabled workflows triggered by a state change.
+
+        load_entity returns {"entity_type", "tags", "properties"} and is only
+        called if a candidate condition refers to entity fields.
+        """
+        self._ensure_current()
+        conditions = self._candidates(current_state, previous_state)
+        self.lookups += 1
+
+        context: Dict[str, Any] = {"current_state": current_state, "previous_state": previous_state}
+        if any(condition.needs_entity for _, condition in conditions):
+            context.update(load_entity() or {})
+        return sorted(workflow_id for workflow_id, condition in conditions if condition.matches(context))
+
+    def match_many(
+        self,
+        changes: List[Tuple[str, str, Optional[str]]],
+        load_entities: Callable[[List[str]], Dict[str, Dict[str, Any]]]
+    ) -> List[Tuple[str, str]]:
+        """(entity_id, workflow_id) pairs triggered by a batch of (entity_id, current, previous) state changes.
+
+        Candidates are looked up once per distinct transition, and the
+        entities that a candidate condition needs are loaded with a single
+        load_entities call.
+        """
+        self._ensure_current()
+        by_transition: Dict[Tuple[str, Optional[str]], List[Tuple[str, TriggerCondition]]] = {}
+        for _, current_state, previous_state in changes:
+            key = (current_state, previous_state)
+            if key not in by_transition:
+                by_transition[key] = self._candidates(current_state, previous_state)
+        self.lookups += len(by_transition)
+
+        needs_entity = {
+            entity_id for entity_id, current_state, previous_state in changes
+            if any(condition.needs_entity for _, condition in by_transition[(current_state, previous_state)])
+        }
+        entities = load_entities(sorted(needs_entity)) if needs_entity else {}
+
+        matches = []
+        for entity_id, current_state, previous_state in changes:
+            context: Dict[str, Any] = {"current_state": current_state, "previous_state": previous_state}
+            context.update(entities.get(entity_id, {}))
+            conditions = by_transition[(current_state, previous_state)]
+            matches.extend(
+                (entity_id, workflow_id)
+                for workflow_id, condition in sorted(conditions, key=lambda c: c[0])
+                if condition.matches(context)
+            )
+        return matches
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workflows": len(self._conditions),
+            "by_transition": sum(len(ids) for ids in self._by_transition.values()),
+            "by_state": sum(len(ids) for ids in self._by_state.values()),
+            "wildcard": len(self._wildcard),
+            "legacy": sum(1 for condition in self._conditions.values() if condition.legacy is not None),
+            "reloads": self.reloads,
+            "lookups": self.lookups
+        }
@@ -0,0 +1,162 @@
+import json
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+from models import ValidationRule, ValidationRuleType
+
+FAILURE_MODES = ("TAG_INVALID", "REJECT", "NOTIFY", "ROLLBACK")
+
+# Tag added to failing entities with on_failure TAG_INVALID
+INVALID_TAG = "invalid"
+
+# Anchored like REGEXP_LIKE, which must match the whole value
+EMAIL_PATTERN = r"[^@\s]+@[^@\s]+\.[^@\s]+"
+
+_MISSING = object()
+
+
+class ValidationFailed(Exception):
+    """Entities failed validation with on_failure REJECT or ROLLBACK; output holds the violations"""
+
+    def __init__(self, message: str, output: Dict[str, Any]):
+        super().__init__(message)
+        self.output = output
+
+
+def _lookup(properties: Dict[str, Any], path: List[str]) -> Any:
+    value: Any = properties
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+    return value
+
+
+def _as_text(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _member_key(value: Any) -> Tuple[bool, Any]:
+    # Keeps True apart from 1 while 1 and 1.0 stay equal, as in Snowflake
+    return (isinstance(value, bool), value)
+
+
+class _CompiledRule:
+    """One rule with its regex or value set built once"""
+
+    def __init__(self, rule: ValidationRule):
+        self.rule = rule
+        self.path = rule.field.split(".")
+        self.required = rule.required or rule.type == ValidationRuleType.REQUIRED
+        self.regex = None
+        self.members = None
+
+        if rule.type == ValidationRuleType.REGEX:
+            if not rule.pattern:
+                raise ValueError(f"Regex rule on {rule.field} needs a pattern")
+            self.regex = re.compile(rule.pattern)
+        elif rule.type == ValidationRuleType.EMAIL:
+            self.regex = re.compile(EMAIL_PATTERN)
+        elif rule.type == ValidationRuleType.IN_LIST:
+            if not rule.values:
+                raise ValueError(f"in_list rule on {rule.field} needs values")
+            self.members = frozenset(_member_key(value) for value in rule.values)
+        elif rule.type == ValidationRuleType.RANGE:
+            if rule.min is None and rule.max is None:
+                raise ValueError(f"Range rule on {rule.field} needs min or max")
+
+    def violated(self, properties: Dict[str, Any]) -> bool:
+        value = _lookup(properties, self.path)
+        if value is _MISSING or value is None or value == "":
+            return self.required
+        if self.regex is not None:
+            return self.regex.fullmatch(_as_text(value)) is None
+        if self.members is not None:
+            try:
+                return _member_key(value) not in self.members
+            except TypeError:
+                return True
+        if self.rule.type == ValidationRuleType.RANGE:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return True
+            return (self.rule.min is not None and value < self.rule.min) or (
+                self.rule.max is not None and value > self.rule.max
+            )
+        return False
+
+    def violation_sql(self) -> Tuple[str, List[Any]]:
+        """Condition on ENTITIES.PROPERTIES that holds for the entities violating this rule"""
+        field = self.rule.field
+        value = "STRIP_NULL_VALUE(GET_PATH(PROPERTIES, %s))"
+        missing = f"({value} IS NULL OR {value} = TO_VARIANT(''))"
+
+        check = None
+        check_params: List[Any] = []
+        if self.regex is not None:
+            check = f"NOT REGEXP_LIKE(TO_VARCHAR({value}), %s)"
+            check_params = [field, self.regex.pattern]
+        elif self.members is not None:
+            check = f"NOT ARRAY_CONTAINS({value}, PARSE_JSON(%s)::ARRAY)"
+            check_params = [field, json.dumps(self.rule.values)]
+        elif self.rule.type == ValidationRuleType.RANGE:
+            number = f"TRY_TO_DOUBLE(TO_VARCHAR({value}))"
+            check = f"(TYPEOF({value}) NOT IN ('INTEGER', 'DECIMAL', 'DOUBLE') OR {number} IS NULL"
+            check_params = [field, field]
+            if self.rule.min is not None:
+                check += f" OR {number} < %s"
+                check_params.extend([field, self.rule.min])
+            if self.rule.max is not None:
+                check += f" OR {number} > %s"
+                check_params.extend([field, self.rule.max])
+            check += ")"
+
+        conditions = []
+        params: List[Any] = []
+        if self.required:
+            conditions.append(missing)
+            params.extend([field, field])
+        if check is not None:
+            conditions.append(f"(NOT {missing} AND {check})")
+            params.extend([field, field] + check_params)
+        if not conditions:
+            return "FALSE", []
+        return "(" + " OR ".join(conditions) + ")", params
+
+
+class CompiledValidator:
+    """Validation rules compiled once per workflow definition.
+
+    validate() checks a batch of entities in one pass over their
+    properties. violation_sql() expresses the same rules as a WHERE
+    condition over ENTITIES, so violators can be found or tagged in the
+    warehouse; there, regex patterns use Snowflake's regex syntax. Patterns
+    must match the whole value, as REGEXP_LIKE does. Rules other than
+    required pass when the field is missing, null or empty.
+    """
+
+    def __init__(self, rules: List[ValidationRule]):
+        if not rules:
+            raise ValueError("At least one validation rule is required")
+        self.rules = [_CompiledRule(rule) for rule in rules]
+
+    def validate(self, entities: Iterable[Tuple[str, Dict[str, Any]]]) -> Dict[str, List[Dict[str, str]]]:
+        """Returns {entity_id: [violations]} for the entities failing any rule"""
+        invalid: Dict[str, List[Dict[str, str]]] = {}
+        for entity_id, properties in entities:
+            for compiled in self.rules:
+                if compiled.violated(properties):
+                    invalid.setdefault(entity_id, []).append({
+                        "field": compiled.rule.field,
+                        "type": compiled.rule.type.value,
+                        "error": compiled.rule.error_message
+                    })
+        return invalid
+
+    def violation_sql(self) -> Tuple[str, List[Any]]:
+        """WHERE condition matching entities that fail any rule"""
+        conditions = []
+        params: List[Any] = []
+        for compiled in self.rules:
+            sql, rule_params = compiled.violation_sql()
+            conditions.append(sql)
+            params.extend(rule_params)
+        return "(" + " OR ".join(conditions) + ")", params
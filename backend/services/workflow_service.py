@@ -1,105 +1,268 @@
 import json
+import logging
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from config import settings
 from database import SnowflakeConnection
 from models import (
-    WorkflowDefinition, WorkflowExecution, WorkflowStatus, EntityState
+    ActionType, WorkflowDefinition, WorkflowExecution, WorkflowStatus, EntityState, StateUpdateResult,
+    StateTransitionRequest, AggregateConfig, CompositeConfig, CompositeStep, EnrichConfig, PropagateConfig,
+    SQLQueryConfig, ValidateConfig, PaginatedResponse
 )
+from services import composite
+from services.aggregation import Aggregation
+from services.bulk_load import insert_values, create_temp_table, copy_into_temp_table, split_rows
+from services.cache import TTLCache, ALL_KEYS
+from services.cache_invalidation import CacheInvalidationBus
+from services.enrichment import EnrichmentEngine
+from services.execution_log import ExecutionLogWriter, ENQUEUED_SEQ, event_seq
+from services.execution_queue import ExecutionQueue, QueuedExecution
+from services.pagination import Cursor, decode_cursor, keyset_predicate, build_page
+from services.propagation import compile_propagation
+from services.trigger_registry import TriggerRegistry
+from services.validation import CompiledValidator, ValidationFailed, FAILURE_MODES, INVALID_TAG
+
+logger = logging.getLogger(__name__)
+
+# Above this many written entities a bulk write clears the state cache instead of invalidating each key
+_MAX_BULK_INVALIDATIONS = 1000
+
+# Entities per AGGREGATE query and per MERGE of workflow-computed properties
+_AGGREGATE_BATCH_SIZE = 1000
+
+# Failing entities whose violations (or IDs) a VALIDATE execution reports
+_VALIDATION_SAMPLE_SIZE = 100
+
+# Finished async PROPAGATE query IDs remembered, oldest forgotten first
+_MAX_FINISHED_PROPAGATIONS = 10000
 
 
 class WorkflowService:
     """Service for managing workflows and entity states"""
     
-    def __init__(self, db: SnowflakeConnection):
+    def __init__(
+        self,
+        db: SnowflakeConnection,
+        invalidation_bus: Optional[CacheInvalidationBus] = None,
+        execution_queue: Optional[ExecutionQueue] = None,
+        execution_log: Optional[ExecutionLogWriter] = None,
+        enrichment: Optional[EnrichmentEngine] = None,
+        invalidate_entity: Optional[Callable[[str], None]] = None
+    ):
         self.db = db
-    
-    def create_workflow(self, workflow: WorkflowDefinition) -> WorkflowDefinition:
-        """Create a new workflow definition"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+        self.invalidation_bus = invalidation_bus
+        # ENRICH lookups: provider registry, LRU and ENRICHMENT_CACHE tiers, batching across executions
+        self.enrichment = enrichment or EnrichmentEngine(
+            db,
+            cache_max_bytes=settings.enrichment_cache_max_bytes,
+            batch_window=settings.enrichment_batch_window_seconds,
+            max_batch=settings.enrichment_max_batch
+        )
+        # Drops entities from OntologyService's cache after workflow actions rewrite them
+        self.invalidate_entity = invalidate_entity
+        # Entity invalidations held back until a COMPOSITE transaction on this thread commits
+        self._deferred = threading.local()
+        # Triggered workflows run on the queue's workers; without one they run inline
+        self.execution_queue = execution_queue
+        # Execution records are appended as events; an unstarted writer writes each one immediately
+        self.execution_log = execution_log or ExecutionLogWriter(db)
+        self._count_cache: Dict[str, Tuple[int, float]] = {}
         
-        workflow_id = str(uuid.uuid4())
-        now = datetime.utcnow()
+        # Read-through caches, invalidated by this service's writes (and other workers' through the bus)
+        self._caches = {
+            "state": TTLCache(settings.state_cache_max_bytes, settings.cache_ttl_seconds),
+            "workflow": TTLCache(settings.workflow_cache_max_bytes, settings.cache_ttl_seconds)
+        }
+        if invalidation_bus is not None:
+            for namespace, cache in self._caches.items():
+                invalidation_bus.register(namespace, cache)
         
-        cursor.execute("""
-            INSERT INTO WORKFLOW_DEFINITIONS (
-                WORKFLOW_ID, NAME, DESCRIPTION, TRIGGER_CONDITION,
-                ACTION_TYPE, ACTION_CONFIG, ENABLED, CREATED_AT
-            ) VALUES (%s, %s, %s, %s, %s, PARSE_JSON(%s), %s, %s)
-        """, (
-            workflow_id,
-            workflow.name,
-            workflow.description,
-            workflow.trigger_condition,
-            workflow.action_type,
-            json.dumps(workflow.action_config),
-            workflow.enabled,
-            now
+        # Shared by all COMPOSITE executions; each running step holds its own pooled connection while its
+        # parent execution (on a request or queue worker) holds another, so steps only get the pool left over
+        # by those workers. Without any, parallel steps run one at a time on the parent's connection.
+        self._parallel_step_slots = max(0, min(
+            settings.composite_max_parallel_steps,
+            settings.pool_max_size - settings.executor_max_workers - settings.execution_queue_workers
         ))
+        self._step_executor = ThreadPoolExecutor(
+            max_workers=self._parallel_step_slots, thread_name_prefix="composite-step"
+        ) if self._parallel_step_slots else None
         
-        conn.commit()
-        cursor.close()
+        # Async PROPAGATE queries seen finished here, so entity caches are cleared once when each completes;
+        # capped by count with no expiry, so a query polled again later doesn't flush them again
+        self._finished_propagations: "OrderedDict[str, None]" = OrderedDict()
+        self._finished_propagations_lock = threading.Lock()
         
-        workflow.workflow_id = workflow_id
-        workflow.created_at = now
-        return workflow
-    
-    def get_workflow(self, workflow_id: str) -> Optional[WorkflowDefinition]:
-        """Get a workflow definition by ID"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT WORKFLOW_ID, NAME, DESCRIPTION, TRIGGER_CONDITION,
-                   ACTION_TYPE, ACTION_CONFIG, ENABLED, CREATED_AT
-            FROM WORKFLOW_DEFINITIONS
-            WHERE WORKFLOW_ID = %s
-        """, (workflow_id,))
-        
-        row = cursor.fetchone()
-        cursor.close()
-        
-        if not row:
-            return None
-        
-        return WorkflowDefinition(
-            workflow_id=row[0],
-            name=row[1],
-            description=row[2],
-            trigger_condition=row[3],
-            action_type=row[4],
-            action_config=json.loads(row[5]) if row[5] else {},
-            enabled=row[6],
-            created_at=row[7]
+        # Compiled VALIDATE rules by workflow ID, with the action_config they were built from
+        self._validators: Dict[str, Tuple[Dict[str, Any], CompiledValidator]] = {}
+        
+        # Parsed trigger conditions of the enabled workflows, so state changes don't scan WORKFLOW_DEFINITIONS
+        self.trigger_registry = TriggerRegistry(
+            self._load_triggers, self._triggers_version, settings.workflow_registry_check_seconds
         )
     
-    def list_workflows(self, enabled: Optional[bool] = None) -> List[WorkflowDefinition]:
-        """List workflow definitions"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+    def _invalidate(self, namespace: str, key: str):
+        """Drop a cached entry here and, through the bus, in other workers; ALL_KEYS drops the namespace"""
+        if key == ALL_KEYS:
+            self._caches[namespace].clear()
+        else:
+            self._caches[namespace].invalidate(key)
+        if self.invalidation_bus is not None:
+            self.invalidation_bus.publish(namespace, key)
+    
+    def _invalidate_entities(self, entity_ids: List[str]):
+        """Drop entities a workflow action rewrote from OntologyService's cache.
         
-        if enabled is not None:
+        Inside a COMPOSITE transaction they are held until it commits: dropped
+        earlier, a concurrent reader could cache the uncommitted row's old
+        version again for the whole TTL.
+        """
+        if self.invalidate_entity is None:
+            return
+        deferred = getattr(self._deferred, "entity_ids", None)
+        if deferred is not None:
+            deferred.extend(entity_ids)
+            return
+        for entity_id in entity_ids:
+            self.invalidate_entity(entity_id)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        return {namespace: cache.stats() for namespace, cache in self._caches.items()}
+    
+    def _load_triggers(self) -> List[Tuple[str, str]]:
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
             cursor.execute("""
-                SELECT WORKFLOW_ID, NAME, DESCRIPTION, TRIGGER_CONDITION,
-                       ACTION_TYPE, ACTION_CONFIG, ENABLED, CREATED_AT
+                SELECT WORKFLOW_ID, TRIGGER_CONDITION
                 FROM WORKFLOW_DEFINITIONS
-                WHERE ENABLED = %s
-                ORDER BY CREATED_AT DESC
-            """, (enabled,))
-        else:
+                WHERE ENABLED = TRUE
+            """)
+            rows = cursor.fetchall()
+            cursor.close()
+            return [(row[0], row[1]) for row in rows]
+    
+    def _triggers_version(self) -> Tuple[Any, ...]:
+        """Fingerprint of the trigger-relevant columns; changes when any worker creates or edits a workflow"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
             cursor.execute("""
-                SELECT WORKFLOW_ID, NAME, DESCRIPTION, TRIGGER_CONDITION,
-                       ACTION_TYPE, ACTION_CONFIG, ENABLED, CREATED_AT
+                SELECT COUNT(*), HASH_AGG(WORKFLOW_ID, TRIGGER_CONDITION, ENABLED)
                 FROM WORKFLOW_DEFINITIONS
-                ORDER BY CREATED_AT DESC
             """)
+            row = cursor.fetchone()
+            cursor.close()
+            return tuple(row)
+    
+    def create_workflow(self, workflow: WorkflowDefinition) -> WorkflowDefinition:
+        """Create a new workflow definition"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            workflow_id = str(uuid.uuid4())
+            now = datetime.utcnow()
+            
+            cursor.execute("""
+                INSERT INTO WORKFLOW_DEFINITIONS (
+                    WORKFLOW_ID, NAME, DESCRIPTION, TRIGGER_CONDITION,
+                    ACTION_TYPE, ACTION_CONFIG, ENABLED, CREATED_AT
+                ) VALUES (%s, %s, %s, %s, %s, PARSE_JSON(%s), %s, %s)
+            """, (
+                workflow_id,
+                workflow.name,
+                workflow.description,
+                workflow.trigger_condition,
+                workflow.action_type,
+                json.dumps(workflow.action_config),
+                workflow.enabled,
+                now
+            ))
+            
+            conn.commit()
+            cursor.close()
+            
+            workflow.workflow_id = workflow_id
+            workflow.created_at = now
+            self._caches["workflow"].put(workflow_id, workflow.model_copy())
+            self.trigger_registry.upsert(workflow_id, workflow.trigger_condition, workflow.enabled)
+            return workflow
+    
+    def update_workflow(self, workflow_id: str, workflow: WorkflowDefinition) -> Optional[WorkflowDefinition]:
+        """Replace a workflow definition; None if it does not exist"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                UPDATE WORKFLOW_DEFINITIONS
+                SET NAME = %s,
+                    DESCRIPTION = %s,
+                    TRIGGER_CONDITION = %s,
+                    ACTION_TYPE = %s,
+                    ACTION_CONFIG = PARSE_JSON(%s),
+                    ENABLED = %s
+                WHERE WORKFLOW_ID = %s
+            """, (
+                workflow.name,
+                workflow.description,
+                workflow.trigger_condition,
+                workflow.action_type,
+                json.dumps(workflow.action_config),
+                workflow.enabled,
+                workflow_id
+            ))
+            
+            if cursor.rowcount == 0:
+                cursor.close()
+                return None
+            
+            conn.commit()
+            
+            cursor.execute(
+                "SELECT CREATED_AT FROM WORKFLOW_DEFINITIONS WHERE WORKFLOW_ID = %s", (workflow_id,)
+            )
+            row = cursor.fetchone()
+            cursor.close()
         
-        rows = cursor.fetchall()
-        cursor.close()
+        updated = workflow.model_copy(update={"workflow_id": workflow_id, "created_at": row[0] if row else None})
+        self._invalidate("workflow", workflow_id)
+        self._validators.pop(workflow_id, None)
+        self._caches["workflow"].put(workflow_id, updated.model_copy())
+        self.trigger_registry.upsert(workflow_id, updated.trigger_condition, updated.enabled)
+        return updated
         
-        return [
-            WorkflowDefinition(
+    def get_workflow(self, workflow_id: str) -> Optional[WorkflowDefinition]:
+        """Get a workflow definition by ID (cached)"""
+        cache = self._caches["workflow"]
+        workflow = cache.get(workflow_id)
+        if workflow is None:
+            generation = cache.generation()
+            workflow = self._fetch_workflow(workflow_id)
+            if workflow is not None:
+                cache.put(workflow_id, workflow, generation)
+        return workflow
+    
+    def _fetch_workflow(self, workflow_id: str) -> Optional[WorkflowDefinition]:
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT WORKFLOW_ID, NAME, DESCRIPTION, TRIGGER_CONDITION,
+                       ACTION_TYPE, ACTION_CONFIG, ENABLED, CREATED_AT
+                FROM WORKFLOW_DEFINITIONS
+                WHERE WORKFLOW_ID = %s
+            """, (workflow_id,))
+            
+            row = cursor.fetchone()
+            cursor.close()
+            
+            if not row:
+                return None
+            
+            return WorkflowDefinition(
                 workflow_id=row[0],
                 name=row[1],
                 description=row[2],
@@ -109,9 +272,45 @@ class WorkflowService:
                 enabled=row[6],
                 created_at=row[7]
             )
-            for row in rows
-        ]
-    
+        
+    def list_workflows(self, enabled: Optional[bool] = None) -> List[WorkflowDefinition]:
+        """List workflow definitions"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            if enabled is not None:
+                cursor.execute("""
+                    SELECT WORKFLOW_ID, NAME, DESCRIPTION, TRIGGER_CONDITION,
+                           ACTION_TYPE, ACTION_CONFIG, ENABLED, CREATED_AT
+                    FROM WORKFLOW_DEFINITIONS
+                    WHERE ENABLED = %s
+                    ORDER BY CREATED_AT DESC
+                """, (enabled,))
+            else:
+                cursor.execute("""
+                    SELECT WORKFLOW_ID, NAME, DESCRIPTION, TRIGGER_CONDITION,
+                           ACTION_TYPE, ACTION_CONFIG, ENABLED, CREATED_AT
+                    FROM WORKFLOW_DEFINITIONS
+                    ORDER BY CREATED_AT DESC
+                """)
+            
+            rows = cursor.fetchall()
+            cursor.close()
+            
+            return [
+                WorkflowDefinition(
+                    workflow_id=row[0],
+                    name=row[1],
+                    description=row[2],
+                    trigger_condition=row[3],
+                    action_type=row[4],
+                    action_config=json.loads(row[5]) if row[5] else {},
+                    enabled=row[6],
+                    created_at=row[7]
+                )
+                for row in rows
+            ]
+        
     def execute_workflow(
         self,
         workflow_id: str,
@@ -119,91 +318,103 @@ class WorkflowService:
         input_data: Dict[str, Any]
     ) -> WorkflowExecution:
         """Execute a workflow"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        execution_id = str(uuid.uuid4())
-        now = datetime.utcnow()
-        
         # Get workflow definition
         workflow = self.get_workflow(workflow_id)
         if not workflow:
             raise ValueError(f"Workflow {workflow_id} not found")
         
-        # Create execution record
-        cursor.execute("""
-            INSERT INTO WORKFLOW_EXECUTIONS (
-                EXECUTION_ID, WORKFLOW_ID, ENTITY_ID, STATUS,
-                INPUT_DATA, STARTED_AT
-            ) VALUES (%s, %s, %s, %s, PARSE_JSON(%s), %s)
-        """, (
-            execution_id,
-            workflow_id,
-            entity_id,
-            WorkflowStatus.IN_PROGRESS.value,
-            json.dumps(input_data),
-            now
-        ))
+        execution = WorkflowExecution(
+            execution_id=str(uuid.uuid4()),
+            workflow_id=workflow_id,
+            entity_id=entity_id,
+            status=WorkflowStatus.IN_PROGRESS,
+            input_data=input_data,
+            started_at=datetime.utcnow()
+        )
+        self.execution_log.record(execution, event_seq(0, finished=False))
         
-        conn.commit()
+        execution = self._run_action(workflow, execution)
+        self.execution_log.record(execution, event_seq(0, finished=True))
+        return execution
+    
+    def _run_action(self, workflow: WorkflowDefinition, execution: WorkflowExecution) -> WorkflowExecution:
+        """Run the action of a started execution; returns it COMPLETED or FAILED"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                output_data = self._execute_workflow_action(
+                    workflow, execution.entity_id, execution.input_data, cursor
+                )
+                conn.commit()
+                update = {"status": WorkflowStatus.COMPLETED, "output_data": output_data}
+            except Exception as e:
+                # A failed COMPOSITE still reports its step results
+                update = {
+                    "status": WorkflowStatus.FAILED,
+                    "error_message": str(e),
+                    "output_data": getattr(e, "output", None)
+                }
+            cursor.close()
         
-        # Execute the workflow action
-        try:
-            output_data = self._execute_workflow_action(
-                workflow, entity_id, input_data, cursor
-            )
-            
-            # Update execution as completed
-            cursor.execute("""
-                UPDATE WORKFLOW_EXECUTIONS
-                SET STATUS = %s,
-                    OUTPUT_DATA = PARSE_JSON(%s),
-                    COMPLETED_AT = %s
-                WHERE EXECUTION_ID = %s
-            """, (
-                WorkflowStatus.COMPLETED.value,
-                json.dumps(output_data),
-                datetime.utcnow(),
-                execution_id
-            ))
-            
-            conn.commit()
-            status = WorkflowStatus.COMPLETED
-            error_message = None
-            
-        except Exception as e:
-            # Update execution as failed
-            error_message = str(e)
-            cursor.execute("""
-                UPDATE WORKFLOW_EXECUTIONS
-                SET STATUS = %s,
-                    ERROR_MESSAGE = %s,
-                    COMPLETED_AT = %s
-                WHERE EXECUTION_ID = %s
-            """, (
-                WorkflowStatus.FAILED.value,
-                error_message,
-                datetime.utcnow(),
-                execution_id
-            ))
-            
-            conn.commit()
-            status = WorkflowStatus.FAILED
-            output_data = None
+        update["completed_at"] = datetime.utcnow()
+        return execution.model_copy(update=update)
+    
+    def enqueue_executions(self, triggered: List[Tuple[str, str, Dict[str, Any]]]) -> List[str]:
+        """Queue (workflow_id, entity_id, input_data) executions and log them as PENDING; returns their IDs"""
+        if not triggered:
+            return []
+        executions = [
+            QueuedExecution(str(uuid.uuid4()), workflow_id, entity_id, input_data)
+            for workflow_id, entity_id, input_data in triggered
+        ]
         
-        cursor.close()
+        # Queued first, so a failed enqueue leaves no PENDING executions that will never run
+        self.execution_queue.enqueue(executions)
+        now = datetime.utcnow()
+        for e in executions:
+            self.execution_log.record(
+                WorkflowExecution(
+                    execution_id=e.execution_id,
+                    workflow_id=e.workflow_id,
+                    entity_id=e.entity_id,
+                    status=WorkflowStatus.PENDING,
+                    input_data=e.input_data,
+                    started_at=now
+                ),
+                ENQUEUED_SEQ
+            )
+        return [e.execution_id for e in executions]
+    
+    def run_queued_execution(self, execution: QueuedExecution, last_attempt: bool):
+        """Execution queue handler: run one attempt, raising on failure so the queue can retry it"""
+        workflow = self.get_workflow(execution.workflow_id)
         
-        return WorkflowExecution(
-            execution_id=execution_id,
-            workflow_id=workflow_id,
-            entity_id=entity_id,
-            status=status,
-            input_data=input_data,
-            output_data=output_data,
-            error_message=error_message,
-            started_at=now,
-            completed_at=datetime.utcnow()
+        # STARTED_AT was the enqueue time until now
+        record = WorkflowExecution(
+            execution_id=execution.execution_id,
+            workflow_id=execution.workflow_id,
+            entity_id=execution.entity_id,
+            status=WorkflowStatus.IN_PROGRESS,
+            input_data=execution.input_data,
+            started_at=datetime.utcnow()
         )
+        self.execution_log.record(record, event_seq(execution.attempts, finished=False))
+        
+        if workflow:
+            record = self._run_action(workflow, record)
+        else:
+            record = record.model_copy(update={
+                "status": WorkflowStatus.FAILED,
+                "error_message": f"Workflow {execution.workflow_id} not found",
+                "completed_at": datetime.utcnow()
+            })
+        if record.status == WorkflowStatus.FAILED and not last_attempt:
+            # Back to PENDING until the queue retries it
+            record = record.model_copy(update={"status": WorkflowStatus.PENDING, "completed_at": None})
+        self.execution_log.record(record, event_seq(execution.attempts, finished=True))
+        
+        if record.status != WorkflowStatus.COMPLETED:
+            raise RuntimeError(record.error_message)
     
     def _execute_workflow_action(
         self,
@@ -222,6 +433,17 @@ class WorkflowService:
             result = cursor.fetchall()
             return {"result": "SQL executed", "rows_affected": cursor.rowcount}
         
+        elif action_type == "SQL_QUERY":
+            config = SQLQueryConfig.model_validate(workflow.action_config)
+            # %s in the query binds the entity ID
+            params = (entity_id,) if "%s" in config.query else None
+            cursor.execute(config.query, params, timeout=config.timeout_seconds)
+            output = {"result": "SQL executed", "rows_affected": cursor.rowcount}
+            if config.return_results and cursor.description:
+                columns = [column[0] for column in cursor.description]
+                output["rows"] = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return output
+        
         elif action_type == "NOTIFICATION":
             # Log notification (in production, send actual notification)
             message = workflow.action_config.get("message", "")
@@ -239,158 +461,787 @@ class WorkflowService:
                 "input_data": input_data
             }
         
+        elif action_type == "VALIDATE":
+            return self._execute_validate(workflow, entity_id, input_data, cursor)
+        
+        elif action_type == "AGGREGATE":
+            return self._execute_aggregate(workflow, entity_id, input_data, cursor)
+        
+        elif action_type == "ENRICH":
+            return self._execute_enrich(workflow, entity_id, input_data, cursor)
+        
+        elif action_type == "PROPAGATE":
+            return self._execute_propagate(workflow, entity_id, cursor)
+        
+        elif action_type == "COMPOSITE":
+            return self._execute_composite(workflow, entity_id, input_data, cursor)
+        
         else:
             raise ValueError(f"Unknown action type: {action_type}")
     
-    def list_executions(
+    def _validator(self, workflow: WorkflowDefinition) -> CompiledValidator:
+        """Compiled rules of a VALIDATE workflow, rebuilt only when its action_config changes"""
+        cached = self._validators.get(workflow.workflow_id)
+        if cached is not None and cached[0] == workflow.action_config:
+            return cached[1]
+        validator = CompiledValidator(ValidateConfig.model_validate(workflow.action_config).rules)
+        self._validators[workflow.workflow_id] = (workflow.action_config, validator)
+        return validator
+    
+    def _execute_validate(
         self,
-        workflow_id: Optional[str] = None,
-        entity_id: Optional[str] = None,
-        limit: int = 100
-    ) -> List[WorkflowExecution]:
-        """List workflow executions"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT EXECUTION_ID, WORKFLOW_ID, ENTITY_ID, STATUS,
-                   INPUT_DATA, OUTPUT_DATA, ERROR_MESSAGE,
-                   STARTED_AT, COMPLETED_AT
-            FROM WORKFLOW_EXECUTIONS
-            WHERE 1=1
+        workflow: WorkflowDefinition,
+        entity_id: str,
+        input_data: Dict[str, Any],
+        cursor
+    ) -> Dict[str, Any]:
+        """Validate entity_id, every ID in input_data["entity_ids"], or with input_data["scope"] "all" all of ENTITIES.
+        
+        Listed entities are loaded in chunks and checked in one pass. With
+        scope "all" the rules run in the warehouse as a WHERE condition
+        (optionally limited to input_data["entity_type"]). TAG_INVALID tags
+        the failing entities with one UPDATE (per chunk); REJECT and ROLLBACK
+        fail the execution; NOTIFY only reports.
         """
-        params = []
-        
-        if workflow_id:
-            query += " AND WORKFLOW_ID = %s"
-            params.append(workflow_id)
-        
-        if entity_id:
-            query += " AND ENTITY_ID = %s"
-            params.append(entity_id)
-        
-        query += " ORDER BY STARTED_AT DESC LIMIT %s"
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        cursor.close()
-        
-        return [
-            WorkflowExecution(
-                execution_id=row[0],
-                workflow_id=row[1],
-                entity_id=row[2],
-                status=WorkflowStatus(row[3]),
-                input_data=json.loads(row[4]) if row[4] else {},
-                output_data=json.loads(row[5]) if row[5] else None,
-                error_message=row[6],
-                started_at=row[7],
-                completed_at=row[8]
+        config = ValidateConfig.model_validate(workflow.action_config)
+        mode = config.on_failure.upper()
+        if mode not in FAILURE_MODES:
+            raise ValueError(f"on_failure must be one of {', '.join(FAILURE_MODES)}")
+        validator = self._validator(workflow)
+        now = datetime.utcnow()
+        tags = "COALESCE(TAGS::ARRAY, ARRAY_CONSTRUCT())"
+        tag_sql = f"""
+            UPDATE ENTITIES
+            SET TAGS = ARRAY_APPEND({tags}, %s), UPDATED_AT = %s
+            WHERE NOT ARRAY_CONTAINS(%s::VARIANT, {tags})
+        """
+        
+        if input_data.get("scope") == "all":
+            where, params = validator.violation_sql()
+            if input_data.get("entity_type"):
+                where += " AND ENTITY_TYPE = %s"
+                params.append(input_data["entity_type"])
+            
+            if mode == "TAG_INVALID":
+                cursor.execute(f"{tag_sql} AND {where}", [INVALID_TAG, now, INVALID_TAG] + params)
+                self._invalidate_entities([ALL_KEYS])
+                return {"result": "Validation completed", "scope": "all", "tagged": cursor.rowcount}
+            
+            cursor.execute(
+                f"SELECT ENTITY_ID, COUNT(*) OVER () FROM ENTITIES WHERE {where} LIMIT %s",
+                params + [_VALIDATION_SAMPLE_SIZE]
             )
-            for row in rows
-        ]
-    
-    def get_entity_state(self, entity_id: str) -> Optional[EntityState]:
-        """Get the current state of an entity"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT ENTITY_ID, CURRENT_STATE, PREVIOUS_STATE, STATE_DATA, UPDATED_AT
-            FROM ENTITY_STATES
-            WHERE ENTITY_ID = %s
-        """, (entity_id,))
-        
-        row = cursor.fetchone()
-        cursor.close()
-        
-        if not row:
-            return None
-        
-        return EntityState(
-            entity_id=row[0],
-            current_state=row[1],
-            previous_state=row[2],
-            state_data=json.loads(row[3]) if row[3] else {},
-            updated_at=row[4]
-        )
+            rows = cursor.fetchall()
+            invalid_count = rows[0][1] if rows else 0
+            output = {
+                "result": "Validation completed",
+                "scope": "all",
+                "invalid": invalid_count,
+                "sample_entity_ids": [row[0] for row in rows]
+            }
+        else:
+            entity_ids = list(dict.fromkeys(input_data.get("entity_ids") or [entity_id]))
+            properties: Dict[str, Dict[str, Any]] = {}
+            for start in range(0, len(entity_ids), settings.batch_get_chunk_size):
+                chunk = entity_ids[start:start + settings.batch_get_chunk_size]
+                cursor.execute(
+                    f"SELECT ENTITY_ID, PROPERTIES FROM ENTITIES WHERE ENTITY_ID IN ({', '.join(['%s'] * len(chunk))})",
+                    chunk
+                )
+                for row in cursor.fetchall():
+                    properties[row[0]] = json.loads(row[1]) if row[1] else {}
+            
+            invalid = validator.validate(properties.items())
+            invalid_count = len(invalid)
+            output = {
+                "result": "Validation completed",
+                "validated": len(properties),
+                "missing_entity_ids": [missing for missing in entity_ids if missing not in properties],
+                "invalid": invalid_count,
+                "violations": dict(list(invalid.items())[:_VALIDATION_SAMPLE_SIZE])
+            }
+            
+            if mode == "TAG_INVALID" and invalid:
+                invalid_ids = list(invalid)
+                tagged = 0
+                for start in range(0, len(invalid_ids), settings.batch_get_chunk_size):
+                    chunk = invalid_ids[start:start + settings.batch_get_chunk_size]
+                    cursor.execute(
+                        f"{tag_sql} AND ENTITY_ID IN ({', '.join(['%s'] * len(chunk))})",
+                        [INVALID_TAG, now, INVALID_TAG] + chunk
+                    )
+                    tagged += cursor.rowcount
+                output["tagged"] = tagged
+                if len(invalid_ids) > _MAX_BULK_INVALIDATIONS:
+                    self._invalidate_entities([ALL_KEYS])
+                else:
+                    self._invalidate_entities(invalid_ids)
+        
+        if invalid_count and (config.notify_on_failure or mode == "NOTIFY"):
+            output["notification"] = f"{invalid_count} entities failed validation in {workflow.name}"
+        if invalid_count and mode in ("REJECT", "ROLLBACK"):
+            raise ValidationFailed(f"{invalid_count} entities failed validation", output)
+        return output
     
-    def update_entity_state(
+    def _execute_aggregate(
         self,
+        workflow: WorkflowDefinition,
         entity_id: str,
-        new_state: str,
-        state_data: Dict[str, Any]
-    ) -> EntityState:
-        """Update the state of an entity and trigger workflows"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+        input_data: Dict[str, Any],
+        cursor
+    ) -> Dict[str, Any]:
+        """Recompute the calculation rules for entity_id, or for every ID in input_data["entity_ids"].
         
-        # Get current state
-        current_state_obj = self.get_entity_state(entity_id)
-        previous_state = current_state_obj.current_state if current_state_obj else None
+        Each batch of entities is one aggregation query whose columns are
+        evaluated with NumPy; the results are then written with one MERGE
+        into ENTITIES (update_entity) and one INSERT into
+        ENTITY_METRIC_HISTORY (store_history) per batch.
+        """
+        config = AggregateConfig.model_validate(workflow.action_config)
+        aggregation = Aggregation(config.calculations)
+        entity_ids = list(dict.fromkeys(input_data.get("entity_ids") or [entity_id]))
+        
+        metrics: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(entity_ids), _AGGREGATE_BATCH_SIZE):
+            sql, params = aggregation.sql(entity_ids[start:start + _AGGREGATE_BATCH_SIZE])
+            cursor.execute(sql, params)
+            metrics.update(aggregation.evaluate(cursor.fetchall()))
         
         now = datetime.utcnow()
+        rows = [(metric_entity_id, json.dumps(values)) for metric_entity_id, values in metrics.items()]
+        history_errors: Dict[int, str] = {}
         
-        # Update or insert state
-        if current_state_obj:
-            cursor.execute("""
-                UPDATE ENTITY_STATES
-                SET CURRENT_STATE = %s,
-                    PREVIOUS_STATE = %s,
-                    STATE_DATA = PARSE_JSON(%s),
+        if config.update_entity and rows:
+            self._merge_properties(cursor, rows, aggregation.fields, now)
+        
+        if config.store_history and rows:
+            history_errors = insert_values(
+                cursor,
+                "INSERT INTO ENTITY_METRIC_HISTORY (ENTITY_ID, WORKFLOW_ID, METRICS, COMPUTED_AT)",
+                "column1, column2, PARSE_JSON(column3), column4",
+                [(metric_entity_id, workflow.workflow_id, values, now) for metric_entity_id, values in rows],
+                _AGGREGATE_BATCH_SIZE
+            )
+        
+        return {
+            "result": "Aggregates computed",
+            "entities": len(metrics),
+            "missing_entity_ids": [missing for missing in entity_ids if missing not in metrics],
+            "history_errors": len(history_errors),
+            "metrics": metrics.get(entity_id)
+        }
+    
+    def _merge_properties(self, cursor, rows: List[Tuple[str, str]], fields: List[str], updated_at: datetime):
+        """Set fields in the PROPERTIES of many entities from (entity ID, JSON object) rows, one MERGE per batch"""
+        properties = "COALESCE(e.PROPERTIES::OBJECT, OBJECT_CONSTRUCT())"
+        field_params: List[Any] = []
+        for field in fields:
+            properties = f"OBJECT_INSERT({properties}, %s, GET(v.VALS, %s), TRUE)"
+            field_params.extend([field, field])
+        
+        for start in range(0, len(rows), _AGGREGATE_BATCH_SIZE):
+            batch = rows[start:start + _AGGREGATE_BATCH_SIZE]
+            cursor.execute(f"""
+                MERGE INTO ENTITIES e
+                USING (
+                    SELECT column1 AS ENTITY_ID, PARSE_JSON(column2) AS VALS
+                    FROM VALUES {", ".join(["(%s, %s)"] * len(batch))}
+                ) v
+                ON e.ENTITY_ID = v.ENTITY_ID
+                WHEN MATCHED THEN UPDATE SET
+                    PROPERTIES = {properties},
                     UPDATED_AT = %s
-                WHERE ENTITY_ID = %s
-            """, (new_state, previous_state, json.dumps(state_data), now, entity_id))
+            """, [value for row in batch for value in row] + field_params + [updated_at])
+        
+        if len(rows) > _MAX_BULK_INVALIDATIONS:
+            self._invalidate_entities([ALL_KEYS])
         else:
-            cursor.execute("""
-                INSERT INTO ENTITY_STATES (
-                    ENTITY_ID, CURRENT_STATE, PREVIOUS_STATE, STATE_DATA, UPDATED_AT
-                ) VALUES (%s, %s, %s, PARSE_JSON(%s), %s)
-            """, (entity_id, new_state, previous_state, json.dumps(state_data), now))
+            self._invalidate_entities([row[0] for row in rows])
+    
+    def _execute_enrich(
+        self,
+        workflow: WorkflowDefinition,
+        entity_id: str,
+        input_data: Dict[str, Any],
+        cursor
+    ) -> Dict[str, Any]:
+        """Enrich entity_id, or every ID in input_data["entity_ids"], from the configured data source.
         
-        conn.commit()
+        The distinct lookup values go through the enrichment engine in one
+        call; the enriched fields are then written with one MERGE per batch
+        for each combination of fields being set.
+        """
+        config = EnrichConfig.model_validate(workflow.action_config)
+        entity_ids = list(dict.fromkeys(input_data.get("entity_ids") or [entity_id]))
         
-        # Check for workflows that should be triggered
-        self._check_and_trigger_workflows(entity_id, new_state, previous_state, cursor)
+        properties: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(entity_ids), settings.batch_get_chunk_size):
+            chunk = entity_ids[start:start + settings.batch_get_chunk_size]
+            cursor.execute(
+                f"SELECT ENTITY_ID, PROPERTIES FROM ENTITIES WHERE ENTITY_ID IN ({', '.join(['%s'] * len(chunk))})",
+                chunk
+            )
+            for row in cursor.fetchall():
+                properties[row[0]] = json.loads(row[1]) if row[1] else {}
         
-        cursor.close()
+        lookup_values = {
+            enrich_entity_id: str(props[config.lookup_field])
+            for enrich_entity_id, props in properties.items()
+            if props.get(config.lookup_field) not in (None, "")
+        }
+        records = self.enrichment.lookup(
+            config.data_source, list(lookup_values.values()), config.cache_duration_days
+        )
         
-        return EntityState(
-            entity_id=entity_id,
-            current_state=new_state,
-            previous_state=previous_state,
-            state_data=state_data,
-            updated_at=now
+        # Entities setting the same fields share a MERGE; without update_existing only absent fields are set
+        groups: Dict[Tuple[str, ...], List[Tuple[str, str]]] = {}
+        for enrich_entity_id, value in lookup_values.items():
+            record = records.get(value) or {}
+            props = properties[enrich_entity_id]
+            patch = {
+                field: record[field] for field in config.enrich_fields
+                if field in record and (config.update_existing or props.get(field) is None)
+            }
+            if patch:
+                groups.setdefault(tuple(patch), []).append((enrich_entity_id, json.dumps(patch)))
+        
+        now = datetime.utcnow()
+        for fields, rows in groups.items():
+            self._merge_properties(cursor, rows, list(fields), now)
+        
+        enriched = {row[0] for rows in groups.values() for row in rows}
+        return {
+            "result": "Entities enriched",
+            "data_source": config.data_source,
+            "enriched": len(enriched),
+            "no_data": sorted(
+                enrich_entity_id for enrich_entity_id, value in lookup_values.items() if not records.get(value)
+            ),
+            "no_lookup_value": sorted(set(properties) - set(lookup_values)),
+            "missing_entity_ids": [missing for missing in entity_ids if missing not in properties]
+        }
+    
+    def _execute_propagate(self, workflow: WorkflowDefinition, entity_id: str, cursor) -> Dict[str, Any]:
+        """Update every entity along the relationship path from entity_id with one MERGE.
+        
+        With async_execution the statement is submitted and its query ID
+        returned without waiting; get_propagation_status follows it, and
+        clears the entity caches again when it first sees it succeed.
+        """
+        config = PropagateConfig.model_validate(workflow.action_config)
+        sql, params = compile_propagation(
+            config.relationship_path, config.update_fields, config.max_depth, entity_id, datetime.utcnow()
         )
+        
+        if config.async_execution:
+            cursor.execute_async(sql, params)
+            output = {"result": "Propagation submitted", "query_id": cursor.sfqid}
+        else:
+            cursor.execute(sql, params)
+            output = {"result": "Propagation executed", "query_id": cursor.sfqid, "rows_updated": cursor.rowcount}
+        
+        # The reached entities aren't known here, so drop all cached entities (an async MERGE may still be
+        # running, and entities read meanwhile are dropped again once it finishes)
+        self._invalidate_entities([ALL_KEYS])
+        return output
+    
+    def get_propagation_status(self, query_id: str) -> Dict[str, Any]:
+        """Status of a submitted PROPAGATE query, with the rows updated once it has succeeded"""
+        with self.db.connection() as conn:
+            status = conn.get_query_status(query_id)
+            result = {
+                "query_id": query_id,
+                "status": status.name,
+                "running": conn.is_still_running(status)
+            }
+            
+            if conn.is_an_error(status):
+                try:
+                    conn.get_query_status_throw_if_error(query_id)
+                except Exception as e:
+                    result["error"] = str(e)
+            elif status.name == "SUCCESS":
+                cursor = conn.cursor()
+                cursor.get_results_from_sfqid(query_id)
+                row = cursor.fetchone()
+                result["rows_updated"] = row[0] if row else 0
+                cursor.close()
+                
+                if self.invalidate_entity is not None and self._first_finished(query_id):
+                    self.invalidate_entity(ALL_KEYS)
+            
+            return result
+    
+    def _first_finished(self, query_id: str) -> bool:
+        """Record an async PROPAGATE query as finished; True only the first time"""
+        with self._finished_propagations_lock:
+            if query_id in self._finished_propagations:
+                return False
+            self._finished_propagations[query_id] = None
+            if len(self._finished_propagations) > _MAX_FINISHED_PROPAGATIONS:
+                self._finished_propagations.popitem(last=False)
+            return True
+    
+    def _execute_composite(
+        self,
+        workflow: WorkflowDefinition,
+        entity_id: str,
+        input_data: Dict[str, Any],
+        cursor
+    ) -> Dict[str, Any]:
+        """Run the steps of a COMPOSITE workflow as a dependency graph.
+        
+        With ROLLBACK (the default) the steps run in dependency order in one
+        transaction on this connection, which is rolled back if a step fails;
+        a Snowflake transaction belongs to a single session, so these steps
+        cannot run concurrently. PROPAGATE steps then run synchronously, and
+        cached entities are only dropped once the transaction commits. With STOP or CONTINUE and parallel_execution,
+        independent steps run concurrently on the step executor, each on its
+        own connection, when the pool has connections to spare for them.
+        STOP starts no new steps after a failure; CONTINUE skips only the
+        failed step's dependents and completes the workflow. Each step
+        receives the outputs of its dependencies under "steps".
+        """
+        config = CompositeConfig.model_validate(workflow.action_config)
+        order = composite.plan(config)
+        mode = config.on_failure.upper()
+        parallel = config.parallel_execution and mode != "ROLLBACK" and self._step_executor is not None
+        
+        def step_workflow(step: CompositeStep) -> WorkflowDefinition:
+            action_config = step.config
+            if mode == "ROLLBACK" and step.action == ActionType.PROPAGATE:
+                # An async MERGE would still be running when the transaction commits
+                action_config = {**action_config, "async_execution": False}
+            return WorkflowDefinition(
+                workflow_id=workflow.workflow_id,
+                name=f"{workflow.name} step {step.step}",
+                trigger_condition=workflow.trigger_condition,
+                action_type=step.action.value,
+                action_config=action_config
+            )
+        
+        def step_input(step: CompositeStep, results: Dict[int, composite.StepResult]) -> Dict[str, Any]:
+            return {**input_data, "steps": {dep: results[dep].output for dep in step.depends_on or []}}
+        
+        def run_here(step: CompositeStep, results: Dict[int, composite.StepResult]) -> composite.StepResult:
+            return composite.timed(step, lambda: self._execute_workflow_action(
+                step_workflow(step), entity_id, step_input(step, results), cursor
+            ))
+        
+        def run_on_own_connection(step: CompositeStep, results: Dict[int, composite.StepResult]) -> composite.StepResult:
+            def run() -> Dict[str, Any]:
+                with self.db.connection() as conn:
+                    step_cursor = conn.cursor()
+                    try:
+                        output = self._execute_workflow_action(
+                            step_workflow(step), entity_id, step_input(step, results), step_cursor
+                        )
+                        conn.commit()
+                        return output
+                    finally:
+                        step_cursor.close()
+            return composite.timed(step, run)
+        
+        start = time.monotonic()
+        if mode == "ROLLBACK":
+            cursor.execute("BEGIN")
+            # ROLLBACK steps run on this thread; their cache invalidations wait for the COMMIT
+            self._deferred.entity_ids = []
+        try:
+            try:
+                results = composite.run_dag(
+                    order,
+                    run_on_own_connection if parallel else run_here,
+                    stop_on_failure=mode != "CONTINUE",
+                    executor=self._step_executor if parallel else None
+                )
+            except Exception:
+                if mode == "ROLLBACK":
+                    cursor.execute("ROLLBACK")
+                raise
+            
+            failed = [number for number, result in results.items() if result.status == "FAILED"]
+            if mode == "ROLLBACK":
+                if failed:
+                    cursor.execute("ROLLBACK")
+                    for result in results.values():
+                        if result.status == "COMPLETED":
+                            result.status = "ROLLED_BACK"
+                else:
+                    cursor.execute("COMMIT")
+                    invalidated = self._deferred.entity_ids
+                    self._deferred.entity_ids = None
+                    self._invalidate_entities([ALL_KEYS] if ALL_KEYS in invalidated else list(dict.fromkeys(invalidated)))
+        finally:
+            # Nothing to drop after a rollback
+            self._deferred.entity_ids = None
+        
+        output = {
+            "result": "Composite executed",
+            "on_failure": mode,
+            "parallel": parallel,
+            "steps": [results[step.step].to_dict() for step in order],
+            "failed_steps": sorted(failed),
+            "elapsed_ms": round((time.monotonic() - start) * 1000, 1),
+            "critical_path_ms": composite.critical_path_ms(order, results)
+        }
+        if failed and mode != "CONTINUE":
+            raise composite.CompositeFailure(f"Composite steps {sorted(failed)} failed ({mode})", output)
+        return output
+    
+    def list_executions(
+        self,
+        workflow_id: Optional[str] = None,
+        entity_id: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[Cursor] = None
+    ) -> List[WorkflowExecution]:
+        """List workflow executions, newest queued first; after is a (CREATED_AT, EXECUTION_ID) position"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            query = """
+                SELECT EXECUTION_ID, WORKFLOW_ID, ENTITY_ID, STATUS,
+                       INPUT_DATA, OUTPUT_DATA, ERROR_MESSAGE,
+                       STARTED_AT, COMPLETED_AT, CREATED_AT
+                FROM WORKFLOW_EXECUTION_LOG
+                WHERE 1=1
+            """
+            params = []
+            
+            if workflow_id:
+                query += " AND WORKFLOW_ID = %s"
+                params.append(workflow_id)
+            
+            if entity_id:
+                query += " AND ENTITY_ID = %s"
+                params.append(entity_id)
+            
+            if after:
+                query += " AND " + keyset_predicate("CREATED_AT", "EXECUTION_ID")
+                params.extend([after[0], after[0], after[1]])
+            
+            query += " ORDER BY CREATED_AT DESC, EXECUTION_ID DESC LIMIT %s"
+            params.append(limit)
+            
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            cursor.close()
+            
+            return [
+                WorkflowExecution(
+                    execution_id=row[0],
+                    workflow_id=row[1],
+                    entity_id=row[2],
+                    status=WorkflowStatus(row[3]),
+                    input_data=json.loads(row[4]) if row[4] else {},
+                    output_data=json.loads(row[5]) if row[5] else None,
+                    error_message=row[6],
+                    started_at=row[7],
+                    completed_at=row[8],
+                    created_at=row[9]
+                )
+                for row in rows
+            ]
+    
+    def _estimate_execution_count(self, workflow_id: Optional[str] = None) -> int:
+        """Execution count from WORKFLOW_EXECUTION_SUMMARY, cached for PAGINATION_COUNT_TTL_SECONDS"""
+        key = workflow_id or "*"
+        cached = self._count_cache.get(key)
+        if cached is not None and time.monotonic() - cached[1] < settings.pagination_count_ttl_seconds:
+            return cached[0]
+        
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            query = """
+                SELECT COALESCE(SUM(COMPLETED_COUNT + FAILED_COUNT + IN_PROGRESS_COUNT + PENDING_COUNT), 0)
+                FROM WORKFLOW_EXECUTION_SUMMARY
+            """
+            params = []
+            if workflow_id:
+                query += " WHERE WORKFLOW_ID = %s"
+                params.append(workflow_id)
+            cursor.execute(query, params)
+            count = int(cursor.fetchone()[0])
+            cursor.close()
+        
+        self._count_cache[key] = (count, time.monotonic())
+        return count
+    
+    def list_executions_page(
+        self,
+        workflow_id: Optional[str] = None,
+        entity_id: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> PaginatedResponse:
+        """Keyset-paginated executions; the estimated total is not available when filtering by entity_id"""
+        after = decode_cursor(cursor) if cursor else None
+        items = self.list_executions(workflow_id=workflow_id, entity_id=entity_id, limit=limit + 1, after=after)
+        total = self._estimate_execution_count(workflow_id) if include_total and not entity_id else None
+        return build_page(items, limit, lambda e: (e.created_at, e.execution_id), total)
+        
+    def get_entity_state(self, entity_id: str) -> Optional[EntityState]:
+        """Get the current state of an entity (cached)"""
+        cache = self._caches["state"]
+        state = cache.get(entity_id)
+        if state is None:
+            generation = cache.generation()
+            state = self._fetch_entity_state(entity_id)
+            if state is not None:
+                cache.put(entity_id, state, generation)
+        return state
     
+    def _fetch_entity_state(self, entity_id: str) -> Optional[EntityState]:
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT ENTITY_ID, CURRENT_STATE, PREVIOUS_STATE, STATE_DATA, UPDATED_AT
+                FROM ENTITY_STATES
+                WHERE ENTITY_ID = %s
+            """, (entity_id,))
+            
+            row = cursor.fetchone()
+            cursor.close()
+            
+            if not row:
+                return None
+            
+            return EntityState(
+                entity_id=row[0],
+                current_state=row[1],
+                previous_state=row[2],
+                state_data=json.loads(row[3]) if row[3] else {},
+                updated_at=row[4]
+            )
+        
+    def update_entity_state(
+        self,
+        entity_id: str,
+        new_state: str,
+        state_data: Dict[str, Any]
+    ) -> StateUpdateResult:
+        """Update the state of an entity and queue the workflows it triggers"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Get current state; read from the table, as a cached copy may predate another worker's write
+            current_state_obj = self._fetch_entity_state(entity_id)
+            previous_state = current_state_obj.current_state if current_state_obj else None
+            
+            now = datetime.utcnow()
+            
+            # Update or insert state
+            if current_state_obj:
+                cursor.execute("""
+                    UPDATE ENTITY_STATES
+                    SET CURRENT_STATE = %s,
+                        PREVIOUS_STATE = %s,
+                        STATE_DATA = PARSE_JSON(%s),
+                        UPDATED_AT = %s
+                    WHERE ENTITY_ID = %s
+                """, (new_state, previous_state, json.dumps(state_data), now, entity_id))
+            else:
+                cursor.execute("""
+                    INSERT INTO ENTITY_STATES (
+                        ENTITY_ID, CURRENT_STATE, PREVIOUS_STATE, STATE_DATA, UPDATED_AT
+                    ) VALUES (%s, %s, %s, PARSE_JSON(%s), %s)
+                """, (entity_id, new_state, previous_state, json.dumps(state_data), now))
+            
+            conn.commit()
+            
+            state = EntityState(
+                entity_id=entity_id,
+                current_state=new_state,
+                previous_state=previous_state,
+                state_data=state_data,
+                updated_at=now
+            )
+            self._invalidate("state", entity_id)
+            self._caches["state"].put(entity_id, state)
+            
+            # Check for workflows that should be triggered
+            execution_ids = self._check_and_trigger_workflows(entity_id, new_state, previous_state, cursor)
+            
+            cursor.close()
+            
+            return StateUpdateResult(**state.model_dump(), execution_ids=execution_ids)
+        
     def _check_and_trigger_workflows(
         self,
         entity_id: str,
         new_state: str,
         previous_state: Optional[str],
         cursor
-    ):
-        """Check if any workflows should be triggered by this state change"""
-        # Get enabled workflows
-        cursor.execute("""
-            SELECT WORKFLOW_ID, TRIGGER_CONDITION
-            FROM WORKFLOW_DEFINITIONS
-            WHERE ENABLED = TRUE
-        """)
-        
-        workflows = cursor.fetchall()
-        
-        for workflow_id, trigger_condition in workflows:
-            # Simple trigger matching (in production, use more sophisticated logic)
-            if new_state in trigger_condition or trigger_condition == "*":
-                # Trigger workflow asynchronously (in production, use Snowflake Tasks)
-                try:
-                    self.execute_workflow(
-                        workflow_id,
-                        entity_id,
-                        {"new_state": new_state, "previous_state": previous_state}
+    ) -> List[str]:
+        """Trigger the workflows whose condition matches this state change (a registry lookup); returns execution IDs"""
+        def load_entity() -> Optional[Dict[str, Any]]:
+            cursor.execute("""
+                SELECT ENTITY_TYPE, TAGS, PROPERTIES
+                FROM ENTITIES
+                WHERE ENTITY_ID = %s
+            """, (entity_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return {
+                "entity_type": row[0],
+                "tags": json.loads(row[1]) if row[1] else [],
+                "properties": json.loads(row[2]) if row[2] else {}
+            }
+        
+        workflow_ids = self.trigger_registry.match(new_state, previous_state, load_entity)
+        input_data = {"new_state": new_state, "previous_state": previous_state}
+        return self._start_executions([(workflow_id, entity_id, input_data) for workflow_id in workflow_ids])
+    
+    def _start_executions(self, triggered: List[Tuple[str, str, Dict[str, Any]]]) -> List[str]:
+        """Queue (workflow_id, entity_id, input_data) executions, or run them inline without a queue"""
+        if self.execution_queue is not None:
+            try:
+                return self.enqueue_executions(triggered)
+            except Exception as e:
+                # The state change is already committed; don't fail it
+                logger.error(f"Error queueing {len(triggered)} triggered executions: {e}", exc_info=True)
+                return []
+        
+        execution_ids = []
+        for workflow_id, entity_id, input_data in triggered:
+            try:
+                execution_ids.append(self.execute_workflow(workflow_id, entity_id, input_data).execution_id)
+            except Exception as e:
+                # Log error but don't fail state update
+                logger.error(f"Error triggering workflow {workflow_id}: {e}", exc_info=True)
+        return execution_ids
+    
+    def _load_trigger_entities(self, entity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Entity fields referenced by trigger conditions, for a batch of entities"""
+        entities = {}
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(entity_ids), settings.batch_get_chunk_size):
+                chunk = entity_ids[start:start + settings.batch_get_chunk_size]
+                cursor.execute(f"""
+                    SELECT ENTITY_ID, ENTITY_TYPE, TAGS, PROPERTIES
+                    FROM ENTITIES
+                    WHERE ENTITY_ID IN ({', '.join(['%s'] * len(chunk))})
+                """, chunk)
+                for row in cursor.fetchall():
+                    entities[row[0]] = {
+                        "entity_type": row[1],
+                        "tags": json.loads(row[2]) if row[2] else [],
+                        "properties": json.loads(row[3]) if row[3] else {}
+                    }
+            cursor.close()
+        return entities
+    
+    def bulk_update_states(self, transitions: List[Tuple[int, StateTransitionRequest]]) -> Dict[str, Any]:
+        """Apply a batch of (input index, transition) pairs with one MERGE.
+        
+        The batch is staged in a temporary table (multi-row INSERTs, or COPY
+        INTO from BULK_COPY_THRESHOLD rows) and merged into ENTITY_STATES,
+        which moves CURRENT_STATE to PREVIOUS_STATE in the same statement.
+        Triggers are then matched for all transitions with trigger_workflows
+        at once. An entity may appear only once per batch; later duplicates
+        are reported as errors. Returns entity IDs by input index, per-row
+        errors and the triggered execution IDs.
+        """
+        now = datetime.utcnow()
+        first_index: Dict[str, int] = {}
+        rows = []
+        errors = []
+        for index, transition in transitions:
+            if transition.entity_id in first_index:
+                errors.append({
+                    "index": index,
+                    "error": f"Duplicate entity_id {transition.entity_id} (first at index {first_index[transition.entity_id]})"
+                })
+                continue
+            first_index[transition.entity_id] = index
+            rows.append((index, (transition.entity_id, transition.new_state, json.dumps(transition.state_data), now)))
+        values = [row for _, row in rows]
+        if not rows:
+            return {"method": None, "entity_ids": {}, "errors": errors, "execution_ids": []}
+        
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            table = create_temp_table(
+                cursor, "STATES_BULK",
+                "ENTITY_ID VARCHAR, NEW_STATE VARCHAR, STATE_DATA VARCHAR, UPDATED_AT TIMESTAMP_NTZ"
+            )
+            try:
+                if len(rows) >= settings.bulk_copy_threshold:
+                    method = "copy"
+                    staging_errors = copy_into_temp_table(cursor, table, values)
+                else:
+                    method = "insert"
+                    staging_errors = insert_values(
+                        cursor,
+                        f"INSERT INTO {table} (ENTITY_ID, NEW_STATE, STATE_DATA, UPDATED_AT)",
+                        "column1, column2, column3, column4",
+                        values,
+                        settings.bulk_insert_batch_size
                     )
-                except Exception as e:
-                    # Log error but don't fail state update
-                    print(f"Error triggering workflow {workflow_id}: {e}")
+                
+                # One transaction, so the PREVIOUS_STATE read back is the one this MERGE wrote
+                cursor.execute("BEGIN")
+                try:
+                    cursor.execute(f"""
+                        MERGE INTO ENTITY_STATES t
+                        USING {table} s
+                        ON t.ENTITY_ID = s.ENTITY_ID
+                        WHEN MATCHED THEN UPDATE SET
+                            PREVIOUS_STATE = t.CURRENT_STATE,
+                            CURRENT_STATE = s.NEW_STATE,
+                            STATE_DATA = PARSE_JSON(s.STATE_DATA),
+                            UPDATED_AT = s.UPDATED_AT
+                        WHEN NOT MATCHED THEN INSERT (
+                            ENTITY_ID, CURRENT_STATE, PREVIOUS_STATE, STATE_DATA, UPDATED_AT
+                        ) VALUES (
+                            s.ENTITY_ID, s.NEW_STATE, NULL, PARSE_JSON(s.STATE_DATA), s.UPDATED_AT
+                        )
+                    """)
+                    cursor.execute(f"""
+                        SELECT s.ENTITY_ID, t.PREVIOUS_STATE
+                        FROM {table} s
+                        JOIN ENTITY_STATES t ON t.ENTITY_ID = s.ENTITY_ID
+                    """)
+                    previous_states = dict(cursor.fetchall())
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            finally:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+                cursor.close()
+        
+        loaded, failed = split_rows(rows, staging_errors)
+        errors.extend(failed)
+        
+        if len(loaded) > _MAX_BULK_INVALIDATIONS:
+            self._invalidate("state", ALL_KEYS)
+        else:
+            for _, row in loaded:
+                self._invalidate("state", row[0])
+        
+        transitions_by_index = dict(transitions)
+        changes = [
+            (row[0], row[1], previous_states.get(row[0]))
+            for index, row in loaded
+            if transitions_by_index[index].trigger_workflows
+        ]
+        triggered = []
+        if changes:
+            previous_by_entity = {entity_id: previous for entity_id, _, previous in changes}
+            new_by_entity = {entity_id: new_state for entity_id, new_state, _ in changes}
+            for entity_id, workflow_id in self.trigger_registry.match_many(changes, self._load_trigger_entities):
+                input_data = {"new_state": new_by_entity[entity_id], "previous_state": previous_by_entity[entity_id]}
+                triggered.append((workflow_id, entity_id, input_data))
+        
+        return {
+            "method": method,
+            "entity_ids": {index: row[0] for index, row in loaded},
+            "errors": errors,
+            "execution_ids": self._start_executions(triggered)
+        }
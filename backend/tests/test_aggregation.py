@@ -0,0 +1,124 @@
+"""Tests for AGGREGATE formula parsing and vectorized evaluation.
+
+Run from the repository root with python -m pytest backend/tests
+(or python -m unittest discover backend/tests).
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from models import CalculationRule  # noqa: E402
+from services.aggregation import Aggregation, Term, _Parser  # noqa: E402
+
+
+def parse(formula, fields=()):
+    terms = []
+    return _Parser(formula, {}, terms, list(fields)).parse(), terms
+
+
+def aggregation(**formulas):
+    return Aggregation([CalculationRule(field=field, formula=formula) for field, formula in formulas.items()])
+
+
+class ParserTest(unittest.TestCase):
+    def test_precedence(self):
+        node, terms = parse("1 + 2 * SUM(ORDER.amount)")
+        self.assertEqual(node, ("bin", "+", ("num", 1.0), ("bin", "*", ("num", 2.0), ("term", 0))))
+        self.assertEqual(terms[0].key, ("SUM", "amount", "ORDER", None))
+
+    def test_parentheses_and_negation(self):
+        node, _ = parse("-(1 - 2) / 4")
+        self.assertEqual(node, ("bin", "/", ("neg", ("bin", "-", ("num", 1.0), ("num", 2.0))), ("num", 4.0)))
+
+    def test_related_entity_forms(self):
+        _, terms = parse("COUNT(ORDER) + AVG(ORDER[PLACED].amount) + MAX(*.score) + COUNT(*[OWNS])")
+        self.assertEqual(
+            [term.key for term in terms],
+            [
+                ("COUNT", None, "ORDER", None),
+                ("AVG", "amount", "ORDER", "PLACED"),
+                ("MAX", "score", "*", None),
+                ("COUNT", None, "*", "OWNS")
+            ]
+        )
+
+    def test_repeated_terms_are_shared(self):
+        node, terms = parse("SUM(ORDER.amount) / SUM(ORDER.amount)")
+        self.assertEqual(len(terms), 1)
+        self.assertEqual(node, ("bin", "/", ("term", 0), ("term", 0)))
+
+    def test_own_properties_and_earlier_fields(self):
+        node, terms = parse("properties.budget - total", fields=["total"])
+        self.assertEqual(node, ("bin", "-", ("term", 0), ("field", "total")))
+        self.assertEqual(terms[0].key, (None, "budget", None, None))
+
+    def test_invalid_formulas(self):
+        for formula in (
+            "SUM(ORDER)",
+            "MEDIAN(ORDER.amount)",
+            "total",
+            "1 +",
+            "(1 + 2",
+            "1 2",
+            "SUM(1)"
+        ):
+            with self.assertRaises(ValueError, msg=formula):
+                parse(formula)
+
+    def test_term_sql(self):
+        sql, params = Term("SUM", "amount", "ORDER", "PLACED").sql()
+        self.assertTrue(sql.startswith("COALESCE(SUM(CASE WHEN"))
+        self.assertEqual(params, ["ORDER", "PLACED", "amount"])
+        sql, params = Term("COUNT", None, "*", None).sql()
+        self.assertEqual((sql, params), ("COUNT_IF(rel.ENTITY_TYPE IS NOT NULL)", []))
+
+
+class AggregationTest(unittest.TestCase):
+    def test_evaluate(self):
+        agg = aggregation(
+            total="SUM(ORDER.amount)",
+            orders="COUNT(ORDER)",
+            average="ROUND(total / orders, 2)",
+            headroom="ABS(properties.budget - total)"
+        )
+        self.assertEqual(agg.fields, ["total", "orders", "average", "headroom"])
+        # Columns follow the order terms were first used: SUM, COUNT, properties.budget
+        metrics = agg.evaluate([("e1", 100.0, 3, 40.0), ("e2", 0.0, 0, 10.0)])
+        self.assertEqual(metrics["e1"], {"total": 100, "orders": 3, "average": 33.33, "headroom": 60})
+        self.assertEqual(metrics["e2"], {"total": 0, "orders": 0, "average": None, "headroom": 10})
+
+    def test_null_terms_give_null(self):
+        agg = aggregation(score="AVG(ORDER.amount) * 2")
+        self.assertEqual(agg.evaluate([("e1", None), ("e2", 1.5)]), {"e1": {"score": None}, "e2": {"score": 3}})
+
+    def test_evaluate_no_rows(self):
+        self.assertEqual(aggregation(total="SUM(ORDER.amount)").evaluate([]), {})
+
+    def test_sql_params_line_up(self):
+        agg = aggregation(total="SUM(ORDER.amount)", owned="COUNT(*[OWNS])")
+        sql, params = agg.sql(["e1", "e2"])
+        self.assertEqual(sql.count("%s"), len(params))
+        self.assertEqual(params[:2], ["e1", "e2"])
+        # A wildcard related type drops the ENTITY_TYPE filter on the related entities
+        self.assertNotIn("ENTITY_TYPE IN", sql)
+
+    def test_invalid_configs(self):
+        with self.assertRaises(ValueError):
+            Aggregation([])
+        with self.assertRaises(ValueError):
+            aggregation(total="1 + 2")
+        with self.assertRaises(ValueError):
+            Aggregation([
+                CalculationRule(field="total", formula="SUM(ORDER.amount)"),
+                CalculationRule(field="total", formula="COUNT(ORDER)")
+            ])
+        # A formula can't refer to a field defined after it
+        with self.assertRaises(ValueError):
+            aggregation(average="total / 2", total="SUM(ORDER.amount)")
+
+
+if __name__ == "__main__":
+    unittest.main()
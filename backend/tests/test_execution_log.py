@@ -0,0 +1,164 @@
+"""Tests for ExecutionLogWriter against a fake warehouse connection.
+
+Run from the repository root with python -m pytest backend/tests
+(or python -m unittest discover backend/tests).
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from contextlib import contextmanager
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from models import WorkflowExecution, WorkflowStatus  # noqa: E402
+from services.execution_log import ExecutionLogWriter  # noqa: E402
+
+_COLUMNS = 11
+
+
+class FakeCursor:
+    def __init__(self, db: "FakeDatabase"):
+        self.db = db
+
+    def execute(self, sql, params=None):
+        if self.db.failing:
+            raise RuntimeError("warehouse unavailable")
+        rows = [tuple(params[i:i + _COLUMNS]) for i in range(0, len(params), _COLUMNS)]
+        with self.db.lock:
+            self.db.inserts.append(rows)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db: "FakeDatabase"):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        pass
+
+
+class FakeDatabase:
+    """Stands in for SnowflakeConnection; records the rows of every INSERT"""
+
+    def __init__(self):
+        self.failing = False
+        self.inserts = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        yield FakeConnection(self)
+
+    @property
+    def execution_ids(self):
+        with self.lock:
+            return [row[0] for rows in self.inserts for row in rows]
+
+
+def execution(number: int) -> WorkflowExecution:
+    return WorkflowExecution(
+        execution_id=f"exec-{number}",
+        workflow_id="wf-1",
+        entity_id="cust-001",
+        status=WorkflowStatus.PENDING,
+        input_data={"number": number},
+        started_at=datetime.utcnow()
+    )
+
+
+def wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class ExecutionLogWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeDatabase()
+
+    def test_unstarted_writer_writes_each_event(self):
+        writer = ExecutionLogWriter(self.db)
+        writer.record(execution(1), 0)
+        writer.record(execution(2), 0)
+        self.assertEqual(self.db.execution_ids, ["exec-1", "exec-2"])
+        self.assertEqual(len(self.db.inserts), 2)
+
+    def test_flushes_when_batch_size_reached(self):
+        writer = ExecutionLogWriter(self.db, batch_size=3, flush_interval=60)
+        writer.start()
+        try:
+            for number in range(3):
+                writer.record(execution(number), 0)
+            self.assertTrue(wait_for(lambda: writer.written == 3))
+            # One multi-row INSERT, long before the interval
+            self.assertEqual(len(self.db.inserts), 1)
+            self.assertEqual(len(self.db.inserts[0]), 3)
+        finally:
+            writer.stop()
+
+    def test_flushes_on_interval(self):
+        writer = ExecutionLogWriter(self.db, batch_size=100, flush_interval=0.05)
+        writer.start()
+        try:
+            writer.record(execution(1), 0)
+            self.assertTrue(wait_for(lambda: writer.written == 1))
+            self.assertEqual(self.db.execution_ids, ["exec-1"])
+        finally:
+            writer.stop()
+
+    def test_keeps_events_while_flushes_fail(self):
+        writer = ExecutionLogWriter(self.db)
+        self.db.failing = True
+        # A failed write is logged, not raised into the workflow execution
+        writer.record(execution(1), 0)
+        writer.record(execution(2), 0)
+        self.assertEqual(writer.stats()["buffered"], 2)
+        self.assertEqual(writer.errors, 2)
+        self.assertEqual(self.db.inserts, [])
+
+        self.db.failing = False
+        self.assertEqual(writer.flush(), 2)
+        self.assertEqual(self.db.execution_ids, ["exec-1", "exec-2"])
+        self.assertEqual(writer.stats()["buffered"], 0)
+
+    def test_flush_raises_and_keeps_events(self):
+        writer = ExecutionLogWriter(self.db, batch_size=100, flush_interval=60)
+        writer.start()
+        try:
+            self.db.failing = True
+            writer.record(execution(1), 0)
+            with self.assertRaises(RuntimeError):
+                writer.flush()
+            self.assertEqual(writer.stats()["buffered"], 1)
+        finally:
+            self.db.failing = False
+            writer.stop()
+        self.assertEqual(self.db.execution_ids, ["exec-1"])
+
+    def test_drops_oldest_beyond_max_buffered(self):
+        writer = ExecutionLogWriter(self.db, max_buffered=3)
+        self.db.failing = True
+        for number in range(5):
+            writer.record(execution(number), 0)
+        self.assertEqual(writer.stats()["buffered"], 3)
+        self.assertEqual(writer.dropped, 2)
+
+        self.db.failing = False
+        writer.flush()
+        self.assertEqual(self.db.execution_ids, ["exec-2", "exec-3", "exec-4"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,203 @@
+"""Tests for the path searches in graph_paths against an in-memory graph.
+
+Run from the repository root with python -m pytest backend/tests
+(or python -m unittest discover backend/tests).
+"""
+
+import itertools
+import os
+import random
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.graph_paths import bidirectional_bfs, dijkstra, reachable_within  # noqa: E402
+
+
+class Graph:
+    """Directed weighted edges (relationship_id, source, target, weight) with an expand() for the searches"""
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.calls = []
+
+    def expand(self, frontier, direction):
+        self.calls.append(sorted(frontier))
+        frontier = set(frontier)
+        result = []
+        for rel, source, target, weight in self.edges:
+            if direction in ("outgoing", "both") and source in frontier:
+                result.append((source, rel, target, weight))
+            if direction in ("incoming", "both") and target in frontier:
+                result.append((target, rel, source, weight))
+        return result
+
+    def check_path(self, test, result, source, target, direction):
+        """The result's relationships connect its nodes from source to target in direction"""
+        by_id = {edge[0]: edge for edge in self.edges}
+        test.assertEqual(result.node_ids[0], source)
+        test.assertEqual(result.node_ids[-1], target)
+        test.assertEqual(len(result.relationship_ids), len(result.node_ids) - 1)
+        cost = 0.0
+        for (a, b), rel in zip(zip(result.node_ids, result.node_ids[1:]), result.relationship_ids):
+            _, edge_source, edge_target, weight = by_id[rel]
+            allowed = {"outgoing": [(edge_source, edge_target)], "incoming": [(edge_target, edge_source)]}.get(
+                direction, [(edge_source, edge_target), (edge_target, edge_source)]
+            )
+            test.assertIn((a, b), allowed)
+            cost += weight
+        return cost
+
+
+def brute_force(graph, source, target, direction, max_depth, weighted):
+    """Cheapest cost (or fewest hops) over all walks of at most max_depth hops, None if none"""
+    best = None
+    costs = {source: 0.0}
+    for _ in range(max_depth):
+        next_costs = {}
+        for src, _, neighbor, weight in graph.expand(list(costs), direction):
+            cost = costs[src] + (weight if weighted else 1)
+            if cost < next_costs.get(neighbor, float("inf")):
+                next_costs[neighbor] = cost
+        if target in next_costs and (best is None or next_costs[target] < best):
+            best = next_costs[target]
+        costs = next_costs
+    return best
+
+
+def random_graph(seed, nodes=12, edges=24):
+    rng = random.Random(seed)
+    names = [f"n{i}" for i in range(nodes)]
+    return names, Graph([
+        (f"r{i}", rng.choice(names), rng.choice(names), float(rng.randint(1, 9))) for i in range(edges)
+    ])
+
+
+class BidirectionalBfsTest(unittest.TestCase):
+    def test_chain(self):
+        graph = Graph([("r1", "a", "b", 1), ("r2", "b", "c", 1), ("r3", "c", "d", 1)])
+        result = bidirectional_bfs(graph.expand, "a", "d", "outgoing", 5, 1000)
+        self.assertEqual(result.node_ids, ["a", "b", "c", "d"])
+        self.assertEqual(result.relationship_ids, ["r1", "r2", "r3"])
+        self.assertEqual(result.cost, 3.0)
+
+    def test_direction(self):
+        graph = Graph([("r1", "a", "b", 1), ("r2", "c", "b", 1)])
+        self.assertFalse(bidirectional_bfs(graph.expand, "a", "c", "outgoing", 5, 1000).found)
+        result = bidirectional_bfs(graph.expand, "a", "c", "both", 5, 1000)
+        self.assertEqual(result.node_ids, ["a", "b", "c"])
+        result = bidirectional_bfs(graph.expand, "b", "a", "incoming", 5, 1000)
+        self.assertEqual(result.node_ids, ["b", "a"])
+
+    def test_source_is_target(self):
+        result = bidirectional_bfs(Graph([]).expand, "a", "a", "both", 3, 10)
+        self.assertEqual((result.node_ids, result.relationship_ids, result.cost), (["a"], [], 0.0))
+
+    def test_max_depth(self):
+        graph = Graph([("r1", "a", "b", 1), ("r2", "b", "c", 1), ("r3", "c", "d", 1)])
+        result = bidirectional_bfs(graph.expand, "a", "d", "outgoing", 2, 1000)
+        self.assertFalse(result.found)
+        self.assertFalse(result.exhausted)
+
+    def test_visit_budget(self):
+        # a fans out to 50 nodes before reaching z
+        edges = [(f"r{i}", "a", f"m{i}", 1) for i in range(50)] + [("rz", "m49", "z", 1), ("ry", "z", "y", 1)]
+        result = bidirectional_bfs(Graph(edges).expand, "a", "y", "outgoing", 5, 10)
+        self.assertTrue(result.exhausted)
+        self.assertFalse(result.found)
+
+    def test_deadline(self):
+        graph = Graph([("r1", "a", "b", 1), ("r2", "b", "c", 1)])
+        result = bidirectional_bfs(graph.expand, "a", "c", "outgoing", 5, 1000, deadline=time.monotonic() - 1)
+        self.assertTrue(result.exhausted)
+        self.assertEqual(graph.calls, [])
+
+    def test_matches_brute_force(self):
+        for seed, direction in itertools.product(range(30), ("outgoing", "incoming", "both")):
+            names, graph = random_graph(seed)
+            for source, target in (("n0", "n1"), ("n2", "n7"), ("n5", "n11")):
+                result = bidirectional_bfs(graph.expand, source, target, direction, 4, 10000)
+                expected = brute_force(graph, source, target, direction, 4, weighted=False)
+                context = (seed, direction, source, target)
+                if expected is None:
+                    self.assertFalse(result.found, context)
+                else:
+                    self.assertEqual(result.cost, expected, context)
+                    graph.check_path(self, result, source, target, direction)
+
+
+class DijkstraTest(unittest.TestCase):
+    # The cheapest route to X (through A) uses a hop the depth limit may need for the rest of the path
+    EDGES = [
+        ("sa", "S", "A", 1), ("ax", "A", "X", 1), ("sx", "S", "X", 10), ("xt", "X", "T", 10)
+    ]
+
+    def test_cheapest_path(self):
+        result = dijkstra(Graph(self.EDGES).expand, "S", "T", "outgoing", 3, 1000)
+        self.assertEqual(result.node_ids, ["S", "A", "X", "T"])
+        self.assertEqual(result.relationship_ids, ["sa", "ax", "xt"])
+        self.assertEqual(result.cost, 12)
+
+    def test_hop_limit_keeps_costlier_shorter_route(self):
+        result = dijkstra(Graph(self.EDGES).expand, "S", "T", "outgoing", 2, 1000)
+        self.assertEqual(result.node_ids, ["S", "X", "T"])
+        self.assertEqual(result.cost, 20)
+
+    def test_ties_are_expanded_in_one_call(self):
+        graph = Graph([("r1", "s", "a", 1), ("r2", "s", "b", 1), ("r3", "a", "t", 5), ("r4", "b", "t", 7)])
+        result = dijkstra(graph.expand, "s", "t", "outgoing", 3, 1000)
+        self.assertEqual(result.cost, 6)
+        self.assertEqual(graph.calls[:2], [["s"], ["a", "b"]])
+
+    def test_negative_weight(self):
+        with self.assertRaises(ValueError):
+            dijkstra(Graph([("r1", "a", "b", -1)]).expand, "a", "b", "outgoing", 3, 1000)
+
+    def test_deadline(self):
+        result = dijkstra(Graph(self.EDGES).expand, "S", "T", "outgoing", 3, 1000, deadline=time.monotonic() - 1)
+        self.assertTrue(result.exhausted)
+        self.assertFalse(result.found)
+
+    def test_visit_budget(self):
+        edges = [(f"r{i}", "a", f"m{i}", 1) for i in range(50)] + [("rz", "m0", "z", 5)]
+        result = dijkstra(Graph(edges).expand, "a", "z", "outgoing", 3, 10)
+        self.assertTrue(result.exhausted)
+
+    def test_matches_brute_force(self):
+        for seed, direction, max_depth in itertools.product(range(30), ("outgoing", "both"), (2, 4)):
+            names, graph = random_graph(seed)
+            for source, target in (("n0", "n1"), ("n2", "n7"), ("n5", "n11")):
+                result = dijkstra(graph.expand, source, target, direction, max_depth, 10000)
+                expected = brute_force(graph, source, target, direction, max_depth, weighted=True)
+                context = (seed, direction, max_depth, source, target)
+                if source == target:
+                    expected = 0.0
+                if expected is None:
+                    self.assertFalse(result.found, context)
+                else:
+                    self.assertEqual(result.cost, expected, context)
+                    self.assertLessEqual(len(result.relationship_ids), max_depth, context)
+                    self.assertEqual(graph.check_path(self, result, source, target, direction), expected, context)
+
+
+class ReachableWithinTest(unittest.TestCase):
+    def test_counts_by_depth(self):
+        graph = Graph([
+            ("r1", "a", "b", 1), ("r2", "a", "c", 1), ("r3", "b", "d", 1), ("r4", "c", "d", 1), ("r5", "d", "a", 1)
+        ])
+        result = reachable_within(graph.expand, "a", "outgoing", 3, 1000)
+        self.assertEqual(result, {"count": 3, "count_by_depth": [2, 1, 0], "exhausted": False})
+        result = reachable_within(graph.expand, "a", "outgoing", 1, 1000)
+        self.assertEqual(result["count"], 2)
+
+    def test_exhausted(self):
+        edges = [(f"r{i}", "a", f"m{i}", 1) for i in range(50)]
+        self.assertTrue(reachable_within(Graph(edges).expand, "a", "outgoing", 2, 10)["exhausted"])
+        result = reachable_within(Graph(edges).expand, "a", "outgoing", 2, 1000, deadline=time.monotonic() - 1)
+        self.assertEqual(result, {"count": 0, "count_by_depth": [], "exhausted": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
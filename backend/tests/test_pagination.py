@@ -0,0 +1,102 @@
+"""Tests for keyset pagination cursors.
+
+Run from the repository root with python -m pytest backend/tests
+(or python -m unittest discover backend/tests).
+"""
+
+import base64
+import os
+import sqlite3
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.pagination import build_page, decode_cursor, encode_cursor, keyset_predicate  # noqa: E402
+
+
+class CursorTest(unittest.TestCase):
+    def test_round_trip(self):
+        for sort_value, row_id in (
+            (datetime(2026, 1, 30, 10, 0, 0), "550e8400-e29b-41d4-a716-446655440000"),
+            (datetime(2026, 1, 30, 10, 0, 0, 123456), "id with spaces/and+symbols"),
+            (datetime(1999, 12, 31), "")
+        ):
+            token = encode_cursor(sort_value, row_id)
+            self.assertEqual(decode_cursor(token), (sort_value, row_id))
+
+    def test_token_is_url_safe(self):
+        for length in range(1, 8):
+            token = encode_cursor(datetime(2026, 1, 30), "?" * length)
+            self.assertNotIn("=", token)
+            self.assertTrue(set(token) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"))
+
+    def test_malformed_tokens(self):
+        for token in (
+            "",
+            "not a cursor",
+            base64.urlsafe_b64encode(b"[1, 2, 3]").decode(),
+            base64.urlsafe_b64encode(b'["yesterday", "id"]').decode(),
+            base64.urlsafe_b64encode(b'{"a": 1}').decode()
+        ):
+            with self.assertRaises(ValueError, msg=token):
+                decode_cursor(token)
+
+
+class BuildPageTest(unittest.TestCase):
+    def key(self, item):
+        return item
+
+    def test_more_items(self):
+        items = [(datetime(2026, 1, 3), "c"), (datetime(2026, 1, 2), "b"), (datetime(2026, 1, 1), "a")]
+        page = build_page(items, 2, self.key, total=10)
+        self.assertEqual(page.items, items[:2])
+        self.assertTrue(page.has_more)
+        self.assertEqual(page.total, 10)
+        self.assertEqual(decode_cursor(page.next_cursor), items[1])
+
+    def test_last_page(self):
+        items = [(datetime(2026, 1, 3), "c")]
+        page = build_page(items, 2, self.key)
+        self.assertFalse(page.has_more)
+        self.assertIsNone(page.next_cursor)
+        self.assertEqual(build_page([], 2, self.key).items, [])
+
+
+class KeysetWalkTest(unittest.TestCase):
+    """Walks a table page by page with keyset_predicate, as the list_*_page methods do"""
+
+    def setUp(self):
+        self.db = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES)
+        self.db.execute("CREATE TABLE ROWS (ID TEXT, CREATED_AT TIMESTAMP)")
+        start = datetime(2026, 1, 1)
+        # Several rows share each timestamp, so pages split ties
+        self.rows = [(f"id-{n:03d}", start + timedelta(seconds=n // 4)) for n in range(37)]
+        self.db.executemany("INSERT INTO ROWS VALUES (?, ?)", self.rows)
+
+    def page(self, limit, after):
+        query = "SELECT CREATED_AT, ID FROM ROWS"
+        params = []
+        if after:
+            query += " WHERE " + keyset_predicate("CREATED_AT", "ID").replace("%s", "?")
+            params.extend([after[0], after[0], after[1]])
+        query += " ORDER BY CREATED_AT DESC, ID DESC LIMIT ?"
+        params.append(limit + 1)
+        return build_page(self.db.execute(query, params).fetchall(), limit, lambda row: row)
+
+    def test_walk_visits_every_row_once(self):
+        for limit in (1, 3, 4, 5, 36, 37, 100):
+            seen = []
+            cursor = None
+            while True:
+                page = self.page(limit, decode_cursor(cursor) if cursor else None)
+                seen.extend(row[1] for row in page.items)
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+            self.assertEqual(seen, sorted((row[0] for row in self.rows), reverse=True), limit)
+
+
+if __name__ == "__main__":
+    unittest.main()
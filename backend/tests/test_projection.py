@@ -0,0 +1,121 @@
+"""Tests for fields= parsing and response projection.
+
+Run from the repository root with python -m pytest backend/tests
+(or python -m unittest discover backend/tests).
+"""
+
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.projection import (  # noqa: E402
+    ENTITY_COLUMNS,
+    RELATIONSHIP_COLUMNS,
+    parse_fields,
+    parse_graph_fields
+)
+
+ENTITY_FIELDS = tuple(ENTITY_COLUMNS)
+
+
+def entity_fields(fields):
+    return parse_fields(fields, ENTITY_FIELDS, ("entity_id",))
+
+
+class ParseFieldsTest(unittest.TestCase):
+    def test_no_projection(self):
+        self.assertIsNone(entity_fields(None))
+        self.assertIsNone(entity_fields(""))
+
+    def test_default_order_and_required_fields(self):
+        projection = entity_fields(" updated_at , label,,label ")
+        self.assertEqual(projection.fields, ("entity_id", "label", "updated_at"))
+
+    def test_whole_properties(self):
+        projection = entity_fields("properties")
+        self.assertEqual(projection.fields, ("entity_id", "properties"))
+        self.assertIsNone(projection.property_paths)
+        # properties alone wins over its sub-paths
+        self.assertIsNone(entity_fields("properties.score,properties").property_paths)
+
+    def test_property_paths(self):
+        projection = entity_fields("properties.address.city,properties.score,properties.address.zip")
+        self.assertEqual(projection.fields, ("entity_id", "properties"))
+        self.assertEqual(projection.property_paths, {"address": {"city": None, "zip": None}, "score": None})
+
+    def test_shorter_path_wins(self):
+        projection = entity_fields("properties.address.city,properties.address")
+        self.assertEqual(projection.property_paths, {"address": None})
+
+    def test_invalid_fields(self):
+        for fields in ("owner", "label.x", "properties.", "properties.a-b", "Label", "properties..a"):
+            with self.assertRaises(ValueError, msg=fields):
+                entity_fields(fields)
+
+    def test_relationship_fields(self):
+        projection = parse_fields("created_at", tuple(RELATIONSHIP_COLUMNS), ("relationship_id",))
+        self.assertEqual(projection.fields, ("relationship_id", "created_at"))
+        with self.assertRaises(ValueError):
+            parse_fields("tags", tuple(RELATIONSHIP_COLUMNS), ("relationship_id",))
+
+
+class ParseGraphFieldsTest(unittest.TestCase):
+    def test_fields_split_between_nodes_and_edges(self):
+        nodes, edges = parse_graph_fields("label,properties.score")
+        self.assertEqual(nodes.fields, ("entity_id", "label", "properties", "depth"))
+        self.assertEqual(edges.fields, ("relationship_id", "subject_id", "predicate", "object_id", "properties"))
+        self.assertEqual(nodes.property_paths, {"score": None})
+        self.assertEqual(edges.property_paths, {"score": None})
+
+    def test_edge_only_field(self):
+        nodes, edges = parse_graph_fields("predicate")
+        self.assertEqual(nodes.fields, ("entity_id", "depth"))
+        self.assertNotIn("properties", edges.fields)
+
+    def test_unknown_field(self):
+        self.assertEqual(parse_graph_fields(None), (None, None))
+        with self.assertRaises(ValueError):
+            parse_graph_fields("tags")
+
+
+class ProjectionTest(unittest.TestCase):
+    def test_select_list(self):
+        self.assertEqual(entity_fields("label").select_list(ENTITY_COLUMNS), "ENTITY_ID, LABEL")
+        self.assertEqual(
+            entity_fields("properties.address.city,properties.score").select_list(ENTITY_COLUMNS),
+            "ENTITY_ID, OBJECT_CONSTRUCT('score', GET_PATH(PROPERTIES, 'score'), "
+            "'address', OBJECT_CONSTRUCT('city', GET_PATH(PROPERTIES, 'address.city')))"
+        )
+        self.assertEqual(entity_fields("label").properties_sql("PROPERTIES"), "NULL")
+
+    def test_row_to_dict(self):
+        projection = entity_fields("properties,tags,label")
+        self.assertEqual(
+            projection.row_to_dict(("e1", "Acme", '{"score": 3}', None)),
+            {"entity_id": "e1", "label": "Acme", "properties": {"score": 3}, "tags": []}
+        )
+
+    def test_project(self):
+        item = {
+            "entity_id": "e1",
+            "label": "Acme",
+            "properties": {"score": 3, "address": {"city": "Oslo", "zip": "0150"}, "notes": "x"},
+            "tags": ["vip"]
+        }
+        projected = entity_fields("properties.address.city,properties.missing,properties.score.deep").project(item)
+        # Missing leaves are left out; objects on the path are kept, as OBJECT_CONSTRUCT drops only NULL values
+        self.assertEqual(projected, {
+            "entity_id": "e1",
+            "properties": {"address": {"city": "Oslo"}, "score": {}}
+        })
+        self.assertEqual(entity_fields("label,updated_at").project(item), {"entity_id": "e1", "label": "Acme"})
+        self.assertEqual(json.loads(json.dumps(entity_fields("properties").project(item))), {
+            "entity_id": "e1", "properties": item["properties"]
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""Tests for trigger condition parsing and matching.
+
+Run from the repository root with python -m pytest backend/tests
+(or python -m unittest discover backend/tests).
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.trigger_registry import TriggerRegistry, parse_trigger  # noqa: E402
+
+STATES = ("ACTIVE", "AT_RISK", "CHURNED", "NEW")
+
+
+def context(current_state, previous_state=None, **entity):
+    return {"current_state": current_state, "previous_state": previous_state, **entity}
+
+
+class ParseTriggerTest(unittest.TestCase):
+    def test_wildcard(self):
+        condition = parse_trigger("*")
+        self.assertIsNone(condition.states)
+        self.assertTrue(condition.matches(context("ANYTHING")))
+
+    def test_bare_state(self):
+        condition = parse_trigger("AT_RISK")
+        self.assertEqual(condition.states, frozenset(["AT_RISK"]))
+        self.assertTrue(condition.matches(context("AT_RISK")))
+        self.assertFalse(condition.matches(context("ACTIVE")))
+
+    def test_transition(self):
+        condition = parse_trigger("ACTIVE->AT_RISK")
+        self.assertEqual(condition.states, frozenset(["AT_RISK"]))
+        self.assertEqual(condition.previous_states, frozenset(["ACTIVE"]))
+        self.assertTrue(condition.matches(context("AT_RISK", "ACTIVE")))
+        self.assertFalse(condition.matches(context("AT_RISK", "NEW")))
+
+    def test_transition_from_any_state(self):
+        condition = parse_trigger("* -> CHURNED")
+        self.assertEqual(condition.states, frozenset(["CHURNED"]))
+        self.assertIsNone(condition.previous_states)
+        self.assertTrue(condition.matches(context("CHURNED", "ACTIVE")))
+
+    def test_quoted_values(self):
+        for text in ("current_state = 'AT_RISK'", 'current_state = "AT_RISK"', "current_state=AT_RISK"):
+            condition = parse_trigger(text)
+            self.assertEqual(condition.states, frozenset(["AT_RISK"]), text)
+            self.assertEqual(condition.predicates[0].values, ("AT_RISK",), text)
+
+    def test_in_list(self):
+        condition = parse_trigger("entity_type = CUSTOMER AND current_state IN ('AT_RISK', CHURNED)")
+        self.assertEqual(condition.states, frozenset(["AT_RISK", "CHURNED"]))
+        self.assertTrue(condition.needs_entity)
+        self.assertTrue(condition.matches(context("CHURNED", entity_type="CUSTOMER")))
+        self.assertFalse(condition.matches(context("CHURNED", entity_type="ACCOUNT")))
+        self.assertFalse(condition.matches(context("ACTIVE", entity_type="CUSTOMER")))
+
+    def test_in_requires_parentheses(self):
+        with self.assertRaises(ValueError):
+            parse_trigger("current_state IN AT_RISK, CHURNED")
+
+    def test_property_comparisons(self):
+        condition = parse_trigger("properties.score >= 80 AND tags = vip AND properties.name LIKE 'Acme%'")
+        self.assertTrue(condition.matches(context(
+            "ACTIVE", tags=["vip"], properties={"score": 91, "name": "Acme Corp"}
+        )))
+        self.assertFalse(condition.matches(context(
+            "ACTIVE", tags=["vip"], properties={"score": 79, "name": "Acme Corp"}
+        )))
+
+    def test_or_is_rejected(self):
+        for text in (
+            "current_state = 'AT_RISK' OR current_state = 'CHURNED'",
+            "current_state = AT_RISK or current_state = CHURNED",
+            "current_state IN (AT_RISK) OR entity_type = CUSTOMER"
+        ):
+            with self.assertRaises(ValueError, msg=text):
+                parse_trigger(text)
+
+    def test_or_inside_words_is_accepted(self):
+        condition = parse_trigger("properties.color = ORANGE")
+        self.assertTrue(condition.matches(context("ACTIVE", properties={"color": "ORANGE"})))
+
+    def test_unbalanced_or_embedded_quotes_are_rejected(self):
+        for text in ("current_state = 'AT_RISK", "current_state = AT_'RISK", "current_state IN ('A, 'B')"):
+            with self.assertRaises(ValueError, msg=text):
+                parse_trigger(text)
+
+    def test_unknown_field_is_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_trigger("owner = alice")
+
+
+class TriggerRegistryTest(unittest.TestCase):
+    def registry(self, rows):
+        return TriggerRegistry(lambda: rows, lambda: 1)
+
+    def test_unparsable_condition_falls_back_to_legacy(self):
+        registry = self.registry([("wf-or", "current_state = 'AT_RISK' OR current_state = 'CHURNED'")])
+        self.assertEqual(registry.match("AT_RISK", "ACTIVE", lambda: None), ["wf-or"])
+        self.assertEqual(registry.match("CHURNED", "AT_RISK", lambda: None), ["wf-or"])
+        self.assertEqual(registry.stats()["legacy"], 1)
+
+    def test_agrees_with_legacy_substring_matching(self):
+        # Conditions the legacy substring test already handled correctly must match the same state changes
+        conditions = [
+            "AT_RISK",
+            "CHURNED",
+            "*->AT_RISK",
+            "current_state = 'AT_RISK'",
+            "current_state IN (AT_RISK, CHURNED)",
+            "current_state = 'AT_RISK' OR current_state = 'CHURNED'"
+        ]
+        registry = self.registry([(f"wf-{number}", text) for number, text in enumerate(conditions)])
+        for previous_state in STATES:
+            for current_state in STATES:
+                matched = set(registry.match(current_state, previous_state, lambda: None))
+                legacy = {f"wf-{number}" for number, text in enumerate(conditions) if current_state in text}
+                self.assertEqual(matched, legacy, (previous_state, current_state))
+
+    def test_match_many_loads_entities_once(self):
+        registry = self.registry([("wf-1", "entity_type = CUSTOMER AND current_state = AT_RISK")])
+        loads = []
+
+        def load_entities(entity_ids):
+            loads.append(entity_ids)
+            return {entity_id: {"entity_type": "CUSTOMER"} for entity_id in entity_ids}
+
+        matches = registry.match_many(
+            [("e1", "AT_RISK", "ACTIVE"), ("e2", "AT_RISK", "ACTIVE"), ("e3", "ACTIVE", "NEW")], load_entities
+        )
+        self.assertEqual(matches, [("e1", "wf-1"), ("e2", "wf-1")])
+        self.assertEqual(loads, [["e1", "e2"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
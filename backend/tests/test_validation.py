@@ -0,0 +1,225 @@
+"""Tests for CompiledValidator, checking validate() against violation_sql().
+
+violation_sql() is run on SQLite, with the Snowflake VARIANT functions it
+uses stood in for by Python functions over JSON text (SQL NULL for a
+missing value).
+
+Run from the repository root with python -m pytest backend/tests
+(or python -m unittest discover backend/tests).
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from models import ValidationRule, ValidationRuleType  # noqa: E402
+from services.validation import CompiledValidator  # noqa: E402
+
+_MISSING = object()
+
+
+def _loads(variant):
+    return _MISSING if variant is None else json.loads(variant)
+
+
+def get_path(properties, path):
+    value = json.loads(properties)
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return json.dumps(value)
+
+
+def strip_null_value(variant):
+    return None if variant is None or variant == "null" else variant
+
+
+def to_varchar(variant):
+    value = _loads(variant)
+    if value is _MISSING:
+        return None
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def typeof(variant):
+    value = _loads(variant)
+    if value is _MISSING:
+        return None
+    if isinstance(value, bool):
+        return "BOOLEAN"
+    if isinstance(value, int):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "DOUBLE"
+    return {str: "VARCHAR", list: "ARRAY", dict: "OBJECT"}[type(value)]
+
+
+def try_to_double(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def regexp_like(text, pattern):
+    return None if text is None else int(re.fullmatch(pattern, text) is not None)
+
+
+def array_contains(variant, array):
+    value = _loads(variant)
+    if value is _MISSING:
+        return None
+    # Variant equality: numbers compare by value, booleans only with booleans
+    return int(any(
+        isinstance(member, bool) == isinstance(value, bool) and member == value
+        for member in json.loads(array)
+    ))
+
+
+def warehouse(entities):
+    """SQLite database with an ENTITIES table and the functions violation_sql() uses"""
+    db = sqlite3.connect(":memory:")
+    for name, arity, function in (
+        ("GET_PATH", 2, get_path),
+        ("STRIP_NULL_VALUE", 1, strip_null_value),
+        ("TO_VARIANT", 1, json.dumps),
+        ("TO_VARCHAR", 1, to_varchar),
+        ("TYPEOF", 1, typeof),
+        ("TRY_TO_DOUBLE", 1, try_to_double),
+        ("REGEXP_LIKE", 2, regexp_like),
+        ("ARRAY_CONTAINS", 2, array_contains),
+        ("PARSE_JSON", 1, lambda text: text)
+    ):
+        db.create_function(name, arity, function, deterministic=True)
+    db.execute("CREATE TABLE ENTITIES (ENTITY_ID TEXT, PROPERTIES TEXT)")
+    db.executemany("INSERT INTO ENTITIES VALUES (?, ?)", [
+        (entity_id, json.dumps(properties)) for entity_id, properties in entities
+    ])
+    return db
+
+
+def sql_violators(validator, entities):
+    condition, params = validator.violation_sql()
+    condition = condition.replace("%s", "?").replace("::ARRAY", "")
+    rows = warehouse(entities).execute(f"SELECT ENTITY_ID FROM ENTITIES WHERE {condition}", params)
+    return {row[0] for row in rows}
+
+
+def rule(field, type, **options):
+    return ValidationRule(field=field, type=type, error_message=f"bad {field}", **options)
+
+
+# Property values covering the cases the rules treat differently
+VALUES = [
+    _MISSING, None, "", "a@b.co", "not an email", "AB-123", "ab-123", "gold",
+    0, 1, 1.0, 5, 10.5, 11, -3, True, False, "7", ["gold"], {"a": 1}
+]
+
+RULES = [
+    rule("email", ValidationRuleType.EMAIL),
+    rule("code", ValidationRuleType.REGEX, pattern=r"[A-Z]{2}-\d+"),
+    rule("tier", ValidationRuleType.IN_LIST, values=["gold", "silver", 1]),
+    rule("flag", ValidationRuleType.IN_LIST, values=[True]),
+    rule("score", ValidationRuleType.RANGE, min=0, max=10.5),
+    rule("floor", ValidationRuleType.RANGE, min=1),
+    rule("name", ValidationRuleType.REQUIRED),
+    rule("owner.id", ValidationRuleType.REGEX, pattern=r"\d+", required=True)
+]
+
+
+def entities_for(field):
+    """One entity per value of VALUES, nested under field"""
+    entities = []
+    for position, value in enumerate(VALUES):
+        properties = {}
+        if value is not _MISSING:
+            target = properties
+            *parents, leaf = field.split(".")
+            for key in parents:
+                target = target.setdefault(key, {})
+            target[leaf] = value
+        entities.append((f"e{position}", properties))
+    return entities
+
+
+class CompiledValidatorTest(unittest.TestCase):
+    def test_email(self):
+        validator = CompiledValidator([rule("email", ValidationRuleType.EMAIL)])
+        invalid = validator.validate([
+            ("ok", {"email": "a@b.co"}), ("bad", {"email": "a@b"}), ("missing", {}), ("empty", {"email": ""})
+        ])
+        self.assertEqual(invalid, {"bad": [{"field": "email", "type": "email", "error": "bad email"}]})
+
+    def test_required(self):
+        validator = CompiledValidator([rule("email", ValidationRuleType.EMAIL, required=True)])
+        invalid = validator.validate([("missing", {}), ("null", {"email": None}), ("ok", {"email": "a@b.co"})])
+        self.assertEqual(set(invalid), {"missing", "null"})
+
+    def test_regex_must_match_whole_value(self):
+        validator = CompiledValidator([rule("code", ValidationRuleType.REGEX, pattern=r"\d+")])
+        self.assertEqual(set(validator.validate([("partial", {"code": "12a"}), ("ok", {"code": "12"})])), {"partial"})
+
+    def test_in_list_keeps_booleans_apart_from_numbers(self):
+        validator = CompiledValidator([rule("tier", ValidationRuleType.IN_LIST, values=[1, "gold"])])
+        invalid = validator.validate([
+            ("one", {"tier": 1}), ("float", {"tier": 1.0}), ("true", {"tier": True}), ("list", {"tier": ["gold"]})
+        ])
+        self.assertEqual(set(invalid), {"true", "list"})
+
+    def test_range_rejects_non_numbers(self):
+        validator = CompiledValidator([rule("score", ValidationRuleType.RANGE, min=0, max=10)])
+        invalid = validator.validate([
+            ("ok", {"score": 10}), ("high", {"score": 11}), ("text", {"score": "5"}), ("bool", {"score": True})
+        ])
+        self.assertEqual(set(invalid), {"high", "text", "bool"})
+
+    def test_every_failing_rule_is_reported(self):
+        validator = CompiledValidator([
+            rule("email", ValidationRuleType.EMAIL), rule("name", ValidationRuleType.REQUIRED)
+        ])
+        invalid = validator.validate([("e1", {"email": "nope"})])
+        self.assertEqual([violation["field"] for violation in invalid["e1"]], ["email", "name"])
+
+    def test_invalid_rules(self):
+        for rules in (
+            [],
+            [rule("code", ValidationRuleType.REGEX)],
+            [rule("tier", ValidationRuleType.IN_LIST, values=[])],
+            [rule("score", ValidationRuleType.RANGE)]
+        ):
+            with self.assertRaises(ValueError, msg=rules):
+                CompiledValidator(rules)
+
+    def test_violation_sql_agrees_with_validate(self):
+        for compiled_rule in RULES:
+            validator = CompiledValidator([compiled_rule])
+            entities = entities_for(compiled_rule.field)
+            self.assertEqual(
+                sql_violators(validator, entities),
+                set(validator.validate(entities)),
+                f"{compiled_rule.type.value} rule on {compiled_rule.field}"
+            )
+
+    def test_combined_violation_sql_agrees_with_validate(self):
+        validator = CompiledValidator(RULES)
+        entities = [
+            (f"e{position}", {compiled_rule.field.split(".")[0]: value for compiled_rule in RULES})
+            for position, value in enumerate(VALUES[1:])
+        ]
+        entities.append(("valid", {
+            "email": "a@b.co", "code": "AB-1", "tier": "gold", "flag": True,
+            "score": 3, "floor": 2, "name": "x", "owner": {"id": "42"}
+        }))
+        violators = sql_violators(validator, entities)
+        self.assertEqual(violators, set(validator.validate(entities)))
+        self.assertNotIn("valid", violators)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,11 +11,12 @@ export interface Entity {
 }
 
 export const entitiesApi = {
-  list: async (entityType?: string, limit = 100, offset = 0) => {
+  list: async (entityType?: string, limit = 100, offset = 0, fields?: string) => {
     const params = new URLSearchParams()
     if (entityType) params.append('entity_type', entityType)
     params.append('limit', limit.toString())
     params.append('offset', offset.toString())
+    if (fields) params.append('fields', fields)
     
     const response = await apiClient.get(`/entities?${params}`)
     return response.data
@@ -26,6 +27,11 @@ export const entitiesApi = {
     return response.data
   },
 
+  batchGet: async (entityIds: string[]) => {
+    const response = await apiClient.post('/entities/batch-get', { entity_ids: entityIds })
+    return response.data
+  },
+
   create: async (entity: Entity) => {
     const response = await apiClient.post('/entities', entity)
     return response.data
@@ -3,16 +3,86 @@ import apiClient from './client'
 export interface GraphQuery {
   start_entity_id: string
   relationship_types?: string[]
+  hop_predicates?: string[]
+  entity_types?: string[]
+  max_fanout?: number
+  max_nodes?: number
+  max_edges?: number
   max_depth?: number
   direction?: 'outgoing' | 'incoming' | 'both'
 }
 
+export interface PathQuery {
+  source_entity_id: string
+  target_entity_id: string
+  relationship_types?: string[]
+  weight_property?: string
+  max_depth?: number
+  direction?: 'outgoing' | 'incoming' | 'both'
+}
+
+export interface ReachabilityQuery {
+  start_entity_id: string
+  target_entity_id?: string
+  relationship_types?: string[]
+  max_depth?: number
+  direction?: 'outgoing' | 'incoming' | 'both'
+}
+
+export interface GraphStreamEvent {
+  type: 'level' | 'summary' | 'error'
+  depth?: number
+  nodes?: any[]
+  edges?: any[]
+  total_nodes?: number
+  total_edges?: number
+  truncated?: boolean
+  detail?: string
+}
+
 export const graphApi = {
   query: async (query: GraphQuery) => {
     const response = await apiClient.post('/graph/query', query)
     return response.data
   },
 
+  // Streams NDJSON levels so large neighborhoods can be rendered progressively
+  queryStream: async (query: GraphQuery, onEvent: (event: GraphStreamEvent) => void) => {
+    const response = await fetch(`${apiClient.defaults.baseURL}/graph/query/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(query),
+    })
+    if (!response.ok || !response.body) {
+      throw new Error(`Graph stream failed: ${response.status}`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const lines = buffer.split('\n')
+      buffer = lines.pop() ?? ''
+      for (const line of lines) {
+        if (line.trim()) onEvent(JSON.parse(line))
+      }
+    }
+    if (buffer.trim()) onEvent(JSON.parse(buffer))
+  },
+
+  path: async (query: PathQuery) => {
+    const response = await apiClient.post('/graph/path', query)
+    return response.data
+  },
+
+  reachable: async (query: ReachabilityQuery) => {
+    const response = await apiClient.post('/graph/reachable', query)
+    return response.data
+  },
+
   stats: async () => {
     const response = await apiClient.get('/graph/stats')
     return response.data
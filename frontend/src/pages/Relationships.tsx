@@ -21,8 +21,8 @@ export default function Relationships() {
   })
 
   const { data: entities } = useQuery({
-    queryKey: ['entities'],
-    queryFn: () => entitiesApi.list(),
+    queryKey: ['entities', 'options'],
+    queryFn: () => entitiesApi.list(undefined, 100, 0, 'entity_type,label'),
   })
 
   const createMutation = useMutation({
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark POST /entities/search against client-side filtering.
+
+Generates synthetic entities (with tags, nested properties and states) in a
+scratch schema, then compares OntologyService.search_entities with the
+baseline clients used before it existed: page through list_entities and
+filter in Python. Requires a Snowflake account configured through the usual
+SNOWFLAKE_* environment variables; the scratch schema is dropped at the end
+unless --keep is given.
+
+Usage:
+    python scripts/bench_entity_search.py [--entities 10000 100000 1000000] [--runs 3]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from config import settings  # noqa: E402
+
+BENCH_SCHEMA = "ONTOLOGY_BENCH"
+settings.snowflake_schema = BENCH_SCHEMA
+os.environ["SNOWFLAKE_SCHEMA"] = BENCH_SCHEMA
+
+from database import SnowflakeConnection  # noqa: E402
+from models import EntityFilter  # noqa: E402
+from services.ontology_service import OntologyService  # noqa: E402
+from services.workflow_service import WorkflowService  # noqa: E402
+
+PAGE_SIZE = 1000
+
+FILTERS = {
+    "type+tag": EntityFilter(entity_type="CUSTOMER", tags=["enterprise"]),
+    "property": EntityFilter(properties={"address.city": "Boston", "tier": "Gold"}),
+    "state": EntityFilter(entity_type="CUSTOMER", current_state="AT_RISK"),
+}
+
+
+def create_synthetic_entities(cursor, entity_count: int):
+    cursor.execute("""
+        CREATE OR REPLACE TABLE ENTITIES (
+            ENTITY_ID VARCHAR(36), ENTITY_TYPE VARCHAR(100), LABEL VARCHAR(500),
+            PROPERTIES VARIANT, TAGS VARIANT, CREATED_AT TIMESTAMP_NTZ, UPDATED_AT TIMESTAMP_NTZ
+        )
+    """)
+    cursor.execute("""
+        CREATE OR REPLACE TABLE ENTITY_STATES (
+            ENTITY_ID VARCHAR(36), CURRENT_STATE VARCHAR(100), PREVIOUS_STATE VARCHAR(100),
+            STATE_DATA VARIANT, UPDATED_AT TIMESTAMP_NTZ
+        )
+    """)
+    cursor.execute("""
+        CREATE OR REPLACE VIEW V_ENTITIES_WITH_STATE AS
+        SELECT e.*, s.CURRENT_STATE, s.PREVIOUS_STATE, s.STATE_DATA
+        FROM ENTITIES e
+        LEFT JOIN ENTITY_STATES s ON e.ENTITY_ID = s.ENTITY_ID
+    """)
+    cursor.execute(f"""
+        INSERT INTO ENTITIES
+        SELECT 'e-' || SEQ4(),
+               DECODE(UNIFORM(0, 3, RANDOM()), 0, 'CUSTOMER', 1, 'ACCOUNT', 2, 'PRODUCT', 'ORDER'),
+               'Entity ' || SEQ4(),
+               OBJECT_CONSTRUCT(
+                   'tier', DECODE(UNIFORM(0, 2, RANDOM()), 0, 'Gold', 1, 'Silver', 'Bronze'),
+                   'address', OBJECT_CONSTRUCT('city', DECODE(UNIFORM(0, 9, RANDOM()), 0, 'Boston', 'Elsewhere'))
+               ),
+               IFF(UNIFORM(0, 4, RANDOM()) = 0, ARRAY_CONSTRUCT('enterprise'), ARRAY_CONSTRUCT('smb')),
+               DATEADD(second, -SEQ4(), CURRENT_TIMESTAMP()::TIMESTAMP_NTZ),
+               CURRENT_TIMESTAMP()::TIMESTAMP_NTZ
+        FROM TABLE(GENERATOR(ROWCOUNT => {entity_count}))
+    """)
+    cursor.execute("""
+        INSERT INTO ENTITY_STATES
+        SELECT ENTITY_ID, IFF(UNIFORM(0, 9, RANDOM()) = 0, 'AT_RISK', 'ACTIVE'), NULL, NULL, CURRENT_TIMESTAMP()
+        FROM ENTITIES
+    """)
+
+
+def client_side_baseline(ontology: OntologyService, workflows: WorkflowService, entity_filter: EntityFilter):
+    """What clients did before: download every page of /entities and filter locally"""
+    matches = []
+    offset = 0
+    while True:
+        page = ontology.list_entities(entity_type=entity_filter.entity_type, limit=PAGE_SIZE, offset=offset)
+        for entity in page:
+            if entity_filter.tags and not all(tag in entity.tags for tag in entity_filter.tags):
+                continue
+            if entity_filter.properties:
+                matched = True
+                for path, expected in entity_filter.properties.items():
+                    value = entity.properties
+                    for part in path.split("."):
+                        value = value.get(part) if isinstance(value, dict) else None
+                    matched = matched and value == expected
+                if not matched:
+                    continue
+            if entity_filter.current_state:
+                state = workflows.get_entity_state(entity.entity_id)
+                if not state or state.current_state != entity_filter.current_state:
+                    continue
+            matches.append(entity)
+        if len(page) < PAGE_SIZE:
+            return matches
+        offset += PAGE_SIZE
+
+
+def server_side(ontology: OntologyService, entity_filter: EntityFilter):
+    matches = []
+    cursor = None
+    while True:
+        page = ontology.search_entities(entity_filter, limit=PAGE_SIZE, cursor=cursor)
+        matches.extend(page.items)
+        if not page.has_more:
+            return matches
+        cursor = page.next_cursor
+
+
+def timed(func, runs: int):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entities", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--skip-state-baseline-above", type=int, default=10_000,
+                        help="The state baseline issues one query per entity; skip it above this size")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema")
+    args = parser.parse_args()
+
+    db = SnowflakeConnection()
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {BENCH_SCHEMA}")
+        cursor.execute(f"USE SCHEMA {BENCH_SCHEMA}")
+        cursor.execute("ALTER SESSION SET USE_CACHED_RESULT = FALSE")
+        cursor.close()
+
+    ontology = OntologyService(db)
+    workflows = WorkflowService(db)
+    print(f"{'entities':>9} {'filter':>9} {'matches':>8} {'client s':>9} {'server s':>9} {'speedup':>8}")
+
+    try:
+        for entity_count in args.entities:
+            with db.connection() as conn:
+                cursor = conn.cursor()
+                create_synthetic_entities(cursor, entity_count)
+                cursor.close()
+
+            for name, entity_filter in FILTERS.items():
+                server_s, server = timed(lambda: server_side(ontology, entity_filter), args.runs)
+                if entity_filter.current_state and entity_count > args.skip_state_baseline_above:
+                    print(f"{entity_count:>9} {name:>9} {len(server):>8} {'-':>9} {server_s:>9.3f} {'-':>8}")
+                    continue
+                client_s, client = timed(lambda: client_side_baseline(ontology, workflows, entity_filter), 1)
+                if len(client) != len(server):
+                    print(f"  warning: results differ ({len(client)} vs {len(server)})")
+                print(f"{entity_count:>9} {name:>9} {len(server):>8} {client_s:>9.3f} "
+                      f"{server_s:>9.3f} {client_s / server_s:>7.1f}x")
+    finally:
+        if not args.keep:
+            with db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA}")
+                cursor.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for query_graph result assembly.
+
+Feeds synthetic level-query rows (the shape returned by the level-by-level
+traversal) through the previous list-based assembly and through
+GraphAssembler, and prints time per edge. The list-based version grows
+quadratically with the neighborhood size; GraphAssembler stays flat.
+
+Usage:
+    python scripts/bench_graph_assembly.py [--sizes 1000 5000 10000 50000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from services.ontology_service import GraphAssembler  # noqa: E402
+
+PROPS = json.dumps({"since": "2024-01-15", "weight": 3, "notes": "synthetic edge"})
+
+
+def synthetic_rows(edge_count: int):
+    """Level rows: every edge seen from both endpoints, as with direction=both"""
+    rows = []
+    for i in range(edge_count):
+        subj, obj = f"e-{i // 4}", f"e-{i + 1}"
+        rows.append((f"r-{i}", subj, "RELATED_TO", obj, PROPS, obj, "CUSTOM", f"Entity {i}", PROPS))
+        rows.append((f"r-{i}", subj, "RELATED_TO", obj, PROPS, subj, "CUSTOM", f"Entity {i}", PROPS))
+    return rows
+
+
+def list_assembly(rows):
+    """The previous implementation: list membership tests and eager JSON decoding"""
+    visited = set()
+    nodes, edges = [], []
+    for rel_id, subj_id, pred, obj_id, rel_props, new_id, ent_type, ent_label, ent_props in rows:
+        edge = {
+            "relationship_id": rel_id,
+            "subject_id": subj_id,
+            "predicate": pred,
+            "object_id": obj_id,
+            "properties": json.loads(rel_props) if rel_props else {}
+        }
+        if edge not in edges:
+            edges.append(edge)
+        if new_id not in visited:
+            nodes.append({
+                "entity_id": new_id,
+                "entity_type": ent_type,
+                "label": ent_label,
+                "properties": json.loads(ent_props) if ent_props else {},
+                "depth": 1
+            })
+            visited.add(new_id)
+    return {"nodes": nodes, "edges": edges}
+
+
+def hashed_assembly(rows):
+    graph = GraphAssembler()
+    for rel_id, subj_id, pred, obj_id, rel_props, new_id, ent_type, ent_label, ent_props in rows:
+        graph.add_edge(rel_id, subj_id, pred, obj_id, rel_props)
+        graph.add_node(new_id, ent_type, ent_label, ent_props, 1)
+    return graph.result()
+
+
+def timed(func, rows):
+    start = time.perf_counter()
+    result = func(rows)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000, 50000])
+    parser.add_argument("--skip-list-above", type=int, default=20000,
+                        help="Skip the quadratic baseline above this many edges")
+    args = parser.parse_args()
+
+    print(f"{'edges':>7} {'list ms':>10} {'list us/edge':>13} {'hashed ms':>10} {'hashed us/edge':>15}")
+    for size in args.sizes:
+        rows = synthetic_rows(size)
+        hashed_s, hashed = timed(hashed_assembly, rows)
+        if size <= args.skip_list_above:
+            list_s, baseline = timed(list_assembly, rows)
+            assert len(baseline["edges"]) == len(hashed["edges"]) == size
+            list_cols = f"{list_s * 1000:>10.1f} {list_s / size * 1e6:>13.2f}"
+        else:
+            list_cols = f"{'-':>10} {'-':>13}"
+        print(f"{size:>7} {list_cols} {hashed_s * 1000:>10.1f} {hashed_s / size * 1e6:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for /graph/path and /graph/reachable.
+
+Builds the in-process AdjacencyIndex from a stand-in database holding a random
+synthetic graph (1M edges by default), then times OntologyService.shortest_path
+(unweighted and weighted) and OntologyService.reachable between random entity
+pairs and prints p50/p95 latencies against the documented target.
+
+It then runs the same searches without the index, each expansion answered by a
+stand-in warehouse query with --sql-latency-ms of latency, and prints how many
+queries each search took and how many gave up at GRAPH_PATH_TIMEOUT_SECONDS.
+
+Usage:
+    python scripts/bench_graph_paths.py [--edges 1000000] [--avg-degree 4] [--queries 200]
+        [--sql-queries 20] [--sql-latency-ms 20]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from config import settings  # noqa: E402
+from models import PathQuery, ReachabilityQuery  # noqa: E402
+from services.adjacency_index import AdjacencyIndex  # noqa: E402
+from services.ontology_service import OntologyService  # noqa: E402
+
+TARGET_P95_MS = 50.0
+
+
+class StandInCursor:
+    def __init__(self, entities, relationships):
+        self.entities = entities
+        self.relationships = relationships
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.rows = self.entities if "FROM ENTITIES" in sql else self.relationships
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class StandInDatabase:
+    """Serves the full ENTITIES/RELATIONSHIPS scans used by AdjacencyIndex.build"""
+
+    def __init__(self, entities, relationships):
+        self.entities = entities
+        self.relationships = relationships
+
+    @contextmanager
+    def connection(self):
+        class Connection:
+            cursor = lambda _: StandInCursor(self.entities, self.relationships)  # noqa: E731
+        yield Connection()
+
+
+class SQLStandInCursor:
+    """Answers the warehouse queries of the path searches from in-memory adjacency lists"""
+
+    def __init__(self, db: "SQLStandInDatabase"):
+        self.db = db
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        time.sleep(self.db.latency)
+        self.db.queries += 1
+        params = list(params or [])
+        ids = [value for value in params if isinstance(value, str) and value.startswith(("e-", "r-"))]
+        if "COUNT(*)" in sql:
+            self.rows = [(sum(1 for entity_id in ids if entity_id in self.db.entities),)]
+        elif "a.SOURCE_ID IN" in sql:
+            weighted = "GET(r.PROPERTIES" in sql
+            rows = []
+            for source in ids:
+                if "r.SUBJECT_ID AS SOURCE_ID" in sql:
+                    rows.extend((source, rel, target, weight if weighted else 1.0)
+                                for rel, target, weight in self.db.outgoing.get(source, []))
+                if "r.OBJECT_ID AS SOURCE_ID" in sql:
+                    rows.extend((source, rel, target, weight if weighted else 1.0)
+                                for rel, target, weight in self.db.incoming.get(source, []))
+            self.rows = rows
+        elif "FROM RELATIONSHIPS WHERE RELATIONSHIP_ID IN" in sql:
+            self.rows = [self.db.relationships[rel_id] for rel_id in ids]
+        else:
+            self.rows = [self.db.entities[entity_id] for entity_id in ids]
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class SQLStandInDatabase:
+    """Stand-in warehouse for the searches without the index: one latency-delayed query per expansion"""
+
+    def __init__(self, entities, relationships, latency: float):
+        self.latency = latency
+        self.queries = 0
+        self.entities = {row[0]: row[:4] for row in entities}
+        self.relationships = {}
+        self.outgoing = {}
+        self.incoming = {}
+        for rel_id, subject_id, predicate, object_id, props, _ in relationships:
+            self.relationships[rel_id] = (rel_id, subject_id, predicate, object_id, props)
+            weight = float(json.loads(props)["weight"])
+            self.outgoing.setdefault(subject_id, []).append((rel_id, object_id, weight))
+            self.incoming.setdefault(object_id, []).append((rel_id, subject_id, weight))
+
+    @contextmanager
+    def connection(self):
+        class Connection:
+            cursor = lambda _: SQLStandInCursor(self)  # noqa: E731
+        yield Connection()
+
+
+def synthetic_graph(edge_count: int, avg_degree: int, seed: int):
+    rng = random.Random(seed)
+    entity_count = max(edge_count // avg_degree, 2)
+    now = datetime.utcnow()
+    entities = [(f"e-{i}", "CUSTOM", f"Entity {i}", None, now) for i in range(entity_count)]
+    relationships = [
+        (
+            f"r-{i}",
+            f"e-{rng.randrange(entity_count)}",
+            f"REL_{rng.randrange(5)}",
+            f"e-{rng.randrange(entity_count)}",
+            json.dumps({"weight": rng.randint(1, 10)}),
+            now
+        )
+        for i in range(edge_count)
+    ]
+    return entities, relationships
+
+
+def percentiles(timings):
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return statistics.median(ordered) * 1000, p95 * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edges", type=int, default=1_000_000)
+    parser.add_argument("--avg-degree", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--sql-queries", type=int, default=20, help="Searches per case without the index")
+    parser.add_argument("--sql-latency-ms", type=float, default=20.0, help="Stand-in warehouse query latency")
+    args = parser.parse_args()
+
+    entities, relationships = synthetic_graph(args.edges, args.avg_degree, args.seed)
+    index = AdjacencyIndex(StandInDatabase(entities, relationships))
+    index.build()
+    print(f"Index: {len(entities)} entities, {len(relationships)} relationships, "
+          f"built in {index.last_build_seconds:.1f}s")
+
+    service = OntologyService(db=None, adjacency_index=index)
+    rng = random.Random(args.seed + 1)
+    pairs = [
+        (f"e-{rng.randrange(len(entities))}", f"e-{rng.randrange(len(entities))}")
+        for _ in range(args.queries)
+    ]
+
+    cases = path_cases(service)
+
+    print(f"{'case':>22} {'p50 ms':>8} {'p95 ms':>8} {'found':>6}  target p95 < {TARGET_P95_MS:.0f} ms")
+    for name, run in cases:
+        timings = []
+        found = 0
+        for source, target in pairs:
+            start = time.perf_counter()
+            result = run(source, target)
+            timings.append(time.perf_counter() - start)
+            found += bool(result.get("found") or result.get("reachable") or result.get("count"))
+        p50, p95 = percentiles(timings)
+        verdict = "ok" if p95 < TARGET_P95_MS else "MISSED"
+        print(f"{name:>22} {p50:>8.1f} {p95:>8.1f} {found:>6}  {verdict}")
+
+    # Without the index every expansion is a warehouse round-trip
+    sql_db = SQLStandInDatabase(entities, relationships, args.sql_latency_ms / 1000.0)
+    sql_service = OntologyService(db=sql_db)
+    print(f"\nWithout the index ({args.sql_latency_ms:.0f} ms per query, "
+          f"give up after {settings.graph_path_timeout_seconds:.0f} s)")
+    print(f"{'case':>22} {'p50 ms':>8} {'p95 ms':>8} {'found':>6} {'queries':>8} {'gave up':>8}")
+    for name, run in path_cases(sql_service):
+        timings = []
+        found = 0
+        exhausted = 0
+        queries = sql_db.queries
+        for source, target in pairs[:args.sql_queries]:
+            start = time.perf_counter()
+            result = run(source, target)
+            timings.append(time.perf_counter() - start)
+            found += bool(result.get("found") or result.get("reachable") or result.get("count"))
+            exhausted += bool(result.get("exhausted"))
+        p50, p95 = percentiles(timings)
+        per_search = (sql_db.queries - queries) / len(timings)
+        print(f"{name:>22} {p50:>8.1f} {p95:>8.1f} {found:>6} {per_search:>8.1f} {exhausted:>8}")
+
+
+def path_cases(service):
+    return [
+        ("path both d<=6", lambda s, t: service.shortest_path(PathQuery(source_entity_id=s, target_entity_id=t))),
+        ("path outgoing d<=6", lambda s, t: service.shortest_path(
+            PathQuery(source_entity_id=s, target_entity_id=t, direction="outgoing"))),
+        ("weighted path d<=4", lambda s, t: service.shortest_path(
+            PathQuery(source_entity_id=s, target_entity_id=t, weight_property="weight", max_depth=4))),
+        ("reachable target k=3", lambda s, t: service.reachable(
+            ReachabilityQuery(start_entity_id=s, target_entity_id=t, max_depth=3))),
+        ("reachable count k=2", lambda s, t: service.reachable(ReachabilityQuery(start_entity_id=s, max_depth=2))),
+    ]
+
+
+if __name__ == "__main__":
+    main()
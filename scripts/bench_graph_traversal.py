@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark the recursive-CTE and iterative graph traversal engines.
+
+Generates synthetic graphs (10k, 100k and 1M edges by default) in a scratch
+schema, then times OntologyService.query_graph with each engine for several
+depths and directions. Requires a Snowflake account configured through the
+usual SNOWFLAKE_* environment variables; the scratch schema is dropped at the
+end unless --keep is given.
+
+Usage:
+    python scripts/bench_graph_traversal.py [--edges 10000 100000 1000000] [--runs 3]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from config import settings  # noqa: E402
+
+BENCH_SCHEMA = "ONTOLOGY_BENCH"
+settings.snowflake_schema = BENCH_SCHEMA
+os.environ["SNOWFLAKE_SCHEMA"] = BENCH_SCHEMA
+
+from database import SnowflakeConnection  # noqa: E402
+from models import GraphQuery  # noqa: E402
+from services.ontology_service import OntologyService  # noqa: E402
+
+
+def create_synthetic_graph(cursor, edge_count: int, avg_degree: int):
+    """Create ENTITIES/RELATIONSHIPS with random edges between edge_count / avg_degree entities"""
+    entity_count = max(edge_count // avg_degree, 2)
+    cursor.execute("""
+        CREATE OR REPLACE TABLE ENTITIES (
+            ENTITY_ID VARCHAR(36), ENTITY_TYPE VARCHAR(100), LABEL VARCHAR(500),
+            PROPERTIES VARIANT, TAGS VARIANT, CREATED_AT TIMESTAMP_NTZ, UPDATED_AT TIMESTAMP_NTZ
+        )
+    """)
+    cursor.execute("""
+        CREATE OR REPLACE TABLE RELATIONSHIPS (
+            RELATIONSHIP_ID VARCHAR(36), SUBJECT_ID VARCHAR(36), PREDICATE VARCHAR(200),
+            OBJECT_ID VARCHAR(36), PROPERTIES VARIANT, CREATED_AT TIMESTAMP_NTZ
+        )
+    """)
+    cursor.execute(f"""
+        INSERT INTO ENTITIES
+        SELECT 'e-' || SEQ4(), 'CUSTOM', 'Entity ' || SEQ4(),
+               OBJECT_CONSTRUCT('score', UNIFORM(0, 100, RANDOM())), ARRAY_CONSTRUCT(),
+               CURRENT_TIMESTAMP(), CURRENT_TIMESTAMP()
+        FROM TABLE(GENERATOR(ROWCOUNT => {entity_count}))
+    """)
+    cursor.execute(f"""
+        INSERT INTO RELATIONSHIPS
+        SELECT 'r-' || SEQ4(),
+               'e-' || UNIFORM(0, {entity_count - 1}, RANDOM()),
+               'REL_' || UNIFORM(0, 4, RANDOM()),
+               'e-' || UNIFORM(0, {entity_count - 1}, RANDOM()),
+               OBJECT_CONSTRUCT('weight', UNIFORM(1, 10, RANDOM())),
+               CURRENT_TIMESTAMP()
+        FROM TABLE(GENERATOR(ROWCOUNT => {edge_count}))
+    """)
+    return entity_count
+
+
+def time_engine(service: OntologyService, engine: str, query: GraphQuery, runs: int):
+    settings.graph_traversal_engine = engine
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = (service._query_graph_recursive if engine == "recursive" else service._query_graph_iterative)(query)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edges", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--avg-degree", type=int, default=4)
+    parser.add_argument("--depths", type=int, nargs="+", default=[2, 3, 4])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema")
+    args = parser.parse_args()
+
+    db = SnowflakeConnection()
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {BENCH_SCHEMA}")
+        cursor.execute(f"USE SCHEMA {BENCH_SCHEMA}")
+        # Measure the engines, not the result cache
+        cursor.execute("ALTER SESSION SET USE_CACHED_RESULT = FALSE")
+        cursor.close()
+
+    service = OntologyService(db)
+    print(f"{'edges':>9} {'direction':>9} {'depth':>5} {'nodes':>7} {'iterative s':>12} {'recursive s':>12} {'speedup':>8}")
+
+    try:
+        for edge_count in args.edges:
+            with db.connection() as conn:
+                cursor = conn.cursor()
+                create_synthetic_graph(cursor, edge_count, args.avg_degree)
+                cursor.close()
+
+            for direction in ("outgoing", "both"):
+                for depth in args.depths:
+                    query = GraphQuery(start_entity_id="e-0", max_depth=depth, direction=direction)
+                    iterative_s, iterative = time_engine(service, "iterative", query, args.runs)
+                    recursive_s, recursive = time_engine(service, "recursive", query, args.runs)
+                    if iterative["total_nodes"] != recursive["total_nodes"]:
+                        print(f"  warning: engines disagree ({iterative['total_nodes']} vs {recursive['total_nodes']} nodes)")
+                    print(f"{edge_count:>9} {direction:>9} {depth:>5} {recursive['total_nodes']:>7} "
+                          f"{iterative_s:>12.3f} {recursive_s:>12.3f} {iterative_s / recursive_s:>7.1f}x")
+    finally:
+        if not args.keep:
+            with db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA}")
+                cursor.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
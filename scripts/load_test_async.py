@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Load test for the async execution path of the backend API.
+
+Runs GET /entities/{id} handlers with an increasing number of concurrent
+clients against a local stand-in database that simulates warehouse latency,
+and compares throughput with the old behaviour of calling the blocking
+service directly on the event loop.
+
+Usage:
+    python scripts/load_test_async.py [--latency-ms 50] [--requests 200]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+# Every request must reach the stand-in database, not the entity cache
+os.environ["ENTITY_CACHE_MAX_BYTES"] = "0"
+
+import main  # noqa: E402
+from executor import DatabaseExecutor  # noqa: E402
+
+
+class StandInCursor:
+    """Cursor that sleeps to simulate a warehouse round-trip"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.rowcount = 1
+
+    def execute(self, sql, params=None):
+        time.sleep(self.latency)
+
+    def fetchone(self):
+        now = datetime.utcnow()
+        return ("cust-001", "CUSTOMER", "Acme Corporation", '{"tier": "Platinum"}', '["enterprise"]', now, now)
+
+    def fetchall(self):
+        return [self.fetchone()]
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def cursor(self):
+        return StandInCursor(self.latency)
+
+    def commit(self):
+        pass
+
+
+class StandInDatabase:
+    """Replaces SnowflakeConnection; every checkout gets an independent connection"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    @contextmanager
+    def connection(self):
+        yield StandInConnection(self.latency)
+
+
+async def blocking_get_entity(entity_id: str):
+    """The pre-executor handler: blocking service call on the event loop"""
+    return main.ontology_service.get_entity(entity_id)
+
+
+async def run_clients(handler, clients: int, total_requests: int) -> float:
+    """Run total_requests split across concurrent clients; returns requests/second"""
+    per_client = total_requests // clients
+
+    async def client(number: int):
+        # Distinct IDs, so concurrent loads of the same entity aren't coalesced into one query
+        for request in range(per_client):
+            await handler(f"cust-{number}-{request}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    elapsed = time.perf_counter() - start
+    return (per_client * clients) / elapsed
+
+
+async def main_async(args):
+    main.ontology_service.db = StandInDatabase(args.latency_ms / 1000.0)
+    main.db_executor = DatabaseExecutor(max_workers=args.workers, max_pending=args.requests * 2)
+
+    print(f"Stand-in latency: {args.latency_ms} ms, executor workers: {args.workers}")
+    print(f"{'clients':>8} {'blocking req/s':>16} {'async req/s':>13} {'speedup':>8}")
+    for clients in (1, 2, 4, 8, 16, 32):
+        blocking = await run_clients(blocking_get_entity, clients, args.requests)
+        async_rps = await run_clients(main.get_entity, clients, args.requests)
+        print(f"{clients:>8} {blocking:>16.1f} {async_rps:>13.1f} {async_rps / blocking:>7.1f}x")
+
+    main.db_executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated query latency")
+    parser.add_argument("--requests", type=int, default=192, help="Requests per concurrency level")
+    parser.add_argument("--workers", type=int, default=16, help="Executor worker threads")
+    asyncio.run(main_async(parser.parse_args()))
@@ -21,9 +21,11 @@ conn = snowflake.connector.connect(
 cursor = conn.cursor()
 
 print("🗑️  Clearing existing data...")
+cursor.execute("DELETE FROM WORKFLOW_EXECUTION_EVENTS")
 cursor.execute("DELETE FROM WORKFLOW_EXECUTIONS")
 cursor.execute("DELETE FROM WORKFLOW_DEFINITIONS")
 cursor.execute("DELETE FROM ENTITY_STATES")
+cursor.execute("DELETE FROM ENTITY_METRIC_HISTORY")
 cursor.execute("DELETE FROM RELATIONSHIPS")
 cursor.execute("DELETE FROM ENTITIES")
 
@@ -66,7 +66,8 @@ CREATE TABLE IF NOT EXISTS WORKFLOW_DEFINITIONS (
 -- Note: Indexes are not supported on standard tables in Snowflake
 
 -- ==================== WORKFLOW EXECUTIONS TABLE ====================
--- Tracks execution history of workflows
+-- Tracks execution history of workflows recorded before the event log below
+-- No longer written; its rows are still returned by WORKFLOW_EXECUTION_LOG
 CREATE TABLE IF NOT EXISTS WORKFLOW_EXECUTIONS (
     EXECUTION_ID VARCHAR(36) PRIMARY KEY,
     WORKFLOW_ID VARCHAR(36) NOT NULL,
@@ -81,8 +82,86 @@ CREATE TABLE IF NOT EXISTS WORKFLOW_EXECUTIONS (
     FOREIGN KEY (ENTITY_ID) REFERENCES ENTITIES(ENTITY_ID)
 );
 
+-- Workflow execution events (append-only)
+-- Each row is a full snapshot of an execution when it was queued, started or finished;
+-- the one with the highest EVENT_SEQ is current
+CREATE TABLE IF NOT EXISTS WORKFLOW_EXECUTION_EVENTS (
+    EXECUTION_ID VARCHAR(36) NOT NULL,
+    EVENT_SEQ NUMBER NOT NULL,
+    WORKFLOW_ID VARCHAR(36) NOT NULL,
+    ENTITY_ID VARCHAR(36) NOT NULL,
+    STATUS VARCHAR(50) NOT NULL,
+    INPUT_DATA VARIANT,
+    OUTPUT_DATA VARIANT,
+    ERROR_MESSAGE TEXT,
+    STARTED_AT TIMESTAMP_NTZ NOT NULL,
+    COMPLETED_AT TIMESTAMP_NTZ,
+    EVENT_AT TIMESTAMP_NTZ NOT NULL
+);
+
+-- Current record of every workflow execution
+-- CREATED_AT is the STARTED_AT of the first event (the enqueue time), which later events don't change
+CREATE OR REPLACE VIEW WORKFLOW_EXECUTION_LOG AS
+SELECT EXECUTION_ID, WORKFLOW_ID, ENTITY_ID, STATUS, INPUT_DATA, OUTPUT_DATA,
+       ERROR_MESSAGE, STARTED_AT, COMPLETED_AT,
+       FIRST_VALUE(STARTED_AT) OVER (PARTITION BY EXECUTION_ID ORDER BY EVENT_SEQ, EVENT_AT) AS CREATED_AT
+FROM WORKFLOW_EXECUTION_EVENTS
+QUALIFY ROW_NUMBER() OVER (PARTITION BY EXECUTION_ID ORDER BY EVENT_SEQ DESC, EVENT_AT DESC) = 1
+UNION ALL
+SELECT EXECUTION_ID, WORKFLOW_ID, ENTITY_ID, STATUS, INPUT_DATA, OUTPUT_DATA,
+       ERROR_MESSAGE, STARTED_AT, COMPLETED_AT, STARTED_AT AS CREATED_AT
+FROM WORKFLOW_EXECUTIONS;
+
 -- Note: Indexes are not supported on standard tables in Snowflake
 
+-- ==================== WORKFLOW EXECUTION QUEUE TABLE ====================
+-- Executions waiting for a worker (EXECUTION_QUEUE_BACKEND=snowflake)
+-- Rows are claimed by setting CLAIMED_BY and deleted once the execution finishes
+CREATE TABLE IF NOT EXISTS WORKFLOW_EXECUTION_QUEUE (
+    EXECUTION_ID VARCHAR(36) PRIMARY KEY,
+    WORKFLOW_ID VARCHAR(36) NOT NULL,
+    ENTITY_ID VARCHAR(36) NOT NULL,
+    INPUT_DATA VARIANT,
+    ATTEMPTS NUMBER NOT NULL DEFAULT 0,
+    AVAILABLE_AT TIMESTAMP_NTZ NOT NULL,
+    CLAIMED_BY VARCHAR(100),
+    CLAIMED_AT TIMESTAMP_NTZ,
+    ENQUEUED_AT TIMESTAMP_NTZ NOT NULL
+);
+
+-- ==================== ENTITY METRIC HISTORY TABLE ====================
+-- Values computed by AGGREGATE workflows with store_history, one row per entity and run
+CREATE TABLE IF NOT EXISTS ENTITY_METRIC_HISTORY (
+    ENTITY_ID VARCHAR(36) NOT NULL,
+    WORKFLOW_ID VARCHAR(36) NOT NULL,
+    METRICS VARIANT,
+    COMPUTED_AT TIMESTAMP_NTZ NOT NULL
+)
+CLUSTER BY (ENTITY_ID, COMPUTED_AT);
+
+-- ==================== ENRICHMENT CACHE TABLE ====================
+-- Records from ENRICH data sources by lookup value; served while younger than the workflow's cache_duration_days
+CREATE TABLE IF NOT EXISTS ENRICHMENT_CACHE (
+    DATA_SOURCE VARCHAR(200) NOT NULL,
+    LOOKUP_VALUE VARCHAR(1000) NOT NULL,
+    DATA VARIANT,
+    FETCHED_AT TIMESTAMP_NTZ NOT NULL,
+    PRIMARY KEY (DATA_SOURCE, LOOKUP_VALUE)
+)
+CLUSTER BY (DATA_SOURCE, LOOKUP_VALUE);
+
+-- ==================== CACHE INVALIDATIONS TABLE ====================
+-- Cross-worker cache invalidation log (CACHE_INVALIDATION_ENABLED=true)
+-- Workers poll for rows from other origins; rows older than an hour are deleted
+CREATE TABLE IF NOT EXISTS CACHE_INVALIDATIONS (
+    INVALIDATION_ID VARCHAR(32) NOT NULL,
+    ORIGIN VARCHAR(32) NOT NULL,
+    NAMESPACE VARCHAR(50) NOT NULL,
+    CACHE_KEY VARCHAR(255) NOT NULL,
+    INVALIDATED_AT TIMESTAMP_NTZ NOT NULL
+)
+CLUSTER BY (INVALIDATED_AT);
+
 -- ==================== STREAMS FOR CDC ====================
 -- Create streams to capture changes for workflow triggers
 
@@ -95,7 +174,8 @@ CREATE STREAM IF NOT EXISTS ENTITY_STATES_STREAM ON TABLE ENTITY_STATES;
 -- ==================== DYNAMIC TABLES ====================
 -- Automatically materialized views for complex queries
 
--- Entity relationship summary
+-- Entity relationship summary (per-entity degree; backs /graph/stats)
+-- Outgoing and incoming counts are aggregated separately so the joins do not fan out
 CREATE OR REPLACE DYNAMIC TABLE ENTITY_RELATIONSHIP_SUMMARY
     TARGET_LAG = '1 minute'
     WAREHOUSE = COMPUTE_WH
@@ -104,13 +184,27 @@ SELECT
     e.ENTITY_ID,
     e.ENTITY_TYPE,
     e.LABEL,
-    COUNT(DISTINCT r1.RELATIONSHIP_ID) as OUTGOING_RELATIONSHIPS,
-    COUNT(DISTINCT r2.RELATIONSHIP_ID) as INCOMING_RELATIONSHIPS,
+    COALESCE(o.RELATIONSHIP_COUNT, 0) as OUTGOING_RELATIONSHIPS,
+    COALESCE(i.RELATIONSHIP_COUNT, 0) as INCOMING_RELATIONSHIPS,
     e.UPDATED_AT
 FROM ENTITIES e
-LEFT JOIN RELATIONSHIPS r1 ON e.ENTITY_ID = r1.SUBJECT_ID
-LEFT JOIN RELATIONSHIPS r2 ON e.ENTITY_ID = r2.OBJECT_ID
-GROUP BY e.ENTITY_ID, e.ENTITY_TYPE, e.LABEL, e.UPDATED_AT;
+LEFT JOIN (
+    SELECT SUBJECT_ID, COUNT(*) as RELATIONSHIP_COUNT FROM RELATIONSHIPS GROUP BY SUBJECT_ID
+) o ON e.ENTITY_ID = o.SUBJECT_ID
+LEFT JOIN (
+    SELECT OBJECT_ID, COUNT(*) as RELATIONSHIP_COUNT FROM RELATIONSHIPS GROUP BY OBJECT_ID
+) i ON e.ENTITY_ID = i.OBJECT_ID;
+
+-- Relationship counts by predicate (backs /graph/stats)
+CREATE OR REPLACE DYNAMIC TABLE PREDICATE_SUMMARY
+    TARGET_LAG = '1 minute'
+    WAREHOUSE = COMPUTE_WH
+AS
+SELECT 
+    PREDICATE,
+    COUNT(*) as RELATIONSHIP_COUNT
+FROM RELATIONSHIPS
+GROUP BY PREDICATE;
 
 -- Workflow execution summary
 CREATE OR REPLACE DYNAMIC TABLE WORKFLOW_EXECUTION_SUMMARY
@@ -123,9 +217,10 @@ SELECT
     COUNT(CASE WHEN e.STATUS = 'COMPLETED' THEN 1 END) as COMPLETED_COUNT,
     COUNT(CASE WHEN e.STATUS = 'FAILED' THEN 1 END) as FAILED_COUNT,
     COUNT(CASE WHEN e.STATUS = 'IN_PROGRESS' THEN 1 END) as IN_PROGRESS_COUNT,
+    COUNT(CASE WHEN e.STATUS = 'PENDING' THEN 1 END) as PENDING_COUNT,
     MAX(e.STARTED_AT) as LAST_EXECUTION
 FROM WORKFLOW_DEFINITIONS w
-LEFT JOIN WORKFLOW_EXECUTIONS e ON w.WORKFLOW_ID = e.WORKFLOW_ID
+LEFT JOIN WORKFLOW_EXECUTION_LOG e ON w.WORKFLOW_ID = e.WORKFLOW_ID
 GROUP BY w.WORKFLOW_ID, w.NAME;
 
 -- ==================== TASKS FOR WORKFLOW AUTOMATION ====================